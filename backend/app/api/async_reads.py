@@ -0,0 +1,121 @@
+"""
+Async Read Routes
+async versions of the busiest read endpoints, served from the asyncpg engine.
+main.py mounts this router ahead of the sync ones when ASYNC_ROUTES_ENABLED
+is set, so these paths stop holding a threadpool worker while they wait on
+the database. Handlers built around the sync caches run through
+session.run_sync so there is one implementation of each.
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.database import get_async_session
+from app.core.principals import Principal
+from app.core.security import get_read_only_user_async
+from app.models.models import FantasyTeam, Gameweek
+from app.services.player_catalogue import player_catalogue
+from app.api import leaderboard, stats
+from app.api.gameweeks import GameweekRead
+from app.api.leaderboard import GameweekRankEntry, LeaderboardEntry, MyRank, RankHistoryEntry
+from app.api.players import PlayerRead, catalogue_response
+from app.api.teams import TeamRead
+
+router = APIRouter(tags=["async"])
+
+
+@router.get("/api/players/", response_model=List[PlayerRead])
+async def list_players_async(
+    request: Request,
+    position: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_read_only_user_async),
+):
+    catalogue = await session.run_sync(player_catalogue.get)
+    return catalogue_response(request, catalogue, position)
+
+
+@router.get("/api/gameweeks/", response_model=List[GameweekRead])
+async def list_gameweeks_async(session: AsyncSession = Depends(get_async_session)):
+    return (await session.exec(select(Gameweek).order_by(Gameweek.number))).all()
+
+
+@router.get("/api/gameweeks/active", response_model=Optional[GameweekRead])
+async def active_gameweek_async(session: AsyncSession = Depends(get_async_session)):
+    return (await session.exec(select(Gameweek).where(Gameweek.is_active == True))).first()
+
+
+@router.get("/api/teams/my", response_model=TeamRead)
+async def my_team_async(
+    current_user: Principal = Depends(get_read_only_user_async),
+    session: AsyncSession = Depends(get_async_session),
+):
+    team = (await session.exec(
+        select(FantasyTeam).where(FantasyTeam.manager_id == current_user.id)
+    )).first()
+    if not team:
+        raise HTTPException(status_code=404, detail="Fantasy team not found")
+    return team
+
+
+@router.get("/api/stats/settings")
+async def get_settings_async(
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session),
+):
+    return await session.run_sync(lambda s: stats.get_settings(request, response, s))
+
+
+@router.get("/api/stats/dashboard-highlights")
+async def get_dashboard_highlights_async(session: AsyncSession = Depends(get_async_session)):
+    return await session.run_sync(stats.get_dashboard_highlights)
+
+
+@router.get("/api/leaderboard/global", response_model=List[LeaderboardEntry])
+async def global_leaderboard_async(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_read_only_user_async),
+):
+    return await session.run_sync(
+        lambda s: leaderboard.global_leaderboard(request, response, limit, cursor, s, current_user)
+    )
+
+
+@router.get("/api/leaderboard/me", response_model=MyRank)
+async def my_rank_async(
+    request: Request,
+    response: Response,
+    around: int = Query(5, ge=0, le=50),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_read_only_user_async),
+):
+    return await session.run_sync(
+        lambda s: leaderboard.my_rank(request, response, around, s, current_user)
+    )
+
+
+@router.get("/api/leaderboard/gameweek/{gw_id}", response_model=List[GameweekRankEntry])
+async def gameweek_leaderboard_async(
+    gw_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_read_only_user_async),
+):
+    return await session.run_sync(
+        lambda s: leaderboard.gameweek_leaderboard(gw_id, limit, offset, s, current_user)
+    )
+
+
+@router.get("/api/leaderboard/history", response_model=List[RankHistoryEntry])
+async def my_rank_history_async(
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_read_only_user_async),
+):
+    return await session.run_sync(lambda s: leaderboard.my_rank_history(s, current_user))
@@ -1,4 +1,3 @@
-import os
 import random
 from datetime import timedelta
 from typing import Optional
@@ -6,51 +5,20 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session, select
 from pydantic import BaseModel, EmailStr
-import json  # تأكد إن السطر ده موجود ومكتوب صح
-
-# --- إعدادات Firebase ---
-import firebase_admin
-from firebase_admin import credentials, auth as firebase_auth
-
-# التحقق مما إذا كان Firebase Admin قد تم تهيئته مسبقاً لمنع حدوث خطأ عند إعادة تشغيل السيرفر
-import firebase_admin
-from firebase_admin import credentials, auth as firebase_auth
-
-if not firebase_admin._apps:
-    try:
-        # بنحاول نقرأ من Vercel Environment Variables
-        firebase_env = os.environ.get("FIREBASE_JSON_CREDS")
-        
-        if firebase_env:
-            # هنا الكود كان بيضرب عشان مفيش import json
-            cred_dict = json.loads(firebase_env) 
-            cred = credentials.Certificate(cred_dict)
-            firebase_admin.initialize_app(cred)
-            print("Firebase initialized from Environment Variable")
-        
-        # لو شغال لوكال على جهازك
-        elif os.path.exists("firebase-adminsdk.json"):
-            cred = credentials.Certificate("firebase-adminsdk.json")
-            firebase_admin.initialize_app(cred)
-            print("Firebase initialized from local JSON file")
-            
-        else:
-            print("No Firebase credentials found!")
-            
-    except Exception as e:
-        # دي الرسالة اللي شفناها في الـ Logs
-        print(f"Firebase initialization error: {e}")
-# ------------------------
 
 from app.core.database import get_session
 from app.core.config import settings
+from app.core.firebase import verify_firebase_token
+from app.core.passwords import check_password, hash_password
+from app.core.principals import Principal
 from app.core.security import (
-    verify_password,
-    get_password_hash,
     create_access_token,
+    token_claims,
     get_current_user,
+    invalidate_user,
 )
 from app.models.models import User, FantasyTeam
+from app.services.leaderboard_cache import leaderboard_cache
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -98,7 +66,7 @@ def register(user_data: UserCreate, session: Session = Depends(get_session)):
     user = User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=hash_password(user_data.password),
     )
     session.add(user)
     session.commit()
@@ -111,8 +79,9 @@ def register(user_data: UserCreate, session: Session = Depends(get_session)):
     )
     session.add(team)
     session.commit()
+    leaderboard_cache.invalidate()
 
-    token = create_access_token({"sub": str(user.id)})
+    token = create_access_token(token_claims(user))
     return Token(
         access_token=token,
         token_type="bearer",
@@ -128,13 +97,22 @@ def login(
     user = session.exec(
         select(User).where(User.username == form_data.username)
     ).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = check_password(user.id, form_data.password, user.hashed_password) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
-
-    token = create_access_token({"sub": str(user.id)})
+    if new_hash:
+        # BCRYPT_ROUNDS اتغير: بنحفظ الـ hash الجديد. الـ token version بيتغير معاه،
+        # فالسيشنز التانية لليوزر ده بتطلب login تاني مرة واحدة بس
+        user.hashed_password = new_hash
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        invalidate_user(user.id)
+
+    token = create_access_token(token_claims(user))
     return Token(
         access_token=token,
         token_type="bearer",
@@ -149,8 +127,8 @@ def login_with_firebase(
     session: Session = Depends(get_session)
 ):
     try:
-        # 1. التحقق من صحة التوكن عن طريق مكتبة Firebase
-        decoded_token = firebase_auth.verify_id_token(token_data.token)
+        # 1. التحقق من صحة التوكن (بيتكاش لحد الـ exp بتاعه)
+        decoded_token = verify_firebase_token(token_data.token)
         email = decoded_token.get("email")
         
         if not email:
@@ -173,7 +151,7 @@ def login_with_firebase(
             user = User(
                 username=username,
                 email=email,
-                hashed_password=get_password_hash(""), # باسوورد فارغ لأن الدخول بحساب جوجل
+                hashed_password=hash_password(""), # باسوورد فارغ لأن الدخول بحساب جوجل
             )
             session.add(user)
             session.commit()
@@ -187,9 +165,10 @@ def login_with_firebase(
             )
             session.add(team)
             session.commit()
+            leaderboard_cache.invalidate()
 
         # 4. إنشاء التوكن الخاص بالموقع
-        token = create_access_token({"sub": str(user.id)})
+        token = create_access_token(token_claims(user))
         
         return Token(
             access_token=token,
@@ -197,6 +176,15 @@ def login_with_firebase(
             user=UserRead.model_validate(user),
         )
 
+    except HTTPException as e:
+        # الـ pool بتاع الباسوردات مليان: نرجع 503 زي باقي الـ auth مش 401
+        if e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+            raise
+        print(f"Firebase Auth Error: {e.detail}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired Firebase Token",
+        )
     except Exception as e:
         print(f"Firebase Auth Error: {e}")
         raise HTTPException(
@@ -207,5 +195,5 @@ def login_with_firebase(
 
 
 @router.get("/me", response_model=UserRead)
-def me(current_user: User = Depends(get_current_user)):
+def me(current_user: Principal = Depends(get_current_user)):
     return current_user
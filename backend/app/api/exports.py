@@ -0,0 +1,47 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.core.principals import Principal
+from app.core.security import get_current_admin
+from app.services import exports
+
+router = APIRouter(prefix="/api/exports", tags=["exports"])
+
+
+@router.get("/")
+def list_exports(admin: Principal = Depends(get_current_admin)):
+    return {
+        "datasets": list(exports.DATASETS),
+        "formats": [*exports.TEXT_FORMATS, *exports.COLUMNAR_FORMATS],
+    }
+
+
+@router.get("/{dataset}")
+def export_dataset(
+    dataset: str,
+    format: str = "ndjson",
+    gzip: bool = False,
+    gameweek_id: Optional[int] = None,
+    admin: Principal = Depends(get_current_admin),
+):
+    """
+    Stream a whole table (or one gameweek of it) as ndjson, csv, arrow or
+    parquet. ndjson and csv can be gzipped with ?gzip=true.
+    """
+    if dataset not in exports.DATASETS:
+        raise HTTPException(status_code=404, detail="Unknown dataset")
+    try:
+        exports.check_format(format, gzip)
+    except exports.ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    name = exports.filename(dataset, format, gzip, gameweek_id)
+    return StreamingResponse(
+        exports.export_stream(dataset, format, gzip=gzip, gameweek_id=gameweek_id),
+        media_type=exports.media_type(format, gzip),
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
@@ -1,13 +1,26 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile
 from sqlmodel import Session, select
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from datetime import datetime
+import csv
+import io
+import time
 
 from app.core.database import get_session
-from app.core.security import get_current_user, get_current_admin
-from app.models.models import Gameweek, MatchStat, Player, User, FantasyTeam, FantasyTeamGameweek, MVPVote
-from app.services.points_engine import calculate_player_points, get_points_breakdown, calculate_earned_badges
+from app.core.prometheus import ACTIVATION_DURATION
+from app.core.principals import Principal
+from app.core.security import get_current_user, get_current_admin, get_read_only_user
+from app.models.models import Gameweek, MatchStat, Player, MVPVote, ScoringJob
+from app.services.points_engine import get_points_breakdown
+from app.services.jobs import submit_scoring_job, job_status
+from app.services.rollover import rollover_squads
+from app.services.scoring import propagate_player_delta
+from app.services.match_stats import upsert_match_stats
+from app.services.leaderboard_cache import leaderboard_cache
+from app.services.player_catalogue import player_catalogue
+from app.services.squad_validation import squad_context_cache
+from app.services.squad_buffer import flush_pending_saves
 
 router = APIRouter(prefix="/api/gameweeks", tags=["gameweeks"])
 
@@ -74,6 +87,31 @@ class MatchStatRead(BaseModel):
     class Config:
         from_attributes = True
 
+class StatRowResultRead(BaseModel):
+    row: int
+    player_id: Optional[int]
+    status: str
+    points: Optional[int] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class BulkStatsRead(BaseModel):
+    gameweek_id: int
+    created: int
+    updated: int
+    unchanged: int
+    rejected: int
+    teams_updated: int
+    results: List[StatRowResultRead]
+
+    class Config:
+        from_attributes = True
+
+# أقصى عدد صفوف في الرفع الواحد (الـ CSV أو الـ JSON)
+MAX_BULK_STAT_ROWS = 2000
+
 @router.get("/", response_model=List[GameweekRead])
 def list_gameweeks(session: Session = Depends(get_session)):
     return session.exec(select(Gameweek).order_by(Gameweek.number)).all()
@@ -83,7 +121,7 @@ def submit_mvp_vote(
     gw_id: int,
     vote_data: VoteSubmit,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     gw = session.get(Gameweek, gw_id)
     if not gw or not gw.is_voting_open:
@@ -111,7 +149,7 @@ def submit_mvp_vote(
 def check_my_vote(
     gw_id: int,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_only_user),
 ):
     vote = session.exec(
         select(MVPVote).where(MVPVote.gameweek_id == gw_id, MVPVote.user_id == current_user.id)
@@ -127,7 +165,7 @@ def active_gameweek(session: Session = Depends(get_session)):
 def create_gameweek(
     gw_data: GameweekCreate,
     session: Session = Depends(get_session),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
     gw = Gameweek(**gw_data.model_dump())
     session.add(gw)
@@ -139,8 +177,11 @@ def create_gameweek(
 def activate_gameweek(
     gameweek_id: int,
     session: Session = Depends(get_session),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
+    started = time.perf_counter()
+    # أي حفظات تشكيلة لسه في الـ buffer لازم تتكتب قبل الترحيل
+    flush_pending_saves()
     active_gws = session.exec(select(Gameweek).where(Gameweek.is_active == True)).all()
     for gw in active_gws:
         gw.is_active = False
@@ -153,119 +194,46 @@ def activate_gameweek(
     target_gw.is_active = True
     session.add(target_gw)
     
-    fantasy_teams = session.exec(select(FantasyTeam)).all()
-    for ft in fantasy_teams:
-        existing_ftg = session.exec(
-            select(FantasyTeamGameweek).where(
-                FantasyTeamGameweek.fantasy_team_id == ft.id,
-                FantasyTeamGameweek.gameweek_id == gameweek_id
-            )
-        ).first()
-        
-        if not existing_ftg:
-            latest_ftg = session.exec(
-                select(FantasyTeamGameweek)
-                .where(FantasyTeamGameweek.fantasy_team_id == ft.id)
-                .order_by(FantasyTeamGameweek.gameweek_id.desc())
-            ).first()
-            
-            if latest_ftg:
-                new_ftg = FantasyTeamGameweek(
-                    fantasy_team_id=ft.id,
-                    gameweek_id=gameweek_id,
-                    player1_id=latest_ftg.player1_id,
-                    player2_id=latest_ftg.player2_id,
-                    player3_id=latest_ftg.player3_id,
-                    player4_id=latest_ftg.player4_id,
-                    player5_id=latest_ftg.player5_id,
-                    captain_id=latest_ftg.captain_id,
-                    transfers_made=0,
-                    transfer_penalty=0,
-                    gameweek_points=0
-                )
-                session.add(new_ftg)
+    # 🌟 ترحيل تشكيلات كل الفرق للجولة الجديدة في statement واحدة
+    rolled_over = rollover_squads(session, gameweek_id)
 
     session.commit()
-    return {"message": "Gameweek activated and teams rolled over"}
+    squad_context_cache.invalidate()
+    ACTIVATION_DURATION.observe(time.perf_counter() - started)
+    return {"message": "Gameweek activated and teams rolled over", "rolled_over": rolled_over}
 
-@router.post("/{gameweek_id}/calculate-points")
+@router.post("/{gameweek_id}/calculate-points", status_code=202)
 def calculate_gw_points(
     gameweek_id: int,
     session: Session = Depends(get_session),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
-    # 1. 🌟 سحب الأصوات من جدول الـ MVPVote
-    votes = session.exec(select(MVPVote).where(MVPVote.gameweek_id == gameweek_id)).all()
-    vote_tallies = {}
-    for vote in votes:
-        if vote.first_place_id:
-            vote_tallies[vote.first_place_id] = vote_tallies.get(vote.first_place_id, 0) + 3
-        if vote.second_place_id:
-            vote_tallies[vote.second_place_id] = vote_tallies.get(vote.second_place_id, 0) + 2
-        if vote.third_place_id:
-            vote_tallies[vote.third_place_id] = vote_tallies.get(vote.third_place_id, 0) + 1
-
-    sorted_mvps = sorted(vote_tallies.items(), key=lambda x: x[1], reverse=True)
-    top_3_ids = [pid for pid, score in sorted_mvps[:3]]
-
-    # 2. 🌟 تحديث الإحصائيات (نقاط، باجات، ترتيب MVP)
-    gw_stats = session.exec(select(MatchStat).where(MatchStat.gameweek_id == gameweek_id)).all()
-    player_pts = {}
-    
-    for stat in gw_stats:
-        player = session.get(Player, stat.player_id)
-        if not player: continue
-        
-        stat.mvp_rank = 0
-        if stat.player_id in top_3_ids:
-            stat.mvp_rank = top_3_ids.index(stat.player_id) + 1
-            
-        old_pts = stat.points or 0
-        new_pts = calculate_player_points(stat, player.position)
-        stat.points = new_pts
-        stat.badges = calculate_earned_badges(stat)
-        session.add(stat)
-        
-        player.total_points = (player.total_points or 0) - old_pts + new_pts
-        session.add(player)
-        player_pts[stat.player_id] = new_pts
-
-    # 3. 🌟 حساب نقاط الفانتسي للفرق
-    ftgs = session.exec(select(FantasyTeamGameweek).where(FantasyTeamGameweek.gameweek_id == gameweek_id)).all()
-    for ftg in ftgs:
-        old_gw_pts = ftg.gameweek_points or 0
-        pts = 0
-        players_in_team = [ftg.player1_id, ftg.player2_id, ftg.player3_id, ftg.player4_id, ftg.player5_id]
-        
-        for pid in players_in_team:
-            if pid:
-                pts += player_pts.get(pid, 0)
-                if pid == ftg.captain_id:
-                    pts += player_pts.get(pid, 0)
-        
-        final_gw_pts = pts - (ftg.transfer_penalty or 0)
-        ftg.gameweek_points = final_gw_pts
-        session.add(ftg)
-
-        ft = session.get(FantasyTeam, ftg.fantasy_team_id)
-        if ft:
-            ft.total_points = (ft.total_points or 0) - old_gw_pts + final_gw_pts
-            session.add(ft)
+    if not session.get(Gameweek, gameweek_id):
+        raise HTTPException(status_code=404, detail="Gameweek not found")
 
-    gw = session.get(Gameweek, gameweek_id)
-    if gw:
-        gw.is_active = False
-        gw.is_finished = True
-        session.add(gw)
+    # 🌟 الحسبة بقت job في الخلفية، والأدمن بيتابعها من /jobs/{job_id}
+    job = submit_scoring_job(session, gameweek_id)
+    return {
+        "message": "Points calculation queued ⏳",
+        **job_status(job),
+    }
 
-    session.commit()
-    return {"message": "MVP Auto-Assigned from Votes & Points recalculated perfectly! 👑"}
+@router.get("/jobs/{job_id}")
+def get_scoring_job(
+    job_id: int,
+    session: Session = Depends(get_session),
+    admin: Principal = Depends(get_current_admin),
+):
+    job = session.get(ScoringJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
 
 @router.get("/{gw_id}/stats", response_model=List[MatchStatRead])
 def get_gameweek_stats(
     gw_id: int,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_only_user),
 ):
     stats = session.exec(select(MatchStat).where(MatchStat.gameweek_id == gw_id)).all()
     return stats
@@ -274,8 +242,9 @@ def get_gameweek_stats(
 def add_match_stat(
     gw_id: int,
     stat_data: MatchStatCreate,
+    response: Response,
     session: Session = Depends(get_session),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
     gw = session.get(Gameweek, gw_id)
     if not gw:
@@ -288,7 +257,7 @@ def add_match_stat(
     existing = session.exec(
         select(MatchStat).where(
             (MatchStat.gameweek_id == gw_id) & (MatchStat.player_id == stat_data.player_id)
-        )
+        ).with_for_update()
     ).first()
     
     old_points = existing.points if existing else 0
@@ -300,25 +269,97 @@ def add_match_stat(
     else:
         stat = MatchStat(gameweek_id=gw_id, **stat_data.model_dump())
 
-    pts = calculate_player_points(stat, player.position)
+    from app.services.points_batch import score_stats
+    scores = score_stats([stat], [player.position])
+    pts = int(scores.points[0])
     stat.points = pts
-    stat.badges = calculate_earned_badges(stat)
+    stat.badges = scores.badges()[0]
 
     session.add(stat)
     player.total_points = (player.total_points - old_points) + pts
     session.add(player)
+
+    # 🌟 لو الجولة اتقفلت ونقاطها اتحسبت، بنزق الفرق للفرق اللي عندها اللعيب بس
+    teams_updated = 0
+    if gw.is_finished:
+        teams_updated = propagate_player_delta(session, gw_id, stat.player_id, pts - old_points)
+    response.headers["X-Teams-Updated"] = str(teams_updated)
     
     session.commit()
     session.refresh(stat)
+    player_catalogue.invalidate()
+    if teams_updated:
+        leaderboard_cache.invalidate()
 
     return stat
 
+def _apply_bulk_stats(session: Session, gw_id: int, rows: list, rejected: list):
+    if len(rows) + len(rejected) > MAX_BULK_STAT_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_STAT_ROWS} rows per upload")
+    gw = session.get(Gameweek, gw_id)
+    if not gw:
+        raise HTTPException(status_code=404, detail="Gameweek not found")
+
+    report = upsert_match_stats(session, gw, rows)
+    for row, player_id, error in rejected:
+        report.reject(row, player_id, error)
+    session.commit()
+
+    if report.created or report.updated:
+        player_catalogue.invalidate()
+    if report.teams_updated:
+        leaderboard_cache.invalidate()
+    return report
+
+@router.post("/{gw_id}/stats/bulk", response_model=BulkStatsRead)
+def add_match_stats_bulk(
+    gw_id: int,
+    stats: List[MatchStatCreate],
+    session: Session = Depends(get_session),
+    admin: Principal = Depends(get_current_admin),
+):
+    """Create or replace many stats at once; `row` in the results is the 1-based index in the list."""
+    rows = [(i, stat.model_dump()) for i, stat in enumerate(stats, start=1)]
+    return _apply_bulk_stats(session, gw_id, rows, [])
+
+@router.post("/{gw_id}/stats/bulk/csv", response_model=BulkStatsRead)
+def add_match_stats_csv(
+    gw_id: int,
+    file: UploadFile = File(...),
+    session: Session = Depends(get_session),
+    admin: Principal = Depends(get_current_admin),
+):
+    """
+    Same as /stats/bulk from a CSV with a header row of MatchStatCreate
+    field names (player_id required, empty cells take the default). `row` is
+    the line number in the file.
+    """
+    try:
+        text = file.file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8")
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or "player_id" not in reader.fieldnames:
+        raise HTTPException(status_code=400, detail="CSV header must include player_id")
+
+    rows, rejected = [], []
+    for record in reader:
+        row = reader.line_num
+        values = {k.strip(): v.strip() for k, v in record.items() if k and v is not None and v.strip() != ""}
+        try:
+            rows.append((row, MatchStatCreate.model_validate(values).model_dump()))
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            player_id = values.get("player_id")
+            rejected.append((row, int(player_id) if str(player_id).isdigit() else None, error))
+    return _apply_bulk_stats(session, gw_id, rows, rejected)
+
 @router.get("/{gw_id}/stats/{player_id}/breakdown")
 def get_points_breakdown_route(
     gw_id: int,
     player_id: int,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_only_user),
 ):
     stat = session.exec(
         select(MatchStat).where(
@@ -334,7 +375,7 @@ def get_points_breakdown_route(
 def toggle_voting(
     gameweek_id: int,
     session: Session = Depends(get_session),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
     gw = session.get(Gameweek, gameweek_id)
     if not gw:
@@ -1,11 +1,13 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session, select
 from pydantic import BaseModel
 
 from app.core.database import get_session
-from app.core.security import get_current_user
-from app.models.models import User, FantasyTeam
+from app.core.principals import Principal
+from app.core.security import get_read_only_user
+from app.models.models import FantasyTeam, GameweekRankSnapshot
+from app.services.leaderboard_cache import leaderboard_cache
 
 router = APIRouter(prefix="/api/leaderboard", tags=["leaderboard"])
 
@@ -20,25 +22,147 @@ class LeaderboardEntry(BaseModel):
         from_attributes = True
 
 
+class MyRank(BaseModel):
+    rank: Optional[int]
+    total_teams: int
+    entry: Optional[LeaderboardEntry]
+    neighbours: List[LeaderboardEntry]
+
+
+class GameweekRankEntry(BaseModel):
+    gw_rank: int
+    manager_name: str
+    team_name: str
+    gw_points: int
+    overall_rank: int
+    overall_points: int
+
+
+class RankHistoryEntry(BaseModel):
+    gameweek_id: int
+    gw_points: int
+    gw_rank: int
+    overall_rank: int
+    overall_points: int
+    rank_change: int
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
 @router.get("/global", response_model=List[LeaderboardEntry])
 def global_leaderboard(
-    limit: int = 50,
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_only_user),
 ):
-    teams = session.exec(
-        select(FantasyTeam).order_by(FantasyTeam.total_points.desc()).limit(limit)
+    snapshot = leaderboard_cache.get(session)
+    etag = f'{snapshot.etag[:-1]}-{cursor or ""}-{limit}"'
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    try:
+        page, next_cursor = snapshot.page(limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response.headers["ETag"] = etag
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
+
+
+@router.get("/me", response_model=MyRank)
+def my_rank(
+    request: Request,
+    response: Response,
+    around: int = Query(5, ge=0, le=50),
+    session: Session = Depends(get_session),
+    current_user: Principal = Depends(get_read_only_user),
+):
+    snapshot = leaderboard_cache.get(session)
+    etag = f'{snapshot.etag[:-1]}-u{current_user.id}-{around}"'
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    entry, neighbours = snapshot.around(current_user.id, around)
+    response.headers["ETag"] = etag
+    return MyRank(
+        rank=entry.rank if entry else None,
+        total_teams=len(snapshot),
+        entry=entry,
+        neighbours=neighbours,
+    )
+
+
+@router.get("/gameweek/{gw_id}", response_model=List[GameweekRankEntry])
+def gameweek_leaderboard(
+    gw_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    session: Session = Depends(get_session),
+    current_user: Principal = Depends(get_read_only_user),
+):
+    rows = session.exec(
+        select(GameweekRankSnapshot)
+        .where(
+            GameweekRankSnapshot.gameweek_id == gw_id,
+            GameweekRankSnapshot.gw_rank > offset,
+            GameweekRankSnapshot.gw_rank <= offset + limit,
+        )
+        .order_by(GameweekRankSnapshot.gw_rank)
     ).all()
 
-    result = []
-    for rank, team in enumerate(teams, start=1):
-        manager = session.get(User, team.manager_id)
-        result.append(
-            LeaderboardEntry(
-                rank=rank,
-                manager_name=manager.username if manager else "Unknown",
-                team_name=team.name,
-                total_points=team.total_points,
-            )
+    # الأسماء جاية من كاش الترتيب العام، مش join على كل صف
+    teams = leaderboard_cache.get(session).by_team
+    return [
+        GameweekRankEntry(
+            gw_rank=row.gw_rank,
+            manager_name=teams[row.fantasy_team_id].manager_name if row.fantasy_team_id in teams else "Unknown",
+            team_name=teams[row.fantasy_team_id].team_name if row.fantasy_team_id in teams else "",
+            gw_points=row.gw_points,
+            overall_rank=row.overall_rank,
+            overall_points=row.overall_points,
         )
-    return result
+        for row in rows
+    ]
+
+
+@router.get("/history", response_model=List[RankHistoryEntry])
+def my_rank_history(
+    session: Session = Depends(get_session),
+    current_user: Principal = Depends(get_read_only_user),
+):
+    team_id = session.exec(
+        select(FantasyTeam.id).where(FantasyTeam.manager_id == current_user.id)
+    ).first()
+    if team_id is None:
+        return []
+
+    rows = session.exec(
+        select(GameweekRankSnapshot)
+        .where(GameweekRankSnapshot.fantasy_team_id == team_id)
+        .order_by(GameweekRankSnapshot.gameweek_id)
+    ).all()
+
+    history, previous = [], None
+    for row in rows:
+        history.append(RankHistoryEntry(
+            gameweek_id=row.gameweek_id,
+            gw_points=row.gw_points,
+            gw_rank=row.gw_rank,
+            overall_rank=row.overall_rank,
+            overall_points=row.overall_points,
+            # موجب = طلع لفوق 🔼
+            rank_change=(previous - row.overall_rank) if previous is not None else 0,
+        ))
+        previous = row.overall_rank
+    return history
@@ -0,0 +1,64 @@
+from typing import Optional
+
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core import db_metrics, prometheus
+from app.core.config import settings
+from app.core.database import engine
+from app.core.principals import Principal
+from app.core.security import get_current_admin
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+# /metrics على الـ root زي ما Prometheus متعود، ومن غير JWT (الـ scraper معهوش يوزر)
+prometheus_router = APIRouter(tags=["metrics"])
+
+
+@router.get("/db")
+def database_metrics(admin: Principal = Depends(get_current_admin)):
+    """Query counts and DB time per route since startup, plus the slowest statements."""
+    return {**db_metrics.snapshot(), "pool": engine.pool.status()}
+
+
+@router.delete("/db")
+def reset_database_metrics(admin: Principal = Depends(get_current_admin)):
+    db_metrics.reset()
+    return {"message": "Database metrics reset"}
+
+
+@router.get("/profiles")
+def profiles(admin: Principal = Depends(get_current_admin)):
+    """The slowest sampled requests per route (PROFILING_ENABLED must be on)."""
+    from app.core import profiling
+    return {
+        "enabled": settings.PROFILING_ENABLED,
+        "sample_rate": settings.PROFILING_SAMPLE_RATE,
+        "interval_ms": settings.PROFILING_INTERVAL_MS,
+        "routes": profiling.traces.snapshot(),
+    }
+
+
+@router.get("/profiles/collapsed", response_class=PlainTextResponse)
+def collapsed_profiles(route: Optional[str] = None, admin: Principal = Depends(get_current_admin)):
+    """Collapsed stacks (`frame;frame;frame count`) for flamegraph.pl or speedscope."""
+    from app.core import profiling
+    return profiling.traces.collapsed(route)
+
+
+@router.delete("/profiles")
+def reset_profiles(admin: Principal = Depends(get_current_admin)):
+    from app.core import profiling
+    profiling.traces.reset()
+    return {"message": "Profiles reset"}
+
+
+@prometheus_router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics(authorization: Optional[str] = Header(default=None)):
+    """Prometheus text format. With METRICS_TOKEN set, scrapers send it as a bearer token."""
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not authorization or not secrets.compare_digest(authorization, expected):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(prometheus.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
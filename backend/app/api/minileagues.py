@@ -1,14 +1,16 @@
 import random
 import string
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
 from pydantic import BaseModel
 from datetime import datetime
 
 from app.core.database import get_session
-from app.core.security import get_current_user
-from app.models.models import User, FantasyTeam, MiniLeague, MiniLeagueMember
+from app.core.principals import Principal
+from app.core.security import get_current_user, get_read_only_user
+from app.models.models import MiniLeague, MiniLeagueMember
+from app.services.league_cache import league_cache
 
 router = APIRouter(prefix="/api/minileagues", tags=["minileagues"])
 
@@ -42,7 +44,7 @@ class MiniLeagueMemberEntry(BaseModel):
 def create_league(
     data: MiniLeagueCreate,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     code = generate_join_code()
     while session.exec(select(MiniLeague).where(MiniLeague.join_code == code)).first():
@@ -64,7 +66,7 @@ def create_league(
 def join_league(
     join_code: str,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     league = session.exec(
         select(MiniLeague).where(MiniLeague.join_code == join_code)
@@ -84,45 +86,31 @@ def join_league(
     member = MiniLeagueMember(league_id=league.id, user_id=current_user.id)
     session.add(member)
     session.commit()
+    league_cache.invalidate(league.id)
     return {"message": f"Joined league: {league.name}"}
 
 
 @router.get("/my", response_model=List[MiniLeagueRead])
 def my_leagues(
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_only_user),
 ):
-    memberships = session.exec(
-        select(MiniLeagueMember).where(MiniLeagueMember.user_id == current_user.id)
+    return session.exec(
+        select(MiniLeague)
+        .join(MiniLeagueMember, MiniLeagueMember.league_id == MiniLeague.id)
+        .where(MiniLeagueMember.user_id == current_user.id)
     ).all()
-    leagues = [session.get(MiniLeague, m.league_id) for m in memberships]
-    return [l for l in leagues if l is not None]
 
 
 @router.get("/{league_id}/standings", response_model=List[MiniLeagueMemberEntry])
 def league_standings(
     league_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    offset: int = Query(0, ge=0),
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_only_user),
 ):
-    memberships = session.exec(
-        select(MiniLeagueMember).where(MiniLeagueMember.league_id == league_id)
-    ).all()
-
-    entries = []
-    for m in memberships:
-        user = session.get(User, m.user_id)
-        team = session.exec(
-            select(FantasyTeam).where(FantasyTeam.manager_id == m.user_id)
-        ).first()
-        if user and team:
-            entries.append({
-                "manager_name": user.username,
-                "team_name": team.name,
-                "total_points": team.total_points,
-            })
-
-    entries.sort(key=lambda x: x["total_points"], reverse=True)
-    return [
-        MiniLeagueMemberEntry(rank=i + 1, **e) for i, e in enumerate(entries)
-    ]
+    standings = league_cache.get(session, league_id)
+    if limit is None:
+        return standings[offset:]
+    return standings[offset:offset + limit]
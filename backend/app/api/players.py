@@ -1,11 +1,13 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlmodel import Session
 from pydantic import BaseModel
 
 from app.core.database import get_session
-from app.core.security import get_current_user, get_current_admin
-from app.models.models import Player, User
+from app.core.principals import Principal
+from app.core.security import get_current_admin, get_read_only_user
+from app.models.models import Player
+from app.services.player_catalogue import CatalogueSnapshot, player_catalogue
 
 router = APIRouter(prefix="/api/players", tags=["players"])
 
@@ -41,28 +43,38 @@ class PlayerUpdate(BaseModel):
     image_url: Optional[str] = None # أضفنا السطر ده هنا
 
 
+def catalogue_response(request: Request, catalogue: CatalogueSnapshot, position: Optional[str]) -> Response:
+    body = catalogue.body(position)
+    headers = {"ETag": body.etag, "Last-Modified": catalogue.last_modified}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match == body.etag or (
+        if_none_match is None and request.headers.get("if-modified-since") == catalogue.last_modified
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body.content, media_type="application/json", headers=headers)
+
+
 @router.get("/", response_model=List[PlayerRead])
 def list_players(
+    request: Request,
     position: Optional[str] = None,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_only_user),
 ):
-    query = select(Player).where(Player.is_active == True)
-    if position:
-        query = query.where(Player.position == position.upper())
-    players = session.exec(query).all()
-    return players
+    # الكتالوج متكاش وجاهز JSON، الـ DB بتتلمس بس بعد أي تعديل على اللعيبة
+    return catalogue_response(request, player_catalogue.get(session), position)
 
 
 @router.post("/", response_model=PlayerRead)
 def create_player(
     player_data: PlayerCreate,
     session: Session = Depends(get_session),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
     player = Player(**player_data.model_dump())
     session.add(player)
     session.commit()
+    player_catalogue.invalidate()
     session.refresh(player)
     return player
 
@@ -72,7 +84,7 @@ def update_player(
     player_id: int,
     player_data: PlayerUpdate,
     session: Session = Depends(get_session),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
     player = session.get(Player, player_id)
     if not player:
@@ -81,6 +93,7 @@ def update_player(
         setattr(player, key, value)
     session.add(player)
     session.commit()
+    player_catalogue.invalidate()
     session.refresh(player)
     return player
 
@@ -89,7 +102,7 @@ def update_player(
 def delete_player(
     player_id: int,
     session: Session = Depends(get_session),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
     player = session.get(Player, player_id)
     if not player:
@@ -97,4 +110,5 @@ def delete_player(
     player.is_active = False
     session.add(player)
     session.commit()
+    player_catalogue.invalidate()
     return {"message": "Player deactivated"}
@@ -1,22 +1,26 @@
-from fastapi import APIRouter, Depends
+import threading
+import time
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.encoders import jsonable_encoder
 from sqlmodel import Session, select, func
 from typing import List
+from app.core.config import settings as app_settings
 from app.core.database import get_session
-from app.models.models import SystemSettings, Player, FantasyTeamGameweek, Gameweek, MatchStat, User
+from app.models.models import Player, FantasyTeamGameweek, Gameweek, MatchStat, User, PlayerOwnership
+from app.services.squad_validation import squad_context_cache
+from app.services.system_settings import system_settings
 from typing import Optional # ضيف دي فوق لو مش موجودة
 
 router = APIRouter(prefix="/api/stats", tags=["Stats"])
 
-# 1. جلب وتحديث الإعدادات
+# 1. جلب وتحديث الإعدادات (من الـ snapshot اللي في الذاكرة، من غير ما نكتب في الداتابيز)
 @router.get("/settings")
-def get_settings(session: Session = Depends(get_session)):
-    settings = session.get(SystemSettings, 1)
-    if not settings:
-        settings = SystemSettings(id=1, show_dashboard_stats=False)
-        session.add(settings)
-        session.commit()
-        session.refresh(settings)
-    return settings
+def get_settings(request: Request, response: Response, session: Session = Depends(get_session)):
+    snapshot = system_settings.get(session)
+    if request.headers.get("if-none-match") == snapshot.etag:
+        return Response(status_code=304, headers={"ETag": snapshot.etag})
+    response.headers["ETag"] = snapshot.etag
+    return snapshot.as_dict()
 
 @router.put("/settings")
 def update_settings(
@@ -25,28 +29,41 @@ def update_settings(
     maintenance_mode: Optional[bool] = None, # <-- ضفنا دي هنا
     session: Session = Depends(get_session)
 ):
-    settings = session.get(SystemSettings, 1)
-    if not settings:
-        settings = SystemSettings(id=1)
-        session.add(settings)
-    
-    if show_stats is not None:
-        settings.show_dashboard_stats = show_stats
-        
-    if allow_transfers is not None:
-        settings.allow_transfers = allow_transfers
-        
-    if maintenance_mode is not None: # <-- وضيفنا الشرط ده
-        settings.maintenance_mode = maintenance_mode
-        
-    session.commit()
+    system_settings.update(
+        session,
+        show_dashboard_stats=show_stats,
+        allow_transfers=allow_transfers,
+        maintenance_mode=maintenance_mode,
+    )
+    invalidate_dashboard_highlights()
+    squad_context_cache.invalidate()
     return {"status": "success"}
 
-# 2. جلب إحصائيات الداش بورد
-@router.get("/dashboard-highlights")
-def get_dashboard_highlights(session: Session = Depends(get_session)):
-    settings = session.get(SystemSettings, 1)
-    if not settings or not settings.show_dashboard_stats:
+# 2. جلب إحصائيات الداش بورد (متكاشة لثواني عشان كل يوزر بيفتح الداش بورد)
+_highlights_cache = {"at": 0.0, "data": None}
+_highlights_lock = threading.Lock()
+
+
+def invalidate_dashboard_highlights():
+    with _highlights_lock:
+        _highlights_cache["data"] = None
+
+
+def _top_ownership(session: Session, gameweek_id: int, column, total_teams: int, key: str) -> list:
+    rows = session.exec(
+        select(Player, column)
+        .join(PlayerOwnership, PlayerOwnership.player_id == Player.id)
+        .where(PlayerOwnership.gameweek_id == gameweek_id, column > 0)
+        .order_by(column.desc(), Player.id)
+        .limit(3)
+    ).all()
+    if key == "count":
+        return [{"player": player, "count": count} for player, count in rows]
+    return [{"player": player, key: round((count / total_teams) * 100)} for player, count in rows]
+
+
+def build_dashboard_highlights(session: Session) -> dict:
+    if not system_settings.get(session).show_dashboard_stats:
         return {"show": False, "top_owned": [], "top_scorers": []}
 
     # جلب الجولة الحالية أو آخر جولة
@@ -55,49 +72,50 @@ def get_dashboard_highlights(session: Session = Depends(get_session)):
     
     gw_for_ownership = active_gw or last_finished_gw
     
-    top_owned = []
+    top_owned, top_captains, most_in, most_out = [], [], [], []
     if gw_for_ownership:
-        # حساب نسبة الامتلاك (بشكل مبسط عن طريق عد تكرار اللاعب في التشكيلات)
-        teams_in_gw = session.exec(select(FantasyTeamGameweek).where(FantasyTeamGameweek.gameweek_id == gw_for_ownership.id)).all()
-        player_counts = {}
-        for team in teams_in_gw:
-            players = [team.player1_id, team.player2_id, team.player3_id, team.player4_id, team.player5_id]
-            for pid in players:
-                if pid:
-                    player_counts[pid] = player_counts.get(pid, 0) + 1
-        
-        # ترتيب وتجهيز التوب 3
-        sorted_owned = sorted(player_counts.items(), key=lambda x: x[1], reverse=True)[:3]
-        total_teams = max(len(teams_in_gw), 1)
-        for pid, count in sorted_owned:
-            player = session.get(Player, pid)
-            if player:
-                top_owned.append({
-                    "player": player,
-                    "ownership_percent": round((count / total_teams) * 100)
-                })
+        gw_id = gw_for_ownership.id
+        # نسبة الامتلاك جاية من جدول PlayerOwnership اللي بيتبني مع حفظ التشكيلة والـ rollover
+        # (الـ GET ده قراية بس، لو الجدول لسه فاضي القوايم بترجع فاضية)
+        total_teams = max(session.exec(
+            select(func.count()).select_from(FantasyTeamGameweek).where(FantasyTeamGameweek.gameweek_id == gw_id)
+        ).one(), 1)
+        top_owned = _top_ownership(session, gw_id, PlayerOwnership.owners, total_teams, "ownership_percent")
+        top_captains = _top_ownership(session, gw_id, PlayerOwnership.captains, total_teams, "captaincy_percent")
+        most_in = _top_ownership(session, gw_id, PlayerOwnership.transfers_in, total_teams, "count")
+        most_out = _top_ownership(session, gw_id, PlayerOwnership.transfers_out, total_teams, "count")
 
     top_scorers = []
     if last_finished_gw:
         # أكثر لاعبين جابوا نقط الجولة اللي فاتت
-        stats = session.exec(
-            select(MatchStat)
+        rows = session.exec(
+            select(Player, MatchStat.points)
+            .join(MatchStat, MatchStat.player_id == Player.id)
             .where(MatchStat.gameweek_id == last_finished_gw.id)
             .order_by(MatchStat.points.desc())
             .limit(3)
         ).all()
-        
-        for stat in stats:
-            player = session.get(Player, stat.player_id)
-            if player:
-                top_scorers.append({
-                    "player": player,
-                    "points": stat.points
-                })
+        top_scorers = [{"player": player, "points": points} for player, points in rows]
 
     return {
         "show": True,
         "top_owned": top_owned,
+        "top_captains": top_captains,
+        "most_transferred_in": most_in,
+        "most_transferred_out": most_out,
         "top_scorers": top_scorers,
         "last_gw_name": last_finished_gw.name if last_finished_gw else ""
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/dashboard-highlights")
+def get_dashboard_highlights(session: Session = Depends(get_session)):
+    with _highlights_lock:
+        data, built_at = _highlights_cache["data"], _highlights_cache["at"]
+    if data is not None and time.monotonic() - built_at < app_settings.DASHBOARD_CACHE_TTL_SECONDS:
+        return data
+
+    data = jsonable_encoder(build_dashboard_highlights(session))
+    with _highlights_lock:
+        _highlights_cache["data"], _highlights_cache["at"] = data, time.monotonic()
+    return data
@@ -1,15 +1,21 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
 from pydantic import BaseModel
 from datetime import datetime # التعديل: استيراد مكتبة الوقت
 
+from app.core.config import settings as app_settings
 from app.core.database import get_session
-from app.core.security import get_current_user
+from app.core.principals import Principal
+from app.core.security import get_current_user, get_read_only_user
 from app.models.models import (
-    User, FantasyTeam, FantasyTeamGameweek, Gameweek, Player, MatchStat, SystemSettings
+    User, FantasyTeam, FantasyTeamGameweek, Gameweek, MatchStat, SquadSaveRequest
 )
 from app.services.points_engine import calculate_gameweek_team_points
+from app.services.squads import apply_selection
+from app.services.squad_buffer import enqueue_selection
+from app.services.player_catalogue import player_catalogue
+from app.services.squad_validation import load_squad_context, squad_context_cache, validate_squad
 
 router = APIRouter(prefix="/api/teams", tags=["teams"])
 
@@ -50,7 +56,7 @@ class TeamGameweekRead(BaseModel):
 
 @router.get("/my", response_model=TeamRead)
 def my_team(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_only_user),
     session: Session = Depends(get_session),
 ):
     team = session.exec(
@@ -64,7 +70,7 @@ def my_team(
 @router.get("/my/gameweek/{gw_id}", response_model=Optional[TeamGameweekRead])
 def my_team_gameweek(
     gw_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_only_user),
     session: Session = Depends(get_session),
 ):
     team = session.exec(
@@ -82,132 +88,125 @@ def my_team_gameweek(
     return tgw
 
 
-@router.post("/my/select")
-def select_squad(
-    selection: SquadSelection,
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
-):
-    # ========== فحص قفل التغييرات من الأدمن ==========
-    settings = session.get(SystemSettings, 1)
-    if settings and not settings.allow_transfers:
-        raise HTTPException(
-            status_code=403,
-            detail="Transfers and team modifications are currently LOCKED by the admin."
-        )
-    # =================================================
-    if len(selection.player_ids) != 5:
-        raise HTTPException(status_code=400, detail="Must select exactly 5 players")
-
-    if selection.captain_id not in selection.player_ids:
-        raise HTTPException(status_code=400, detail="Captain must be in your squad")
-
-    players = [session.get(Player, pid) for pid in selection.player_ids]
-    if any(p is None for p in players):
-        raise HTTPException(status_code=404, detail="One or more players not found")
-
-    positions = [p.position for p in players]
-    gk_count = positions.count("GK")
-    def_count = positions.count("DEF")
-    mid_count = positions.count("MID")
-    att_count = positions.count("ATT")
-
-    # ========== الشروط الجديدة للمراكز ==========
-    if gk_count != 1:
-        raise HTTPException(status_code=400, detail="Squad must have exactly 1 GK")
-    if not (1 <= def_count <= 3):
-        raise HTTPException(status_code=400, detail="You need 1 to 3 Defenders (DEF)")
-    if not (1 <= mid_count <= 3):
-        raise HTTPException(status_code=400, detail="You need 1 to 3 Midfielders (MID)")
-    if not (1 <= att_count <= 3):
-        raise HTTPException(status_code=400, detail="You need 1 to 3 Attackers (ATT)")
-    # ============================================
-
-    total_cost = sum(p.price for p in players)
-    team = session.exec(
-        select(FantasyTeam).where(FantasyTeam.manager_id == current_user.id)
-    ).first()
-
-    if not team:
-        raise HTTPException(status_code=404, detail="Fantasy team not found")
+class SquadValidation(BaseModel):
+    valid: bool
+    errors: List[str]
+    total_cost: float
+    budget_remaining: float
+    transfers_made: int
+    transfer_penalty: int
 
-    if total_cost > 50.0:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Total cost {total_cost:.1f}M exceeds budget of 50M"
-        )
 
-    gw = session.get(Gameweek, selection.gameweek_id)
-    if not gw:
-        raise HTTPException(status_code=404, detail="Gameweek not found")
+def _validation_response(check) -> SquadValidation:
+    return SquadValidation(
+        valid=check.valid,
+        errors=[detail for _, detail in check.errors],
+        total_cost=check.total_cost,
+        budget_remaining=check.budget_remaining,
+        transfers_made=check.transfers_made,
+        transfer_penalty=check.transfer_penalty,
+    )
 
-    # ========== التعديل الجديد: منع التعديل بعد الديدلاين ==========
-    if datetime.utcnow() > gw.deadline:
-        raise HTTPException(
-            status_code=403, 
-            detail="The deadline has passed! You cannot make changes to your squad for this Gameweek."
-        )
-    # ===============================================================
 
-    existing_tgw = session.exec(
-        select(FantasyTeamGameweek).where(
-            (FantasyTeamGameweek.fantasy_team_id == team.id)
-            & (FantasyTeamGameweek.gameweek_id == selection.gameweek_id)
-        )
-    ).first()
+@router.post("/my/validate", response_model=SquadValidation)
+def validate_selection(
+    selection: SquadSelection,
+    current_user: Principal = Depends(get_read_only_user),
+    session: Session = Depends(get_session),
+):
+    """Dry run of /my/select for the squad page; served from caches, nothing is saved."""
+    context = squad_context_cache.get(session, current_user.id, selection.gameweek_id)
+    check = validate_squad(
+        selection.player_ids, selection.captain_id,
+        player_catalogue.get(session).by_id, context, datetime.utcnow(),
+    )
+    return _validation_response(check)
 
-    transfers_made = 0
-    transfer_penalty = 0
 
-    if existing_tgw:
-        old_ids = {
-            existing_tgw.player1_id,
-            existing_tgw.player2_id,
-            existing_tgw.player3_id,
-            existing_tgw.player4_id,
-            existing_tgw.player5_id,
-        }
-        new_ids = set(selection.player_ids)
-        transfers_made = len(new_ids - old_ids)
-        free_used = min(transfers_made, team.free_transfers)
-        extra = max(0, transfers_made - free_used)
-        transfer_penalty = extra * 4
-        tgw = existing_tgw
-    else:
-        tgw = FantasyTeamGameweek(
-            fantasy_team_id=team.id,
-            gameweek_id=selection.gameweek_id,
+@router.post("/my/select")
+def select_squad(
+    selection: SquadSelection,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    buffered = app_settings.SQUAD_WRITE_BUFFER_ENABLED
+    # الفريق والتشكيلة والجولة والإعدادات في query واحدة، واللعيبة من الكاش
+    context, team, existing_tgw = load_squad_context(
+        session, current_user.id, selection.gameweek_id, for_update=not buffered
+    )
+    check = validate_squad(
+        selection.player_ids, selection.captain_id,
+        player_catalogue.get(session).by_id, context, datetime.utcnow(),
+    )
+    if not check.valid:
+        status_code, detail = check.errors[0]
+        raise HTTPException(status_code=status_code, detail=detail)
+
+    if buffered:
+        # وقت الزحمة: بنسجل الطلب ونرد، والـ buffer بيكتب آخر نسخة بس
+        request = enqueue_selection(
+            session, current_user.id, selection.gameweek_id, selection.player_ids, selection.captain_id
         )
+        response.status_code = 202
+        return {
+            "message": "Squad save accepted",
+            "queued": True,
+            "request_id": request.id,
+            "transfers_made": check.transfers_made,
+            "transfer_penalty": check.transfer_penalty,
+            "budget_remaining": check.budget_remaining,
+        }
 
-    tgw.player1_id = selection.player_ids[0]
-    tgw.player2_id = selection.player_ids[1]
-    tgw.player3_id = selection.player_ids[2]
-    tgw.player4_id = selection.player_ids[3]
-    tgw.player5_id = selection.player_ids[4]
-    tgw.captain_id = selection.captain_id
-    tgw.transfers_made = transfers_made
-    tgw.transfer_penalty = transfer_penalty
-
-    team.budget_remaining = 50.0 - total_cost
-    if transfers_made > 0:
-        team.free_transfers = max(0, team.free_transfers - transfers_made)
-
-    session.add(tgw)
-    session.add(team)
+    apply_selection(
+        session, team, existing_tgw, selection.gameweek_id,
+        selection.player_ids, selection.captain_id, check,
+    )
     session.commit()
-    session.refresh(tgw)
+    squad_context_cache.invalidate(current_user.id)
 
     return {
         "message": "Squad saved successfully",
-        "transfers_made": transfers_made,
-        "transfer_penalty": transfer_penalty,
+        "transfers_made": check.transfers_made,
+        "transfer_penalty": check.transfer_penalty,
         "budget_remaining": team.budget_remaining,
     }
 
 
+class SquadSaveStatus(BaseModel):
+    request_id: int
+    gameweek_id: int
+    status: str  # pending / saved / superseded / rejected / failed
+    error: Optional[str]
+    attempts: int
+    acked_at: datetime
+    applied_at: Optional[datetime]
+
+
+# مع الـ write buffer الحفظ بيرجع 202 و request_id؛ هنا العميل يعرف الطلب اتكتب ولا لأ
+@router.get("/my/select/{request_id}", response_model=SquadSaveStatus)
+def squad_save_status(
+    request_id: int,
+    current_user: Principal = Depends(get_read_only_user),
+    session: Session = Depends(get_session),
+):
+    request = session.get(SquadSaveRequest, request_id)
+    if not request or request.manager_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Save request not found")
+    return SquadSaveStatus(
+        request_id=request.id,
+        gameweek_id=request.gameweek_id,
+        status=request.outcome if request.applied_at else "pending",
+        error=request.error,
+        attempts=request.attempts,
+        acked_at=request.acked_at,
+        applied_at=request.applied_at,
+    )
+
+
 @router.get("/my/history", response_model=List[TeamGameweekRead])
 def team_history(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_only_user),
     session: Session = Depends(get_session),
 ):
     team = session.exec(
@@ -227,7 +226,7 @@ def get_user_team_gameweek(
     username: str,
     gw_id: int,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_only_user),
 ):
     target_user = session.exec(select(User).where(User.username == username)).first()
     if not target_user:
@@ -1,3 +1,4 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -8,8 +9,93 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7
 
+    # كاش المستخدمين المسجلين؛ الـ TTL بيغطي التغييرات من workers تانية
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    # لو True، الـ routes اللي بتقرأ بس بتثق في username/is_admin اللي في التوكن
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
+
+    # routes القراءة الـ async على asyncpg (app/api/async_reads.py)
+    ASYNC_ROUTES_ENABLED: bool = False
+
+    # الـ pool بتاع Postgres (SQLite بيتجاهلهم)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 300
+    DB_POOL_PRE_PING: bool = True
+    DB_SSLMODE: str = "require"
+    # Vercel وأمثاله: NullPool (اتصال لكل request) وبدون prepared statements عشان pgbouncer
+    SERVERLESS_MODE: bool = False
+
+    # قياس الـ queries لكل request (headers + /api/metrics/db)
+    DB_SLOW_QUERY_MS: int = 200
+    DB_METRICS_HEADERS: bool = True
+
     BUDGET_LIMIT: float = 50.0
 
+    SCORING_JOB_WORKERS: int = 2
+    SCORING_JOB_MAX_ATTEMPTS: int = 3
+    # job حالته running من غير ما يخلص في المدة دي يعتبر worker بتاعه مات ويتاخد تاني
+    SCORING_JOB_STALE_SECONDS: int = 600
+
+    LEADERBOARD_CACHE_TTL_SECONDS: int = 30
+    LEAGUE_CACHE_MAX_LEAGUES: int = 1000
+    DASHBOARD_CACHE_TTL_SECONDS: int = 15
+    PLAYER_CATALOGUE_TTL_SECONDS: int = 60
+    SYSTEM_SETTINGS_REFRESH_SECONDS: int = 5
+    SQUAD_CONTEXT_CACHE_TTL_SECONDS: int = 30
+    SQUAD_CONTEXT_CACHE_MAX_ENTRIES: int = 10000
+
+    # زحمة الديدلاين: حفظ التشكيلات بيتجمع ويتكتب على دفعات
+    SQUAD_WRITE_BUFFER_ENABLED: bool = False
+    SQUAD_WRITE_BUFFER_FLUSH_MS: int = 300
+    SQUAD_WRITE_BUFFER_BATCH: int = 500
+    SQUAD_WRITE_BUFFER_IDLE_POLL_SECONDS: int = 5
+    # لو الكتابة فشلت لسبب مؤقت (زي database is locked) الطلب بيستنى ويتعاد، والمهلة بتتضاعف
+    SQUAD_WRITE_BUFFER_RETRY_SECONDS: float = 1.0
+    SQUAD_WRITE_BUFFER_MAX_RETRY_SECONDS: float = 60.0
+    SQUAD_WRITE_BUFFER_MAX_ATTEMPTS: int = 8
+
+    # تصدير بيانات الموسم (/api/exports): عدد الصفوف في كل دفعة من الـ cursor
+    EXPORT_BATCH_ROWS: int = 1000
+
+    # البروفايلر: مقفول افتراضياً، ولما يتفتح بياخد عينة من نسبة من الطلبات
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.05
+    PROFILING_INTERVAL_MS: int = 5
+    PROFILING_TRACES_PER_ROUTE: int = 10
+    PROFILING_MIN_DURATION_MS: int = 0
+
+    # bcrypt: الـ cost والـ process pool اللي بيحسبه وكاش الـ logins الناجحة
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 16
+    LOGIN_CACHE_TTL_SECONDS: int = 60
+    LOGIN_CACHE_MAX_ENTRIES: int = 10000
+
+    # التحقق من توكن Firebase: sdk أو certs (من غير الـ SDK) أو local للتجارب
+    FIREBASE_VERIFIER: str = "sdk"
+    FIREBASE_PROJECT_ID: Optional[str] = None
+    FIREBASE_CERTS_URL: str = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+    FIREBASE_CERTS_REFRESH_AHEAD_SECONDS: int = 300
+    FIREBASE_TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    FIREBASE_LOCAL_SECRET: Optional[str] = None
+
+    # /metrics بصيغة Prometheus؛ مقفول افتراضياً، ولو اتفتح حط METRICS_TOKEN عشان ميبقاش مكشوف
+    # مع أكتر من worker لازم فولدر مشترك للتجميع
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: Optional[str] = None
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_FLUSH_SECONDS: int = 5
+
+    @model_validator(mode="after")
+    def _check_firebase_local_secret(self):
+        # الـ local verifier لازم ليه سر لوحده؛ لو استخدم SECRET_KEY أي حد يعرفه يمضي توكنات JWT وFirebase الاتنين
+        if self.FIREBASE_VERIFIER == "local" and not self.FIREBASE_LOCAL_SECRET:
+            raise ValueError("FIREBASE_VERIFIER=local requires FIREBASE_LOCAL_SECRET")
+        return self
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -1,28 +1,158 @@
+import hashlib
 import os
+import uuid
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, StaticPool
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
+from typing import Optional
+
+from app.core.config import settings
+from app.core.db_metrics import instrument_engine
+from app.core.prometheus import TimedAsyncQueuePool, TimedQueuePool, register_pool
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = os.getenv("DATABASE_URL") or settings.DATABASE_URL
+
+
+def _is_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+
+def _pool_options(url) -> dict:
+    if _is_sqlite(url):
+        # SQLite في الذاكرة لازم connection واحدة وإلا كل connection بتشوف داتابيز فاضية
+        if url.database in (None, "", ":memory:"):
+            return {"poolclass": StaticPool}
+        return {}
+    if settings.SERVERLESS_MODE:
+        # كل invocation عمرها قصير: الـ pooling شغلة pgbouncer/Neon مش الـ process
+        return {"poolclass": NullPool}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        # بيجدد الاتصال قبل ما Neon/Vercel يقطعوه
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        # بيتأكد إن الاتصال "صاحي" قبل ما يبعت أي Query (بيحل مشكلة الـ closed unexpectedly)
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _sslmode(url) -> str:
+    # الـ sslmode اللي في الـ URL (زي بتاع Neon) أولى من الإعداد
+    return url.query.get("sslmode") or settings.DB_SSLMODE
+
+
+def engine_options(url) -> dict:
+    url = make_url(url)
+    if _is_sqlite(url):
+        connect_args = {"check_same_thread": False}
+    else:
+        # Neon بيشترط SSL للاتصال السحابي
+        connect_args = {"sslmode": _sslmode(url)} if _sslmode(url) else {}
+    options = _pool_options(url)
+    # QueuePool عادي بس بيسجل وقت الانتظار على الـ pool
+    options.setdefault("poolclass", TimedQueuePool)
+    return {"connect_args": connect_args, **options}
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+instrument_engine(engine)
+register_pool("sync", engine)
+
+# الـ engine الـ async (asyncpg) بيتعمل أول ما route async تحتاجه بس
+_async_engine = None
+
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL is missing from .env file!")
+def async_database_url(url: str):
+    """Same database, async driver: asyncpg for Postgres, aiosqlite for SQLite."""
+    url = make_url(url)
+    if _is_sqlite(url):
+        return url.set(drivername="sqlite+aiosqlite")
+    # asyncpg مبيفهمش sslmode/channel_binding بتوع Neon، الـ SSL بيتبعت في connect_args
+    return url.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode", "channel_binding"])
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        url = make_url(DATABASE_URL)
+        connect_args = {} if _is_sqlite(url) or not _sslmode(url) else {"ssl": _sslmode(url)}
+        if settings.SERVERLESS_MODE and not _is_sqlite(url):
+            # pgbouncer في transaction mode مبيضمنش نفس الـ backend: مفيش statement cache
+            # وأسماء الـ prepared statements لازم تبقى unique
+            connect_args.update({
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            })
+        options = _pool_options(url)
+        options.setdefault("poolclass", TimedAsyncQueuePool)
+        _async_engine = create_async_engine(
+            async_database_url(DATABASE_URL), connect_args=connect_args, **options
+        )
+        instrument_engine(_async_engine.sync_engine)
+        register_pool("async", _async_engine.sync_engine)
+    return _async_engine
+
+
+async def dispose_async_engine():
+    if _async_engine is not None:
+        await _async_engine.dispose()
 
-# التعديل السحري هنا
-engine = create_engine(
-    DATABASE_URL,
-    # 1. بنجبره يستخدم SSL عشان Neon بيشترط ده للاتصال السحابي
-    connect_args={"sslmode": "require"}, 
-    # 2. بيتأكد إن الاتصال "صاحي" قبل ما يبعت أي Query (بيحل مشكلة الـ closed unexpectedly)
-    pool_pre_ping=True, 
-    # 3. بيجدد الاتصال كل 5 دقائق عشان Vercel ما يقطعوش
-    pool_recycle=300 
-)
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+
+async def get_async_session():
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+def schema_fingerprint() -> str:
+    """sha256 of the DDL create_all would emit for every table and index."""
+    import app.models.models  # noqa: F401 -- بيسجل كل الجداول في الـ metadata
+    ddl = []
+    for table in SQLModel.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=engine.dialect)))
+        ddl.extend(str(CreateIndex(index).compile(dialect=engine.dialect)) for index in
+                   sorted(table.indexes, key=lambda index: index.name or ""))
+    return hashlib.sha256("\n".join(ddl).encode()).hexdigest()
+
+
+def _stored_fingerprint() -> Optional[str]:
+    from app.models.models import SchemaVersion
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(SchemaVersion.fingerprint).where(SchemaVersion.id == 1)).scalar()
+    except (OperationalError, ProgrammingError):
+        # لسه مفيش جدول schemaversion
+        return None
+
+
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)    
\ No newline at end of file
+    """
+    create_all, unless the stored schema marker already matches the models:
+    then startup costs one SELECT instead of a has_table check per table.
+    """
+    from app.models.models import SchemaVersion
+    fingerprint = schema_fingerprint()
+    if _stored_fingerprint() == fingerprint:
+        return
+    SQLModel.metadata.create_all(engine)
+    try:
+        with Session(engine) as session:
+            session.merge(SchemaVersion(id=1, fingerprint=fingerprint))
+            session.commit()
+    except IntegrityError:
+        # worker تاني سبقنا وكتب نفس الـ marker
+        pass
@@ -0,0 +1,159 @@
+"""
+Database Query Metrics
+Counts statements and time spent in the database, per request and per route,
+using engine event hooks. QueryMetricsMiddleware opens a scope for every HTTP
+request and reports it in X-DB-Query-Count / X-DB-Time-Ms headers; the route
+totals and the slowest statements are served by /api/metrics/db.
+"""
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    slow: list = field(default_factory=list)
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    queries: int = 0
+    db_ms: float = 0.0
+    max_queries: int = 0
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+_lock = threading.Lock()
+_routes: dict[str, RouteStats] = {}
+_slowest: deque = deque(maxlen=50)
+_totals = {"queries": 0, "db_ms": 0.0}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+    slow = elapsed_ms >= settings.DB_SLOW_QUERY_MS
+    with _lock:
+        _totals["queries"] += 1
+        _totals["db_ms"] += elapsed_ms
+        if slow:
+            _slowest.append({
+                "statement": " ".join(statement.split())[:500],
+                "ms": round(elapsed_ms, 2),
+                "executemany": executemany,
+                "at": time.time(),
+            })
+    if slow and stats is not None:
+        stats.slow.append(round(elapsed_ms, 2))
+
+
+def _handle_error(context):
+    # الـ statement فشل فمفيش after_cursor_execute، نشيل وقت البداية بتاعه
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine) -> None:
+    """Attach the timing hooks; pass async engines' `sync_engine`."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def current_stats() -> Optional[QueryStats]:
+    """The stats of the request being served, if it's inside QueryMetricsMiddleware."""
+    return _current.get()
+
+
+def record_route(route: str, stats: QueryStats) -> None:
+    with _lock:
+        entry = _routes.setdefault(route, RouteStats())
+        entry.requests += 1
+        entry.queries += stats.count
+        entry.db_ms += stats.total_ms
+        entry.max_queries = max(entry.max_queries, stats.count)
+
+
+def snapshot() -> dict:
+    with _lock:
+        routes = {
+            route: {
+                "requests": s.requests,
+                "avg_queries": round(s.queries / s.requests, 2),
+                "max_queries": s.max_queries,
+                "avg_db_ms": round(s.db_ms / s.requests, 2),
+            }
+            for route, s in _routes.items()
+        }
+        return {
+            "total_queries": _totals["queries"],
+            "total_db_ms": round(_totals["db_ms"], 2),
+            "routes": dict(sorted(routes.items(), key=lambda kv: -kv[1]["avg_queries"])),
+            "slow_statements": sorted(_slowest, key=lambda q: -q["ms"]),
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _routes.clear()
+        _slowest.clear()
+        _totals.update(queries=0, db_ms=0.0)
+
+
+class QueryMetricsMiddleware:
+    """
+    Plain ASGI middleware (not BaseHTTPMiddleware) so the context variable set
+    here is the one the endpoint, and its threadpool worker, actually see.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and settings.DB_METRICS_HEADERS:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.total_ms:.1f}".encode()))
+                if stats.slow:
+                    headers.append((b"x-db-slow-queries", str(len(stats.slow)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            # paths من غير route (404) بتتجمع مع بعض عشان الـ dict ما يكبرش
+            path = getattr(route, "path", None) or "<unmatched>"
+            record_route(f'{scope["method"]} {path}', stats)
@@ -0,0 +1,300 @@
+"""
+Firebase ID Tokens
+Verifies the Google sign-in tokens the frontend sends to /api/auth/firebase.
+Which verifier runs is set by FIREBASE_VERIFIER:
+
+    sdk    firebase_admin.auth.verify_id_token; the SDK is imported and
+           initialized on the first sign-in, not at startup
+    certs  checks the RS256 signature against Google's published certificates
+           directly (no SDK), caching them with refresh-ahead
+    local  HS256 tokens signed with FIREBASE_LOCAL_SECRET, for tests and
+           benchmarks (see issue_local_token)
+
+Verified claims are cached until the token's exp either way.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+
+# سماحية فرق الساعة بين السيرفر وجوجل
+CLOCK_SKEW_SECONDS = 60
+# توكن بـ kid مش معروف بيجيب الشهادات تاني، بس مش أكتر من مرة في الدقيقة
+FORCED_REFRESH_INTERVAL_SECONDS = 60
+
+
+class InvalidFirebaseToken(Exception):
+    pass
+
+
+def _credentials_info() -> Optional[dict]:
+    """Service account JSON from FIREBASE_JSON_CREDS (Vercel) or firebase-adminsdk.json (local)."""
+    firebase_env = os.environ.get("FIREBASE_JSON_CREDS")
+    if firebase_env:
+        return json.loads(firebase_env)
+    if os.path.exists("firebase-adminsdk.json"):
+        with open("firebase-adminsdk.json") as f:
+            return json.load(f)
+    return None
+
+
+def project_id() -> Optional[str]:
+    if settings.FIREBASE_PROJECT_ID:
+        return settings.FIREBASE_PROJECT_ID
+    try:
+        info = _credentials_info()
+    except (OSError, ValueError):
+        return None
+    return info.get("project_id") if info else None
+
+
+class SdkVerifier:
+    """firebase_admin, imported and initialized on first use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._auth = None
+
+    def _firebase_auth(self):
+        with self._lock:
+            if self._auth is None:
+                import firebase_admin
+                from firebase_admin import auth as firebase_auth, credentials
+
+                # التحقق مما إذا كان Firebase Admin قد تم تهيئته مسبقاً
+                if not firebase_admin._apps:
+                    try:
+                        info = _credentials_info()
+                        if info:
+                            firebase_admin.initialize_app(credentials.Certificate(info))
+                            print("Firebase initialized")
+                        else:
+                            print("No Firebase credentials found!")
+                    except Exception as e:
+                        print(f"Firebase initialization error: {e}")
+                self._auth = firebase_auth
+            return self._auth
+
+    def verify(self, token: str) -> dict:
+        firebase_auth = self._firebase_auth()
+        try:
+            return firebase_auth.verify_id_token(token)
+        except Exception as e:
+            raise InvalidFirebaseToken(str(e)) from e
+
+
+class GoogleCerts:
+    """
+    Google's signing certificates, kept for the max-age Google sends. Within
+    `refresh_ahead` seconds of expiry a background refresh starts while the
+    current set keeps serving, so sign-ins never wait on the fetch.
+    """
+
+    def __init__(self, url: str, refresh_ahead: int):
+        self._lock = threading.Lock()
+        self._url = url
+        self._refresh_ahead = refresh_ahead
+        self._keys: dict = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._refreshing = False
+
+    def _fetch(self) -> None:
+        import httpx
+
+        response = httpx.get(self._url, timeout=10)
+        response.raise_for_status()
+        max_age = 3600
+        for part in response.headers.get("cache-control", "").split(","):
+            name, _, value = part.strip().partition("=")
+            if name == "max-age" and value.isdigit():
+                max_age = int(value)
+        with self._lock:
+            self._keys = response.json()
+            self._fetched_at = time.time()
+            self._expires_at = self._fetched_at + max_age
+
+    def _refresh_in_background(self) -> None:
+        def run():
+            try:
+                self._fetch()
+            except Exception as e:
+                print(f"⚠️ Firebase certificates refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="firebase-certs", daemon=True).start()
+
+    def keys(self, force: bool = False) -> dict:
+        now = time.time()
+        with self._lock:
+            keys, expires_at = self._keys, self._expires_at
+            force = force and now - self._fetched_at >= FORCED_REFRESH_INTERVAL_SECONDS
+            start_background = (
+                not force and keys and now < expires_at
+                and now >= expires_at - self._refresh_ahead and not self._refreshing
+            )
+            if start_background:
+                self._refreshing = True
+        if start_background:
+            self._refresh_in_background()
+        if force or not keys or now >= expires_at:
+            self._fetch()
+            with self._lock:
+                keys = self._keys
+        return keys
+
+
+class StaticKeys:
+    def __init__(self, keys: dict):
+        self._keys = keys
+
+    def keys(self, force: bool = False) -> dict:
+        return self._keys
+
+
+class JwtVerifier:
+    """Checks signature and the claims Firebase documents for ID tokens."""
+
+    def __init__(self, key_source, algorithm: str, audience: Optional[str]):
+        self._key_source = key_source
+        self._algorithm = algorithm
+        self._audience = audience
+
+    def verify(self, token: str) -> dict:
+        from jose import JWTError, jwt
+
+        if not self._audience:
+            raise InvalidFirebaseToken("FIREBASE_PROJECT_ID is not configured")
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except JWTError as e:
+            raise InvalidFirebaseToken(str(e)) from e
+        keys = self._key_source.keys()
+        if kid not in keys:
+            # ممكن جوجل لسه مغيرة المفاتيح: نجيبهم تاني مرة واحدة
+            keys = self._key_source.keys(force=True)
+        if kid not in keys:
+            raise InvalidFirebaseToken("Unknown signing key")
+        try:
+            claims = jwt.decode(
+                token, keys[kid], algorithms=[self._algorithm], audience=self._audience,
+                issuer=f"https://securetoken.google.com/{self._audience}",
+                options={"leeway": CLOCK_SKEW_SECONDS},
+            )
+        except JWTError as e:
+            raise InvalidFirebaseToken(str(e)) from e
+        if not claims.get("sub"):
+            raise InvalidFirebaseToken("Token has no subject")
+        if claims.get("auth_time", 0) > time.time() + CLOCK_SKEW_SECONDS:
+            raise InvalidFirebaseToken("Token auth_time is in the future")
+        claims.setdefault("uid", claims["sub"])
+        return claims
+
+
+def _local_secret() -> str:
+    # مش بنرجع لـ SECRET_KEY أبداً: ده مفتاح توكنات الـ API نفسها
+    if not settings.FIREBASE_LOCAL_SECRET:
+        raise ValueError("The local Firebase verifier requires FIREBASE_LOCAL_SECRET")
+    return settings.FIREBASE_LOCAL_SECRET
+
+
+def issue_local_token(email: str, uid: Optional[str] = None, expires_in: int = 3600) -> str:
+    """A token the `local` verifier accepts; for tests and benchmarks only."""
+    from jose import jwt
+
+    audience = project_id() or "local-project"
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{audience}",
+        "aud": audience,
+        "sub": uid or hashlib.sha256(email.encode()).hexdigest()[:28],
+        "email": email,
+        "email_verified": True,
+        "iat": now,
+        "auth_time": now,
+        "exp": now + expires_in,
+    }
+    return jwt.encode(claims, _local_secret(), algorithm="HS256", headers={"kid": "local"})
+
+
+def build_verifier(kind: str):
+    if kind == "sdk":
+        return SdkVerifier()
+    if kind == "certs":
+        certs = GoogleCerts(settings.FIREBASE_CERTS_URL, settings.FIREBASE_CERTS_REFRESH_AHEAD_SECONDS)
+        return JwtVerifier(certs, "RS256", project_id())
+    if kind == "local":
+        return JwtVerifier(StaticKeys({"local": _local_secret()}), "HS256", project_id() or "local-project")
+    raise ValueError(f"Unknown FIREBASE_VERIFIER: {kind}")
+
+
+class ClaimsCache:
+    """sha256(token) -> claims, until the token's exp."""
+
+    def __init__(self, max_entries: int):
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                return None
+            if time.time() >= cached[0]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return cached[1]
+
+    def put(self, key: str, claims: dict) -> None:
+        expires_at = claims.get("exp")
+        if not expires_at:
+            return
+        with self._lock:
+            self._entries[key] = (float(expires_at), claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+claims_cache = ClaimsCache(max_entries=settings.FIREBASE_TOKEN_CACHE_MAX_ENTRIES)
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier():
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            _verifier = build_verifier(settings.FIREBASE_VERIFIER)
+        return _verifier
+
+
+def set_verifier(verifier) -> None:
+    """Swap the verifier (tests); drops cached claims from the previous one."""
+    global _verifier
+    with _verifier_lock:
+        _verifier = verifier
+    claims_cache.clear()
+
+
+def verify_firebase_token(token: str) -> dict:
+    """Decoded claims of a valid ID token; raises InvalidFirebaseToken otherwise."""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    claims = claims_cache.get(key)
+    if claims is None:
+        claims = get_verifier().verify(token)
+        claims_cache.put(key, claims)
+    return claims
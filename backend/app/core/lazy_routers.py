@@ -0,0 +1,62 @@
+"""
+Lazy Routers
+Each API module is imported, and its router included, on the first request
+under its prefix, so a cold start only pays for the routers it serves.
+/docs, /redoc and /openapi.json load every router first, so the schema is
+always complete.
+"""
+import importlib
+import threading
+
+from fastapi import FastAPI
+
+ALL_ROUTES_PATHS = ("/docs", "/redoc", "/openapi.json")
+
+
+class LazyRouters:
+    def __init__(self, app: FastAPI, routers: dict[str, tuple[str, str]]):
+        # prefix -> (module, router attribute)
+        self._app = app
+        self._routers = routers
+        self._loaded: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _prefix_for(self, path: str):
+        for prefix in self._routers:
+            if path == prefix or path.startswith(prefix + "/"):
+                return prefix
+        return None
+
+    def load(self, prefix: str) -> None:
+        if prefix in self._loaded:
+            return
+        with self._lock:
+            if prefix in self._loaded:
+                return
+            module_name, attribute = self._routers[prefix]
+            self._app.include_router(getattr(importlib.import_module(module_name), attribute))
+            self._loaded.add(prefix)
+
+    def load_all(self) -> None:
+        for prefix in self._routers:
+            self.load(prefix)
+
+    def load_for(self, path: str) -> None:
+        if path.startswith(ALL_ROUTES_PATHS):
+            self.load_all()
+            return
+        prefix = self._prefix_for(path)
+        if prefix is not None:
+            self.load(prefix)
+
+
+class LazyRouterMiddleware:
+    def __init__(self, app, routers: LazyRouters):
+        self.app = app
+        self.routers = routers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            # الـ import بيحصل مرة واحدة لكل router، فمش مستاهل thread
+            self.routers.load_for(scope["path"])
+        await self.app(scope, receive, send)
@@ -0,0 +1,86 @@
+"""
+Maintenance Mode
+ASGI middleware that answers 503 for everyone but admins while
+maintenance_mode is on. It reads the in-memory settings snapshot; admins are
+resolved like get_current_admin, through the principal cache and its token
+version check, falling back to the database on a miss.
+"""
+from typing import Optional
+
+import anyio
+from fastapi import HTTPException
+from sqlmodel import Session
+from starlette.responses import JSONResponse
+
+from app.core import database
+from app.core.principals import principal_cache
+from app.core.security import _load_principal, decode_token
+from app.services.system_settings import system_settings
+
+# لازم تفضل شغالة: تسجيل الدخول، حالة الصيانة نفسها (الفرونت بيسأل عليها) والـ health والـ metrics
+ALLOWED_PREFIXES = (
+    "/api/auth/", "/api/stats/settings", "/api/health", "/metrics", "/docs", "/redoc", "/openapi.json",
+)
+
+
+def _token_payload(scope) -> Optional[dict]:
+    headers = dict(scope.get("headers", []))
+    scheme, _, token = headers.get(b"authorization", b"").decode().partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_token(token)
+    if not payload or payload.get("sub") is None or payload.get("ver") is None:
+        return None
+    return payload
+
+
+def _load_is_admin(payload: dict) -> bool:
+    with Session(database.engine) as session:
+        try:
+            return _load_principal(session, payload).is_admin
+        except HTTPException:
+            return False
+
+
+async def _is_admin(scope) -> bool:
+    payload = _token_payload(scope)
+    if payload is None:
+        return False
+    # مش بنثق في claim الـ adm: أدمن اتشالت صلاحيته لازم يتمنع فوراً ❌
+    principal = principal_cache.get(int(payload["sub"]), payload["ver"])
+    if principal is not None:
+        return principal.is_admin
+    return await anyio.to_thread.run_sync(_load_is_admin, payload)
+
+
+class MaintenanceMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        snapshot = system_settings.current()
+        if system_settings.is_stale():
+            try:
+                snapshot = await anyio.to_thread.run_sync(system_settings.get)
+            except Exception:
+                pass
+
+        path = scope["path"]
+        if (
+            snapshot is not None
+            and snapshot.maintenance_mode
+            and path != "/"
+            and not path.startswith(ALLOWED_PREFIXES)
+            and not await _is_admin(scope)
+        ):
+            response = JSONResponse(
+                {"detail": "The site is under maintenance. Please try again later.", "maintenance_mode": True},
+                status_code=503,
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,199 @@
+"""
+Password Hashing
+bcrypt runs in a small dedicated process pool, so a burst of sign-ups or
+logins burns those CPUs instead of stalling the threadpool that serves every
+other request. At most PASSWORD_HASH_MAX_PENDING calls wait on the pool;
+past that the API answers 503 straight away. A successful login is
+remembered for LOGIN_CACHE_TTL_SECONDS (as an HMAC, never the password), and
+hashes made with a different BCRYPT_ROUNDS are upgraded on the next login.
+"""
+import hashlib
+import hmac
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+_pwd_context = None
+_pwd_context_lock = threading.Lock()
+
+
+def get_pwd_context():
+    """The bcrypt CryptContext; passlib is imported on first use, not at startup."""
+    global _pwd_context
+    with _pwd_context_lock:
+        if _pwd_context is None:
+            from passlib.context import CryptContext
+
+            # min = max = default: أي hash بـ cost تاني بيتعمله rehash في أول login
+            _pwd_context = CryptContext(
+                schemes=["bcrypt"],
+                deprecated="auto",
+                bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+                bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+                bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+            )
+        return _pwd_context
+
+
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return get_pwd_context().verify_and_update(password, hashed_password)
+
+
+class HashingPool:
+    """
+    A ProcessPoolExecutor with a cap on calls in flight. With workers=0 (or
+    where processes can't be started, like some serverless runtimes) the
+    work runs in the calling thread and only the cap applies.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._max_pending = max_pending
+        self._pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inline = workers <= 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._inline:
+            return None
+        if self._executor is None:
+            try:
+                # spawn مش fork: الـ fork من process فيها threads ممكن يعلّق الـ child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+            except (OSError, NotImplementedError) as e:
+                print(f"⚠️ Password hashing pool unavailable, hashing inline: {e}")
+                self._inline = True
+        return self._executor
+
+    def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self._max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many sign-ins right now. Please try again in a moment.",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            executor = self._get_executor()
+        try:
+            if executor is None:
+                return fn(*args)
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                # worker مات (OOM مثلاً): الـ executor ده مبقاش ينفع، نعمل واحد جديد ونجرب مرة كمان
+                executor = self._replace_executor(executor)
+            if executor is None:
+                return fn(*args)
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                self._replace_executor(executor)
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Sign-in is temporarily unavailable. Please try again in a moment.",
+                    headers={"Retry-After": "1"},
+                )
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _replace_executor(self, broken: ProcessPoolExecutor) -> Optional[ProcessPoolExecutor]:
+        """Drop a broken executor (unless another call already did) and return the current one."""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+            executor = self._get_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+        return executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LoginCache:
+    """user id -> (verified at, stored hash, HMAC of the password) for recent good logins."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[int, tuple[float, str, bytes]] = OrderedDict()
+
+    @staticmethod
+    def _digest(password: str, hashed_password: str) -> bytes:
+        return hmac.new(
+            settings.SECRET_KEY.encode(), f"{hashed_password}\0{password}".encode(), hashlib.sha256
+        ).digest()
+
+    def check(self, user_id: int, password: str, hashed_password: str) -> bool:
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached is None:
+                return False
+            verified_at, cached_hash, digest = cached
+            if time.monotonic() - verified_at >= self._ttl_seconds or cached_hash != hashed_password:
+                del self._entries[user_id]
+                return False
+        return hmac.compare_digest(digest, self._digest(password, hashed_password))
+
+    def remember(self, user_id: int, password: str, hashed_password: str) -> None:
+        if self._ttl_seconds <= 0:
+            return
+        digest = self._digest(password, hashed_password)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), hashed_password, digest)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+hashing_pool = HashingPool(workers=settings.PASSWORD_HASH_WORKERS, max_pending=settings.PASSWORD_HASH_MAX_PENDING)
+login_cache = LoginCache(max_entries=settings.LOGIN_CACHE_MAX_ENTRIES, ttl_seconds=settings.LOGIN_CACHE_TTL_SECONDS)
+
+
+def hash_password(password: str) -> str:
+    """bcrypt hash computed in the hashing pool (503 when it's saturated)."""
+    return hashing_pool.run(_hash, password)
+
+
+def check_password(user_id: int, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    (valid, new_hash). new_hash is set when the stored hash used another cost
+    and should be replaced; the caller saves it.
+    """
+    if login_cache.check(user_id, password, hashed_password):
+        return True, None
+    valid, new_hash = hashing_pool.run(_verify_and_update, password, hashed_password)
+    if valid:
+        login_cache.remember(user_id, password, new_hash or hashed_password)
+    return valid, new_hash
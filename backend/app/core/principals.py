@@ -0,0 +1,91 @@
+"""
+Authenticated Principals
+Small in-process cache of the user fields the API needs on every request, so
+get_current_user doesn't hit the database for each call.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+from app.core.prometheus import record_cache
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    is_admin: bool
+    token_version: str
+    email: Optional[str] = None
+
+
+def token_version(user) -> str:
+    """
+    Short fingerprint of the credentials a token was issued against. Changing
+    the password or the admin flag changes it, which revokes older tokens.
+    """
+    raw = f"{user.hashed_password}:{int(bool(user.is_admin))}".encode()
+    return hashlib.blake2b(raw, digest_size=6).hexdigest()
+
+
+def principal_from_user(user) -> Principal:
+    return Principal(
+        id=user.id,
+        username=user.username,
+        is_admin=user.is_admin,
+        token_version=token_version(user),
+        email=user.email,
+    )
+
+
+class PrincipalCache:
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        # user_id -> (cached at, principal)
+        self._entries: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+
+    def get(self, user_id: int, version: Optional[str]) -> Optional[Principal]:
+        """Cached principal for the user, if fresh and issued for `version`."""
+        principal = self._lookup(user_id, version)
+        record_cache("principal", principal is not None)
+        return principal
+
+    def _lookup(self, user_id: int, version: Optional[str]) -> Optional[Principal]:
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached is None:
+                return None
+            cached_at, principal = cached
+            if time.monotonic() - cached_at >= self._ttl_seconds:
+                del self._entries[user_id]
+                return None
+            if version is not None and principal.token_version != version:
+                return None
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def put(self, principal: Principal) -> None:
+        with self._lock:
+            self._entries[principal.id] = (time.monotonic(), principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,209 @@
+"""
+Request Profiling
+Opt-in sampling profiler. ProfilingMiddleware picks a fraction of requests;
+while one is in flight a background thread samples the stacks of the threads
+serving it (the event loop plus every worker thread that ran a query for it).
+Each trace keeps its wall-clock stacks, DB time and query count, and the
+slowest traces per route are served by /api/metrics/profiles, including as
+collapsed stacks for flamegraph.pl or speedscope.
+"""
+import heapq
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import db_metrics
+from app.core.config import settings
+
+# فريمات من برا المشروع بس (زي الـ worker وهو مستني شغل) ما بتتحسبش
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@dataclass
+class Trace:
+    method: str
+    path: str
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    route: str = "<unmatched>"
+    status: Optional[int] = None
+    duration_ms: float = 0.0
+    db_ms: float = 0.0
+    queries: int = 0
+    threads: set = field(default_factory=set)
+    stacks: Counter = field(default_factory=Counter)
+
+    def summary(self) -> dict:
+        return {
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 2),
+            "db_ms": round(self.db_ms, 2),
+            "queries": self.queries,
+            "samples": sum(self.stacks.values()),
+        }
+
+
+_active: ContextVar[Optional[Trace]] = ContextVar("profiling_trace", default=None)
+
+
+def _register_thread(conn, cursor, statement, parameters, context, executemany):
+    # أي thread بيعمل query لطلب متعلم عليه بيدخل في العينات بتاعته
+    trace = _active.get()
+    if trace is not None:
+        trace.threads.add(threading.get_ident())
+
+
+def _collapse(frame) -> Optional[str]:
+    """root;...;leaf, or None when no frame belongs to the project."""
+    names = []
+    ours = False
+    while frame is not None:
+        code = frame.f_code
+        ours = ours or code.co_filename.startswith(PROJECT_ROOT)
+        names.append(f'{frame.f_globals.get("__name__", "?")}:{code.co_name}')
+        frame = frame.f_back
+    if not ours:
+        return None
+    return ";".join(reversed(names))
+
+
+class Sampler:
+    """One daemon thread that only runs while sampled requests are in flight."""
+
+    def __init__(self, interval_ms: int):
+        self._lock = threading.Lock()
+        self._interval = interval_ms / 1000
+        self._active: dict[int, Trace] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self, trace: Trace) -> None:
+        with self._lock:
+            self._active[id(trace)] = trace
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def end(self, trace: Trace) -> None:
+        with self._lock:
+            self._active.pop(id(trace), None)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self._interval)
+            with self._lock:
+                traces = list(self._active.values())
+                if not traces:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for trace in traces:
+                for thread_id in list(trace.threads):
+                    frame = frames.get(thread_id)
+                    stack = _collapse(frame) if frame is not None else None
+                    if stack is not None:
+                        trace.stacks[stack] += 1
+
+
+class TraceStore:
+    """The slowest `per_route` traces of each route (a bounded min-heap per route)."""
+
+    def __init__(self, per_route: int):
+        self._lock = threading.Lock()
+        self._per_route = per_route
+        self._routes: dict[str, list] = {}
+        self._sequence = itertools.count()
+
+    def add(self, trace: Trace) -> None:
+        entry = (trace.duration_ms, next(self._sequence), trace)
+        with self._lock:
+            heap = self._routes.setdefault(trace.route, [])
+            if len(heap) < self._per_route:
+                heapq.heappush(heap, entry)
+            elif entry[0] > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+
+    def _traces(self, route: Optional[str] = None) -> dict[str, list]:
+        with self._lock:
+            routes = {r: h for r, h in self._routes.items() if route is None or r == route}
+            return {r: [t for _, _, t in sorted(h, key=lambda e: -e[0])] for r, h in routes.items()}
+
+    def snapshot(self) -> dict:
+        traces = self._traces()
+        return {
+            route: [t.summary() for t in route_traces]
+            for route, route_traces in sorted(traces.items(), key=lambda kv: -kv[1][0].duration_ms)
+        }
+
+    def collapsed(self, route: Optional[str] = None) -> str:
+        """Stacks of the kept traces summed per route, one `stack count` line each."""
+        lines = []
+        for route_name, route_traces in sorted(self._traces(route).items()):
+            totals = Counter()
+            for trace in route_traces:
+                totals.update(trace.stacks)
+            lines.extend(f"{route_name};{stack} {count}" for stack, count in sorted(totals.items()))
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+sampler = Sampler(interval_ms=settings.PROFILING_INTERVAL_MS)
+traces = TraceStore(per_route=settings.PROFILING_TRACES_PER_ROUTE)
+
+
+class ProfilingMiddleware:
+    """
+    Only installed when PROFILING_ENABLED is set; a request that isn't
+    sampled costs one random() call. Must sit inside QueryMetricsMiddleware
+    so it can read the request's DB stats.
+    """
+
+    def __init__(self, app, sample_rate: Optional[float] = None):
+        self.app = app
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE if sample_rate is None else sample_rate
+        if not event.contains(Engine, "before_cursor_execute", _register_thread):
+            event.listen(Engine, "before_cursor_execute", _register_thread)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(method=scope["method"], path=scope["path"])
+        trace.threads.add(threading.get_ident())
+        token = _active.set(trace)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        sampler.begin(trace)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            sampler.end(trace)
+            _active.reset(token)
+            trace.duration_ms = (time.perf_counter() - started) * 1000
+            stats = db_metrics.current_stats()
+            if stats is not None:
+                trace.queries, trace.db_ms = stats.count, stats.total_ms
+            route = scope.get("route")
+            trace.route = f'{scope["method"]} {getattr(route, "path", None) or "<unmatched>"}'
+            if trace.duration_ms >= settings.PROFILING_MIN_DURATION_MS:
+                traces.add(trace)
@@ -0,0 +1,395 @@
+"""
+Prometheus Metrics
+A small dependency-free registry (counters, gauges, histograms) rendered in
+the Prometheus text format at /metrics: per-route request histograms,
+in-flight requests, DB pool usage and checkout wait, cache hit ratios and
+scoring / activation durations.
+
+Under several uvicorn workers set METRICS_MULTIPROC_DIR: every process writes
+its samples to <dir>/metrics-<pid>.json every METRICS_FLUSH_SECONDS and the
+worker that answers the scrape adds them up. A process removes its file at
+exit; files left behind by processes that died without cleaning up are skipped
+and removed at the next scrape.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+INF_LABEL = 'le="+Inf"'
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), self._copy(value)] for key, value in self._values.items()]
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # [عدد كل bucket (مش تراكمي)، المجموع، العدد]
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @staticmethod
+    def _copy(value):
+        return [list(value[0]), value[1], value[2]]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Called before every scrape / flush to refresh gauges (pool usage, hit ratios)."""
+        self._collectors.append(collector)
+
+    def collect(self) -> None:
+        for collector in self._collectors:
+            collector()
+
+    def dump(self) -> dict:
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    def metrics(self) -> list[Metric]:
+        return list(self._metrics.values())
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")))
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")))
+IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being served.", ("method",)))
+POOL_WAIT = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)))
+POOL_TIMEOUTS = registry.register(Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after pool_timeout.", ("engine",)))
+POOL_SIZE = registry.register(Gauge("db_pool_size", "Configured pool size.", ("engine",)))
+POOL_CHECKED_OUT = registry.register(Gauge("db_pool_checked_out", "Connections in use.", ("engine",)))
+POOL_OVERFLOW = registry.register(Gauge("db_pool_overflow", "Connections opened beyond pool_size.", ("engine",)))
+CACHE_REQUESTS = registry.register(Counter(
+    "app_cache_requests_total", "In-process cache lookups.", ("cache", "result")))
+CACHE_HIT_RATIO = registry.register(Gauge(
+    "app_cache_hit_ratio", "Hits / lookups since start, per cache.", ("cache",)))
+SCORING_JOB_DURATION = registry.register(Histogram(
+    "scoring_job_duration_seconds", "calculate-points job runtime.", ("status",), buckets=JOB_BUCKETS))
+ACTIVATION_DURATION = registry.register(Histogram(
+    "gameweek_activation_duration_seconds", "activate_gameweek runtime including the rollover.", (),
+    buckets=JOB_BUCKETS))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class _TimedCheckout:
+    """Records how long each checkout waited for a connection."""
+
+    engine_label = ""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc(engine=self.engine_label)
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started, engine=self.engine_label)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    engine_label = "sync"
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+
+def register_pool(label: str, engine) -> None:
+    def collect():
+        pool = engine.pool
+        # StaticPool / NullPool مالهمش الأرقام دي
+        if hasattr(pool, "checkedout"):
+            POOL_SIZE.set(pool.size(), engine=label)
+            POOL_CHECKED_OUT.set(pool.checkedout(), engine=label)
+            POOL_OVERFLOW.set(max(0, pool.overflow()), engine=label)
+
+    registry.add_collector(collect)
+
+
+# --- تجميع الـ workers -------------------------------------------------------
+
+_flush_lock = threading.Lock()
+_flush_stopped = threading.Event()
+
+
+def _process_file(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def flush(directory: Optional[str] = None) -> None:
+    """Write this process's samples for the other workers to read."""
+    directory = directory or settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return
+    registry.collect()
+    path = _process_file(directory, os.getpid())
+    tmp = f"{path}.tmp"
+    with _flush_lock:
+        if _flush_stopped.is_set():
+            return
+        with open(tmp, "w") as f:
+            json.dump({"pid": os.getpid(), "written_at": time.time(), "metrics": registry.dump()}, f)
+        os.replace(tmp, path)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_process_file(directory: str) -> None:
+    # الـ thread بيقف الأول عشان flush متأخر ما يرجعش الملف تاني
+    _flush_stopped.set()
+    with _flush_lock:
+        try:
+            os.remove(_process_file(directory, os.getpid()))
+        except FileNotFoundError:
+            pass
+
+
+def _other_processes(directory: str) -> list[dict]:
+    """Metrics of every other live process that has flushed."""
+    results = []
+    for name in os.listdir(directory):
+        if not (name.startswith("metrics-") and name.endswith(".json")):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if data.get("pid") == os.getpid():
+            continue
+        if not _alive(data["pid"]):
+            # worker مات من غير ما يمسح ملفه (SIGKILL / OOM)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        results.append(data["metrics"])
+    return results
+
+
+def _merge(metric: Metric, into: dict, samples: list) -> None:
+    for labels, value in samples:
+        key = tuple(labels)
+        current = into.get(key)
+        if metric.kind == "histogram":
+            if current is None:
+                into[key] = [list(value[0]), value[1], value[2]]
+            else:
+                current[0] = [a + b for a, b in zip(current[0], value[0])]
+                current[1] += value[1]
+                current[2] += value[2]
+        else:
+            into[key] = (current or 0.0) + value
+
+
+def _hit_ratios(values: dict) -> dict:
+    totals: dict = {}
+    for (cache, result), count in values.items():
+        hits, lookups = totals.get(cache, (0.0, 0.0))
+        totals[cache] = (hits + (count if result == "hit" else 0.0), lookups + count)
+    return {(cache,): hits / lookups for cache, (hits, lookups) in totals.items() if lookups}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+def render() -> str:
+    """The Prometheus text exposition of this process, plus the others in multiprocess mode."""
+    registry.collect()
+    directory = settings.METRICS_MULTIPROC_DIR
+    others = _other_processes(directory) if directory and os.path.isdir(directory) else []
+
+    lines, ratios = [], {}
+    for metric in registry.metrics():
+        if metric is CACHE_HIT_RATIO:
+            continue
+        values: dict = {}
+        _merge(metric, values, metric.dump())
+        for dumped in others:
+            _merge(metric, values, dumped.get(metric.name, []))
+        if metric is CACHE_REQUESTS:
+            # النسبة بتتحسب من العدادات بعد التجميع، مش متوسط نسب الـ workers
+            ratios = _hit_ratios(values)
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in sorted(values.items()):
+            if metric.kind == "histogram":
+                cumulative = 0
+                for bound, count in zip(metric.buckets, value[0]):
+                    cumulative += count
+                    le = f'le="{_format_bound(bound)}"'
+                    lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, key, le)} {cumulative}")
+                lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, key, INF_LABEL)} {value[2]}")
+                lines.append(f"{metric.name}_sum{_labels(metric.labelnames, key)} {value[1]}")
+                lines.append(f"{metric.name}_count{_labels(metric.labelnames, key)} {value[2]}")
+            else:
+                lines.append(f"{metric.name}{_labels(metric.labelnames, key)} {value}")
+
+    lines.append(f"# HELP {CACHE_HIT_RATIO.name} {CACHE_HIT_RATIO.documentation}")
+    lines.append(f"# TYPE {CACHE_HIT_RATIO.name} gauge")
+    for key, ratio in sorted(ratios.items()):
+        lines.append(f"{CACHE_HIT_RATIO.name}{_labels(CACHE_HIT_RATIO.labelnames, key)} {round(ratio, 6)}")
+    return "\n".join(lines) + "\n"
+
+
+def start_multiprocess_flush() -> None:
+    """Flush every METRICS_FLUSH_SECONDS; the file is removed at exit."""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+
+    def run():
+        while not _flush_stopped.wait(settings.METRICS_FLUSH_SECONDS):
+            try:
+                flush(directory)
+            except Exception as e:
+                print(f"⚠️ Metrics flush failed: {e}")
+
+    threading.Thread(target=run, name="metrics-flush", daemon=True).start()
+    atexit.register(_remove_process_file, directory)
+    flush(directory)
+
+
+class PrometheusMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(method=method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec(method=method)
+            route = scope.get("route")
+            # paths من غير route (404) بتتجمع عشان الـ labels ما تكترش
+            path = getattr(route, "path", None) or "<unmatched>"
+            REQUESTS.inc(method=method, route=path, status=status)
+            REQUEST_DURATION.observe(elapsed, method=method, route=path)
@@ -1,26 +1,28 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
-from app.core.database import get_session
+from app.core.database import get_async_session, get_session
+from app.core.passwords import get_pwd_context, login_cache
+from app.core.principals import Principal, principal_cache, principal_from_user, token_version
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
 
+# الاتنين دول بيشتغلوا في نفس الـ thread (للسكريبتات)؛ الـ routes بتستخدم app.core.passwords
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    from jose import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -30,33 +32,103 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
+def token_claims(user) -> dict:
+    """Claims for a user's access token: id, credentials version, name and role."""
+    return {
+        "sub": str(user.id),
+        "ver": token_version(user),
+        "username": user.username,
+        "adm": bool(user.is_admin),
+    }
+
+
 def decode_token(token: str) -> Optional[dict]:
+    # jose (ومعاه cryptography) بيتحمل مع أول توكن مش مع الـ import
+    from jose import JWTError, jwt
     try:
         return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
         return None
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
-    from app.models.models import User
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _token_payload(token: str) -> dict:
     payload = decode_token(token)
-    if payload is None:
-        raise credentials_exception
-    user_id: int = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
-    user = session.get(User, int(user_id))
+    # توكن من غير "ver" مينفعش يتلغي لما الباسورد أو الصلاحيات تتغير، فمبنقبلوش
+    if payload is None or payload.get("sub") is None or payload.get("ver") is None:
+        raise _credentials_exception()
+    return payload
+
+
+def _load_principal(session: Session, payload: dict) -> Principal:
+    from app.models.models import User
+    user_id, version = int(payload["sub"]), payload["ver"]
+    principal = principal_cache.get(user_id, version)
+    if principal is not None:
+        return principal
+
+    user = session.get(User, user_id)
     if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+    principal = principal_from_user(user)
+    # توكن قديم من قبل ما الباسورد أو الصلاحيات اتغيرت ❌
+    if principal.token_version != version:
+        raise _credentials_exception()
+    principal_cache.put(principal)
+    return principal
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> Principal:
+    return _load_principal(session, _token_payload(token))
+
+
+def _claims_principal(payload: dict) -> Optional[Principal]:
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and "username" in payload and "adm" in payload:
+        return Principal(
+            id=int(payload["sub"]),
+            username=payload["username"],
+            is_admin=bool(payload["adm"]),
+            token_version=payload["ver"],
+        )
+    return None
+
+
+def get_read_only_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> Principal:
+    """
+    Like get_current_user, but with AUTH_TRUST_TOKEN_CLAIMS enabled the
+    signed username/admin claims are used as-is. Only for routes that don't
+    write anything.
+    """
+    payload = _token_payload(token)
+    return _claims_principal(payload) or _load_principal(session, payload)
+
+
+async def get_read_only_user_async(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> Principal:
+    """get_read_only_user for the async routes; only a cache miss touches the database."""
+    payload = _token_payload(token)
+    principal = _claims_principal(payload) or principal_cache.get(int(payload["sub"]), payload["ver"])
+    if principal is not None:
+        return principal
+    return await session.run_sync(_load_principal, payload)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Call after changing a user's password or admin flag."""
+    principal_cache.invalidate(user_id)
+    login_cache.invalidate(user_id)
 
 
-def get_current_admin(current_user=Depends(get_current_user)):
+def get_current_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
@@ -1,5 +1,6 @@
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index, UniqueConstraint
 from datetime import datetime
 
 
@@ -133,4 +134,91 @@ class MVPVote(SQLModel, table=True):
     user_id: int = Field(foreign_key="user.id")
     first_place_id: int = Field(foreign_key="player.id")
     second_place_id: int = Field(foreign_key="player.id")
-    third_place_id: int = Field(foreign_key="player.id")
\ No newline at end of file
+    third_place_id: int = Field(foreign_key="player.id")
+
+class ScoringJob(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    gameweek_id: int = Field(foreign_key="gameweek.id", index=True)
+    status: str = Field(default="queued", index=True)  # queued / running / done / failed
+    stage: str = Field(default="")
+    progress: float = Field(default=0.0)
+    attempts: int = Field(default=0)
+    error: Optional[str] = None
+    report: str = Field(default="")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class GameweekRankSnapshot(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("gameweek_id", "fantasy_team_id"),
+        Index("ix_rank_snapshot_gw_rank", "gameweek_id", "gw_rank"),
+        Index("ix_rank_snapshot_team_gw", "fantasy_team_id", "gameweek_id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    gameweek_id: int = Field(foreign_key="gameweek.id")
+    fantasy_team_id: int = Field(foreign_key="fantasyteam.id")
+    gw_points: int = Field(default=0)
+    gw_rank: int
+    overall_points: int = Field(default=0)
+    overall_rank: int
+
+
+class PlayerOwnership(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("gameweek_id", "player_id"),
+        Index("ix_ownership_gw_owners", "gameweek_id", "owners"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    gameweek_id: int = Field(foreign_key="gameweek.id")
+    player_id: int = Field(foreign_key="player.id")
+    owners: int = Field(default=0)
+    captains: int = Field(default=0)
+    transfers_in: int = Field(default=0)
+    transfers_out: int = Field(default=0)
+
+
+class SquadSlot(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("team_gameweek_id", "slot"),
+        Index("ix_squad_slot_gw_player", "gameweek_id", "player_id"),
+        Index("ix_squad_slot_team_gw", "fantasy_team_id", "gameweek_id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    team_gameweek_id: int = Field(foreign_key="fantasyteamgameweek.id")
+    fantasy_team_id: int = Field(foreign_key="fantasyteam.id")
+    gameweek_id: int = Field(foreign_key="gameweek.id")
+    player_id: int = Field(foreign_key="player.id")
+    slot: int
+    is_captain: bool = Field(default=False)
+
+
+# حفظ تشكيلة اتقبل ومستني الـ write buffer يكتبه (وقت زحمة الديدلاين)
+class SquadSaveRequest(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_squad_save_pending", "applied_at", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    manager_id: int = Field(foreign_key="user.id")
+    gameweek_id: int = Field(foreign_key="gameweek.id")
+    player_ids: str  # JSON list
+    captain_id: int
+    acked_at: datetime = Field(default_factory=datetime.utcnow)
+    applied_at: Optional[datetime] = None
+    outcome: str = Field(default="")  # saved / superseded / rejected / failed
+    error: Optional[str] = None
+    attempts: int = Field(default=0)
+    retry_at: Optional[datetime] = None  # بعد خطأ مؤقت: مش قبل الوقت ده
+
+
+
+# بصمة الـ schema اللي اتعملها create_all آخر مرة؛ لو مطابقة الـ startup بيتخطاه
+class SchemaVersion(SQLModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    fingerprint: str
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
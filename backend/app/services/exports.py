@@ -0,0 +1,181 @@
+"""
+Season Exports
+Streams whole tables out for offline analysis. Every export opens its own
+Session inside the generator (the request's session is gone once streaming
+starts) and reads with yield_per, which is a server-side cursor on Postgres,
+so memory stays at one batch whatever the size of the season.
+
+Formats: ndjson and csv (optionally gzipped on the fly), and the columnar
+arrow (IPC stream) and parquet, which need the optional pyarrow package.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, select
+from sqlmodel import Session
+
+from app.core import database
+from app.core.config import settings
+from app.models.models import FantasyTeamGameweek, GameweekRankSnapshot, MatchStat, MVPVote
+
+DATASETS = {
+    "match_stats": MatchStat,
+    "team_gameweeks": FantasyTeamGameweek,
+    "mvp_votes": MVPVote,
+    "rank_snapshots": GameweekRankSnapshot,
+}
+TEXT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+COLUMNAR_FORMATS = {"arrow": "application/vnd.apache.arrow.stream", "parquet": "application/vnd.apache.parquet"}
+
+
+class ExportUnavailable(Exception):
+    """The format needs an optional package that isn't installed."""
+
+
+def _batches(model, gameweek_id: Optional[int]) -> Iterator[tuple[list[str], list]]:
+    """(column names, rows) per batch of EXPORT_BATCH_ROWS, in id order."""
+    table = model.__table__
+    query = select(*table.c).order_by(table.c.id)
+    if gameweek_id is not None:
+        query = query.where(table.c.gameweek_id == gameweek_id)
+    with Session(database.engine) as session:
+        result = session.execute(query.execution_options(yield_per=settings.EXPORT_BATCH_ROWS))
+        columns = list(result.keys())
+        empty = True
+        for rows in result.partitions():
+            empty = False
+            yield columns, rows
+        if empty:
+            # عشان الـ CSV يطلع بالـ header والـ parquet بالـ schema حتى لو مفيش بيانات
+            yield columns, []
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _ndjson(batches) -> Iterator[bytes]:
+    for columns, rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n" for row in rows
+        ).encode()
+
+
+def _csv(batches) -> Iterator[bytes]:
+    header_written = False
+    for columns, rows in batches:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+
+def _gzip(chunks) -> Iterator[bytes]:
+    # wbits=31 يعني gzip header كامل، فالملف بيتفتح بـ gunzip عادي
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _arrow_type(pa, column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file the Arrow writers write into; the generator drains it after each batch."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _columnar(model, batches, fmt: str) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    schema = pa.schema([(column.name, _arrow_type(pa, column)) for column in model.__table__.columns])
+    sink = _Sink()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    with writer:
+        for columns, rows in batches:
+            if not rows:
+                continue
+            arrays = [pa.array(values, type=schema.field(name).type) for name, values in zip(columns, zip(*rows))]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def check_format(fmt: str, gzip: bool) -> None:
+    """Raise ValueError / ExportUnavailable before the response starts, not halfway through it."""
+    if fmt not in TEXT_FORMATS and fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    if fmt in COLUMNAR_FORMATS:
+        if gzip:
+            raise ValueError(f"{fmt} is already compressed; gzip only applies to ndjson and csv")
+        try:
+            import pyarrow  # noqa: F401
+            if fmt == "parquet":
+                import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ExportUnavailable(f"{fmt} export needs pyarrow installed on the server")
+
+
+def export_stream(dataset: str, fmt: str, gzip: bool = False, gameweek_id: Optional[int] = None) -> Iterator[bytes]:
+    """The export as a byte stream; call check_format first."""
+    model = DATASETS[dataset]
+    batches = _batches(model, gameweek_id)
+    if fmt in COLUMNAR_FORMATS:
+        return _columnar(model, batches, fmt)
+    chunks = _ndjson(batches) if fmt == "ndjson" else _csv(batches)
+    return _gzip(chunks) if gzip else chunks
+
+
+def media_type(fmt: str, gzip: bool) -> str:
+    if gzip:
+        return "application/gzip"
+    return TEXT_FORMATS.get(fmt) or COLUMNAR_FORMATS[fmt]
+
+
+def filename(dataset: str, fmt: str, gzip: bool, gameweek_id: Optional[int] = None) -> str:
+    suffix = f"-gw{gameweek_id}" if gameweek_id is not None else ""
+    return f"{dataset}{suffix}.{fmt}" + (".gz" if gzip else "")
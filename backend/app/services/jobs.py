@@ -0,0 +1,195 @@
+"""
+Scoring Job Runner
+Runs gameweek point calculation on an in-process worker pool, outside the
+admin's HTTP request. Jobs are persisted in the ScoringJob table so a restart
+can pick them up again. Every uvicorn worker resumes jobs at startup, so a
+job is claimed with a conditional UPDATE and only the worker that wins it
+runs it; its stages are checkpointed to the row, so polling works from any
+worker.
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, select
+
+from app.core import database
+from app.core.config import settings
+from app.core.prometheus import SCORING_JOB_DURATION
+from app.models.models import ScoringJob
+from app.services.leaderboard_cache import leaderboard_cache
+from app.services.player_catalogue import player_catalogue
+from app.services.scoring import score_gameweek
+from app.services.squad_buffer import flush_pending_saves
+
+ACTIVE_STATUSES = ("queued", "running")
+# نسبة التقدم عند بداية كل مرحلة
+STAGE_PROGRESS = {"queued": 0.0, "load": 0.05, "compute": 0.4, "write": 0.6, "commit": 0.95, "done": 1.0}
+# commit مش بيتسجل: على SQLite الكتابة من connection تانية هتستنى الـ lock بتاع الـ job نفسه
+CHECKPOINT_STAGES = ("load", "compute", "write")
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.SCORING_JOB_WORKERS, thread_name_prefix="scoring-job"
+)
+
+
+def submit_scoring_job(session: Session, gameweek_id: int) -> ScoringJob:
+    """
+    Queue a scoring job for a gameweek, or return the one already in flight.
+    """
+    job = session.exec(
+        select(ScoringJob).where(
+            ScoringJob.gameweek_id == gameweek_id,
+            ScoringJob.status.in_(ACTIVE_STATUSES),
+        )
+    ).first()
+    if job:
+        return job
+
+    job = ScoringJob(gameweek_id=gameweek_id)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    _executor.submit(run_scoring_job, job.id)
+    return job
+
+
+def resume_scoring_jobs() -> int:
+    """
+    Re-submit every job that was queued or running when the process stopped.
+
+    A job's point writes are committed in the same transaction that marks it
+    done, so an interrupted job left nothing behind and is safe to run again.
+    A job still marked running may belong to another live worker, so it is
+    only retried once it has been running for SCORING_JOB_STALE_SECONDS.
+    """
+    with Session(database.engine) as session:
+        jobs = session.exec(
+            select(ScoringJob.id, ScoringJob.status, ScoringJob.started_at)
+            .where(ScoringJob.status.in_(ACTIVE_STATUSES))
+        ).all()
+    now = datetime.utcnow()
+    for job_id, status, started_at in jobs:
+        if status == "running" and started_at:
+            stale_at = started_at + timedelta(seconds=settings.SCORING_JOB_STALE_SECONDS)
+            if stale_at > now:
+                timer = threading.Timer((stale_at - now).total_seconds(), _executor.submit, (run_scoring_job, job_id))
+                timer.daemon = True
+                timer.start()
+                continue
+        _executor.submit(run_scoring_job, job_id)
+    return len(jobs)
+
+
+def _claim(job_id: int) -> bool:
+    """Mark the job running for this worker; False if another worker has it (or it's finished)."""
+    table = ScoringJob.__table__
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=settings.SCORING_JOB_STALE_SECONDS)
+    with Session(database.engine) as session:
+        result = session.execute(
+            update(table)
+            .where(
+                table.c.id == job_id,
+                or_(
+                    table.c.status == "queued",
+                    and_(table.c.status == "running", table.c.started_at < stale_before),
+                ),
+            )
+            .values(
+                status="running", attempts=table.c.attempts + 1, error=None,
+                started_at=now, stage="queued", progress=0.0,
+            )
+        )
+        session.commit()
+        return result.rowcount == 1
+
+
+def _checkpoint(job_id: int, stage: str) -> None:
+    """Record the stage in its own short transaction, outside the scoring one."""
+    table = ScoringJob.__table__
+    try:
+        with Session(database.engine) as session:
+            session.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.status == "running")
+                .values(stage=stage, progress=STAGE_PROGRESS[stage])
+            )
+            session.commit()
+    except SQLAlchemyError as e:
+        # التقدم للعرض بس، مايوقفش الحساب
+        logger.warning("Scoring job %s: could not checkpoint stage %s: %s", job_id, stage, e)
+
+
+def run_scoring_job(job_id: int) -> None:
+    if not _claim(job_id):
+        return
+
+    with Session(database.engine) as session:
+        job = session.get(ScoringJob, job_id)
+
+        def progress(stage: str):
+            if stage in CHECKPOINT_STAGES:
+                _checkpoint(job_id, stage)
+
+        started = time.perf_counter()
+        try:
+            # حفظات التشكيلة اللي اتقبلت قبل الديدلاين لازم تتكتب قبل الحساب
+            flush_pending_saves(job.gameweek_id)
+            report = score_gameweek(session, job.gameweek_id, progress=progress, commit=False)
+            job.status = "done"
+            job.stage = "done"
+            job.progress = 1.0
+            job.report = json.dumps(report.as_dict())
+            job.finished_at = datetime.utcnow()
+            session.add(job)
+            session.commit()
+            leaderboard_cache.invalidate()
+            player_catalogue.invalidate()
+            SCORING_JOB_DURATION.observe(time.perf_counter() - started, status="done")
+        except Exception as e:
+            session.rollback()
+            job = session.get(ScoringJob, job_id)
+            job.error = str(e)
+            retry = job.attempts < settings.SCORING_JOB_MAX_ATTEMPTS
+            job.status = "queued" if retry else "failed"
+            if not retry:
+                job.finished_at = datetime.utcnow()
+            session.add(job)
+            session.commit()
+            SCORING_JOB_DURATION.observe(time.perf_counter() - started, status="retry" if retry else "failed")
+            if retry:
+                _executor.submit(run_scoring_job, job_id)
+
+
+def job_status(job: ScoringJob) -> dict:
+    stage, progress = job.stage, job.progress
+    eta_seconds: Optional[float] = None
+    if job.status == "running" and job.started_at and progress > 0:
+        elapsed = (datetime.utcnow() - job.started_at).total_seconds()
+        eta_seconds = round(elapsed * (1 - progress) / progress, 1)
+    elif job.status == "done":
+        eta_seconds = 0.0
+
+    return {
+        "job_id": job.id,
+        "gameweek_id": job.gameweek_id,
+        "status": job.status,
+        "stage": stage,
+        "progress": progress,
+        "eta_seconds": eta_seconds,
+        "attempts": job.attempts,
+        "error": job.error,
+        "report": json.loads(job.report) if job.report else None,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
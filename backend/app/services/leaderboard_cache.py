@@ -0,0 +1,146 @@
+"""
+Leaderboard Cache
+Keeps a ranked copy of the global leaderboard in memory. It is rebuilt with
+one joined query when it has been invalidated (points recalculated, new team)
+or is older than LEADERBOARD_CACHE_TTL_SECONDS, which also picks up changes
+made by other workers.
+"""
+import hashlib
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.prometheus import record_cache
+from app.models.models import FantasyTeam, User
+
+
+@dataclass(frozen=True)
+class RankedTeam:
+    rank: int
+    team_id: int
+    manager_id: int
+    manager_name: str
+    team_name: str
+    total_points: int
+
+
+def _sort_key(total_points: int, team_id: int) -> tuple:
+    return (-total_points, team_id)
+
+
+class LeaderboardSnapshot:
+    """
+    Immutable ranking. Entries are ordered by (points desc, team id), and
+    `keys` mirrors that order so ranks and cursors are found by bisection.
+    """
+
+    def __init__(self, rows, version: int):
+        rows = sorted(rows, key=lambda r: _sort_key(r.total_points, r.team_id))
+        self.entries = [
+            RankedTeam(rank=i, team_id=r.team_id, manager_id=r.manager_id,
+                       manager_name=r.manager_name or "Unknown", team_name=r.team_name,
+                       total_points=r.total_points)
+            for i, r in enumerate(rows, start=1)
+        ]
+        self.keys = [_sort_key(e.total_points, e.team_id) for e in self.entries]
+        self._key_by_manager = {e.manager_id: k for e, k in zip(self.entries, self.keys)}
+        self.by_team = {e.team_id: e for e in self.entries}
+        self.version = version
+        digest = hashlib.blake2b(repr(
+            [(e.team_id, e.manager_name, e.team_name, e.total_points) for e in self.entries]
+        ).encode(), digest_size=12).hexdigest()
+        self.etag = f'"lb-{digest}"'
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def index_of_manager(self, manager_id: int) -> Optional[int]:
+        key = self._key_by_manager.get(manager_id)
+        if key is None:
+            return None
+        return bisect_left(self.keys, key)
+
+    def page(self, limit: int, cursor: Optional[str] = None) -> tuple[list, Optional[str]]:
+        start = 0
+        if cursor:
+            start = bisect_right(self.keys, decode_cursor(cursor))
+        page = self.entries[start:start + limit]
+        next_cursor = None
+        if page and start + limit < len(self.entries):
+            next_cursor = encode_cursor(page[-1])
+        return page, next_cursor
+
+    def around(self, manager_id: int, radius: int) -> tuple[Optional[RankedTeam], list]:
+        index = self.index_of_manager(manager_id)
+        if index is None:
+            return None, []
+        lo = max(index - radius, 0)
+        return self.entries[index], self.entries[lo:index + radius + 1]
+
+
+def encode_cursor(entry: RankedTeam) -> str:
+    return f"{entry.total_points}:{entry.team_id}"
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        points, team_id = cursor.split(":")
+        return _sort_key(int(points), int(team_id))
+    except ValueError:
+        raise ValueError("Invalid leaderboard cursor")
+
+
+class LeaderboardCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot: Optional[LeaderboardSnapshot] = None
+        self._built_at = 0.0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+
+    def get(self, session: Session) -> LeaderboardSnapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            record_cache("leaderboard", True)
+            return snapshot
+        record_cache("leaderboard", False)
+        # الـ query برا الـ lock: الـ async routes بتنادي هنا من event loop
+        # (session.run_sync)، ولو الـ lock اتمسك وقت الـ query الـ loop كله بيقف
+        version = self._version
+        rows = session.exec(
+            select(
+                FantasyTeam.id.label("team_id"),
+                FantasyTeam.manager_id,
+                User.username.label("manager_name"),
+                FantasyTeam.name.label("team_name"),
+                FantasyTeam.total_points,
+            ).join(User, User.id == FantasyTeam.manager_id, isouter=True)
+        ).all()
+        with self._lock:
+            if self._is_fresh(self._snapshot) and self._snapshot.version >= version:
+                return self._snapshot
+            self._snapshot = LeaderboardSnapshot(rows, version)
+            self._built_at = time.monotonic()
+            return self._snapshot
+
+    def _is_fresh(self, snapshot: Optional[LeaderboardSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self._version
+            and time.monotonic() - self._built_at < settings.LEADERBOARD_CACHE_TTL_SECONDS
+        )
+
+
+leaderboard_cache = LeaderboardCache()
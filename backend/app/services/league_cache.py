@@ -0,0 +1,75 @@
+"""
+Mini-League Standings Cache
+Holds computed standings per league, keyed by the leaderboard version so a
+points recalculation invalidates every league at once.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.prometheus import record_cache
+from app.models.models import FantasyTeam, MiniLeagueMember, User
+from app.services.leaderboard_cache import leaderboard_cache
+
+
+def load_standings(session: Session, league_id: int) -> list[dict]:
+    rows = session.exec(
+        select(User.username, FantasyTeam.name, FantasyTeam.total_points)
+        .select_from(MiniLeagueMember)
+        .join(User, User.id == MiniLeagueMember.user_id)
+        .join(FantasyTeam, FantasyTeam.manager_id == MiniLeagueMember.user_id)
+        .where(MiniLeagueMember.league_id == league_id)
+        .order_by(FantasyTeam.total_points.desc(), FantasyTeam.id)
+    ).all()
+    return [
+        {"rank": i, "manager_name": username, "team_name": team_name, "total_points": total_points}
+        for i, (username, team_name, total_points) in enumerate(rows, start=1)
+    ]
+
+
+class LeagueStandingsCache:
+    def __init__(self, max_leagues: int):
+        self._lock = threading.Lock()
+        self._max_leagues = max_leagues
+        # league_id -> (leaderboard version, built at, standings)
+        self._entries: OrderedDict[int, tuple[int, float, list]] = OrderedDict()
+
+    def get(self, session: Session, league_id: int) -> list[dict]:
+        version = leaderboard_cache.version
+        with self._lock:
+            cached = self._entries.get(league_id)
+            if cached and self._is_fresh(cached, version):
+                self._entries.move_to_end(league_id)
+                record_cache("league_standings", True)
+                return cached[2]
+
+        record_cache("league_standings", False)
+        standings = load_standings(session, league_id)
+        with self._lock:
+            self._entries[league_id] = (version, time.monotonic(), standings)
+            self._entries.move_to_end(league_id)
+            while len(self._entries) > self._max_leagues:
+                self._entries.popitem(last=False)
+        return standings
+
+    def invalidate(self, league_id: Optional[int] = None) -> None:
+        with self._lock:
+            if league_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(league_id, None)
+
+    @staticmethod
+    def _is_fresh(cached: tuple, version: int) -> bool:
+        cached_version, built_at, _ = cached
+        return (
+            cached_version == version
+            and time.monotonic() - built_at < settings.LEADERBOARD_CACHE_TTL_SECONDS
+        )
+
+
+league_cache = LeagueStandingsCache(max_leagues=settings.LEAGUE_CACHE_MAX_LEAGUES)
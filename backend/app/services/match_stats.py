@@ -0,0 +1,132 @@
+"""
+Bulk Match Stats
+Enters a whole gameweek of MatchStats in one call: one Player lookup, one
+SELECT of the existing stats, one scoring pass, then a single INSERT and
+UPDATE per table inside the caller's transaction.
+"""
+from bisect import insort
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import bindparam, insert, update
+from sqlmodel import Session, select
+
+from app.models.models import Gameweek, MatchStat, Player
+from app.services.scoring import propagate_player_deltas
+
+
+@dataclass
+class StatRowResult:
+    row: int
+    player_id: Optional[int]
+    status: str  # created / updated / unchanged / rejected
+    points: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BulkStatsReport:
+    gameweek_id: int
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    teams_updated: int = 0
+    results: list = field(default_factory=list)
+
+    def add(self, result: StatRowResult) -> None:
+        setattr(self, result.status, getattr(self, result.status) + 1)
+        insort(self.results, result, key=lambda r: r.row)
+
+    def reject(self, row: int, player_id: Optional[int], error: str) -> None:
+        self.add(StatRowResult(row=row, player_id=player_id, status="rejected", error=error))
+
+
+def upsert_match_stats(session: Session, gameweek: Gameweek, rows: list[tuple[int, dict]]) -> BulkStatsReport:
+    """
+    Create or replace the MatchStat of each (row number, stat fields) pair.
+
+    Rows for unknown players, or repeating a player already in the batch,
+    are rejected and the rest still go through. Player.total_points moves by
+    each player's points difference, and for a finished gameweek the
+    difference is pushed to the owning teams as well. The gameweek row is
+    locked first, like score_gameweek does, so concurrent uploads and scoring
+    runs don't interleave. Runs in the caller's transaction.
+    """
+    from app.services.points_batch import score_stats
+
+    report = BulkStatsReport(gameweek_id=gameweek.id)
+    session.exec(select(Gameweek.id).where(Gameweek.id == gameweek.id).with_for_update()).first()
+
+    player_ids = {data["player_id"] for _, data in rows}
+    positions = dict(session.exec(
+        select(Player.id, Player.position).where(Player.id.in_(player_ids))
+    ).all()) if player_ids else {}
+    existing = {}
+    for stat in session.exec(
+        select(MatchStat)
+        .where(MatchStat.gameweek_id == gameweek.id, MatchStat.player_id.in_(player_ids))
+        .order_by(MatchStat.id)
+        .with_for_update()
+    ).all() if player_ids else []:
+        # لو فيه صفين لنفس اللعيب (مفيش unique constraint) بنعدل الأقدم زي الـ endpoint الفردي
+        existing.setdefault(stat.player_id, stat)
+
+    accepted, seen = [], {}
+    for row, data in rows:
+        player_id = data["player_id"]
+        if player_id not in positions:
+            report.reject(row, player_id, "Player not found")
+        elif player_id in seen:
+            report.reject(row, player_id, f"Player already entered in row {seen[player_id]}")
+        else:
+            seen[player_id] = row
+            accepted.append((row, data))
+
+    if not accepted:
+        return report
+    scores = score_stats(
+        [MatchStat(gameweek_id=gameweek.id, **data) for _, data in accepted],
+        [positions[data["player_id"]] for _, data in accepted],
+    )
+
+    inserts, updates, player_deltas = [], [], {}
+    for (row, data), pts, badges in zip(accepted, scores.points.tolist(), scores.badges()):
+        values = {**data, "points": pts, "badges": badges}
+        stat = existing.get(data["player_id"])
+        if stat is None:
+            inserts.append({**values, "gameweek_id": gameweek.id})
+            status, old_pts = "created", 0
+        elif all(getattr(stat, name) == value for name, value in values.items()):
+            status, old_pts = "unchanged", pts
+        else:
+            updates.append({"b_id": stat.id, **{f"b_{name}": value for name, value in values.items()}})
+            status, old_pts = "updated", stat.points or 0
+        if pts != old_pts:
+            player_deltas[data["player_id"]] = pts - old_pts
+        report.add(StatRowResult(row=row, player_id=data["player_id"], status=status, points=pts))
+
+    stat_table = MatchStat.__table__
+    player_table = Player.__table__
+    if inserts:
+        session.execute(insert(stat_table), inserts)
+    if updates:
+        columns = [name for name in updates[0] if name != "b_id"]
+        session.execute(
+            update(stat_table)
+            .where(stat_table.c.id == bindparam("b_id"))
+            .values({name[2:]: bindparam(name) for name in columns}),
+            updates,
+        )
+    if player_deltas:
+        session.execute(
+            update(player_table)
+            .where(player_table.c.id == bindparam("b_id"))
+            .values(total_points=player_table.c.total_points + bindparam("b_delta")),
+            [{"b_id": pid, "b_delta": delta} for pid, delta in player_deltas.items()],
+        )
+        # 🌟 لو الجولة اتقفلت ونقاطها اتحسبت، بنزق الفروق للفرق اللي عندها اللعيبة دول بس
+        if gameweek.is_finished:
+            report.teams_updated = propagate_player_deltas(session, gameweek.id, player_deltas)
+
+    return report
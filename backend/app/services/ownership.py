@@ -0,0 +1,154 @@
+"""
+Squad Ownership
+Maintains the per-gameweek PlayerOwnership aggregate.
+"""
+from collections import Counter
+
+from sqlalchemy import func, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from app.core import database
+from app.models.models import FantasyTeamGameweek, PlayerOwnership
+
+SQUAD_COLUMNS = ("player1_id", "player2_id", "player3_id", "player4_id", "player5_id")
+COUNTER_COLUMNS = ("owners", "captains", "transfers_in", "transfers_out")
+
+
+def squad_ids(ftg) -> list:
+    return [getattr(ftg, col) for col in SQUAD_COLUMNS]
+
+
+def _upsert_counters(session: Session, gameweek_id: int, counters: dict, increment: bool) -> None:
+    """
+    Insert or update PlayerOwnership rows for (gameweek_id, player_id) in one
+    executemany statement. With `increment` the counters are added to the
+    stored values, otherwise they replace them.
+    """
+    rows = [
+        {"gameweek_id": gameweek_id, "player_id": pid, **{col: values.get(col, 0) for col in COUNTER_COLUMNS}}
+        for pid, values in counters.items()
+    ]
+    if not rows:
+        return
+
+    table = PlayerOwnership.__table__
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(table)
+    columns = COUNTER_COLUMNS if increment else ("owners", "captains")
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["gameweek_id", "player_id"],
+        set_={
+            col: (table.c[col] + stmt.excluded[col]) if increment else stmt.excluded[col]
+            for col in columns
+        },
+    )
+    session.execute(stmt, rows)
+
+
+def record_squad_change(
+    session: Session,
+    gameweek_id: int,
+    old_ids: list,
+    old_captain_id,
+    new_ids: list,
+    new_captain_id,
+    is_transfer: bool,
+) -> None:
+    """
+    Apply one squad save to the ownership aggregate. Players that left or
+    joined the squad move the owner counts, and when the team already had a
+    lineup for the gameweek they also count as transfers out / in.
+    """
+    old, new = Counter(pid for pid in old_ids if pid), Counter(pid for pid in new_ids if pid)
+    counters = {}
+    for pid in set(old) | set(new):
+        change = new[pid] - old[pid]
+        if change:
+            entry = counters.setdefault(pid, {})
+            entry["owners"] = change
+            if is_transfer:
+                entry["transfers_in" if change > 0 else "transfers_out"] = abs(change)
+    if old_captain_id != new_captain_id:
+        if old_captain_id:
+            counters.setdefault(old_captain_id, {})["captains"] = -1
+        if new_captain_id:
+            counters.setdefault(new_captain_id, {})["captains"] = 1
+    _upsert_counters(session, gameweek_id, counters, increment=True)
+
+
+def rebuild_ownership(session: Session, gameweek_id: int) -> int:
+    """
+    Recount owners and captains for a gameweek from its FantasyTeamGameweek
+    rows with two grouped queries. Transfer counters are left as they are.
+    """
+    slots = union_all(*[
+        select(getattr(FantasyTeamGameweek, col).label("player_id")).where(
+            FantasyTeamGameweek.gameweek_id == gameweek_id,
+            getattr(FantasyTeamGameweek, col).is_not(None),
+        )
+        for col in SQUAD_COLUMNS
+    ]).subquery()
+    owners = session.exec(
+        select(slots.c.player_id, func.count()).group_by(slots.c.player_id)
+    ).all()
+    captains = session.exec(
+        select(FantasyTeamGameweek.captain_id, func.count())
+        .where(
+            FantasyTeamGameweek.gameweek_id == gameweek_id,
+            FantasyTeamGameweek.captain_id.is_not(None),
+        )
+        .group_by(FantasyTeamGameweek.captain_id)
+    ).all()
+
+    counters = {pid: {"owners": count} for pid, count in owners}
+    for pid, count in captains:
+        counters.setdefault(pid, {})["captains"] = count
+
+    table = PlayerOwnership.__table__
+    session.execute(
+        update(table).where(table.c.gameweek_id == gameweek_id).values(owners=0, captains=0)
+    )
+    _upsert_counters(session, gameweek_id, counters, increment=False)
+    return len(counters)
+
+
+def ensure_ownership(session: Session, gameweek_id: int) -> bool:
+    """
+    Build the aggregate for a gameweek that has none yet (lineups saved
+    before the table existed), so incremental updates start from real counts.
+    Call it before changing any lineup of the gameweek. True when it rebuilt.
+    """
+    has_aggregate = session.exec(
+        select(PlayerOwnership.id).where(PlayerOwnership.gameweek_id == gameweek_id).limit(1)
+    ).first()
+    if has_aggregate:
+        return False
+    rebuild_ownership(session, gameweek_id)
+    return True
+
+
+def backfill_ownership(session: Session) -> list[int]:
+    """
+    Build the aggregate for every gameweek that has lineups but no
+    PlayerOwnership rows (databases from before the table existed).
+    Returns the gameweeks it rebuilt; the caller commits.
+    """
+    missing = session.exec(
+        select(FantasyTeamGameweek.gameweek_id)
+        .where(FantasyTeamGameweek.gameweek_id.not_in(select(PlayerOwnership.gameweek_id)))
+        .distinct()
+    ).all()
+    for gameweek_id in missing:
+        rebuild_ownership(session, gameweek_id)
+    return list(missing)
+
+
+def backfill_ownership_if_empty() -> list[int]:
+    """Startup hook: one SELECT when the aggregate already has rows, a backfill when it has none."""
+    with Session(database.engine) as session:
+        if session.exec(select(PlayerOwnership.id).limit(1)).first() is not None:
+            return []
+        rebuilt = backfill_ownership(session)
+        session.commit()
+        return rebuilt
@@ -0,0 +1,116 @@
+"""
+Player Catalogue Cache
+In-memory copy of the Player table for the catalogue endpoint and squad
+checks. Responses are pre-serialized JSON, so a warm GET /api/players/ does no
+ORM or Pydantic work. Any change to players (admin edits, points) bumps the
+version; the TTL picks up changes made by other workers.
+"""
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import formatdate
+from typing import Optional
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.prometheus import record_cache
+from app.models.models import Player
+
+
+@dataclass(frozen=True)
+class CataloguePlayer:
+    id: int
+    name: str
+    position: str
+    team_name: str
+    price: float
+    total_points: int
+    is_active: bool
+    image_url: Optional[str]
+
+
+@dataclass(frozen=True)
+class CatalogueBody:
+    content: bytes
+    etag: str
+
+
+class CatalogueSnapshot:
+    def __init__(self, players: list[CataloguePlayer], version: int, changed_at: float):
+        self.version = version
+        self.players = players
+        # بكل اللعيبة حتى الموقوفين، عشان التشكيلات القديمة
+        self.by_id = {p.id: p for p in players}
+        self.active = [p for p in players if p.is_active]
+        self.by_position: dict[str, list[CataloguePlayer]] = {}
+        for p in self.active:
+            self.by_position.setdefault(p.position, []).append(p)
+        self.last_modified = formatdate(changed_at, usegmt=True)
+        self._bodies = {None: self._serialize(self.active)}
+        for position, group in self.by_position.items():
+            self._bodies[position] = self._serialize(group)
+
+    @staticmethod
+    def _serialize(players: list[CataloguePlayer]) -> CatalogueBody:
+        content = json.dumps([p.__dict__ for p in players], separators=(",", ":")).encode()
+        digest = hashlib.blake2b(content, digest_size=12).hexdigest()
+        return CatalogueBody(content=content, etag=f'"pl-{digest}"')
+
+    def body(self, position: Optional[str] = None) -> CatalogueBody:
+        if position is None:
+            return self._bodies[None]
+        return self._bodies.get(position.upper()) or self._serialize([])
+
+
+class PlayerCatalogueCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._changed_at = time.time()
+        self._snapshot: Optional[CatalogueSnapshot] = None
+        self._built_at = 0.0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._changed_at = time.time()
+
+    def get(self, session: Session) -> CatalogueSnapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            record_cache("player_catalogue", True)
+            return snapshot
+        record_cache("player_catalogue", False)
+        # زي كاش الترتيب: الـ query برا الـ lock عشان الـ async routes
+        version = self._version
+        players = [
+            CataloguePlayer(**player.model_dump())
+            for player in session.exec(select(Player).order_by(Player.id)).all()
+        ]
+        with self._lock:
+            if self._is_fresh(self._snapshot) and self._snapshot.version >= version:
+                return self._snapshot
+            previous = self._snapshot
+            # اتبنى تاني بسبب الـ TTL ولقينا تغيير من worker تاني
+            if previous is not None and previous.version == version and previous.players != players:
+                self._changed_at = time.time()
+            self._snapshot = CatalogueSnapshot(players, version, self._changed_at)
+            self._built_at = time.monotonic()
+            return self._snapshot
+
+    def _is_fresh(self, snapshot: Optional[CatalogueSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self._version
+            and time.monotonic() - self._built_at < settings.PLAYER_CATALOGUE_TTL_SECONDS
+        )
+
+
+player_catalogue = PlayerCatalogueCache()
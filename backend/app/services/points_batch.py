@@ -0,0 +1,147 @@
+"""
+Vectorized Points Engine
+Scores a whole gameweek of MatchStats in one call, using column arrays
+instead of one MatchStat object at a time. Results are identical to
+calculate_player_points / calculate_bps / calculate_earned_badges.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.services.points_engine import POINTS_CONFIG, normalize_position
+
+STAT_COLUMNS = (
+    "goals", "assists", "clean_sheet", "saves", "defensive_errors", "nutmegs",
+    "own_goals", "minutes_played", "penalties_scored", "penalties_saved",
+    "penalties_missed", "matches_won", "mvp_rank",
+)
+
+POSITIONS = ("GK", "DEF", "MID", "ATT")
+POSITION_CODES = {pos: code for code, pos in enumerate(POSITIONS)}
+# بيت 2 معناه إن المركز متكتب بشكل مش قياسي (Goalkeeper بدل GK مثلاً)
+# نقاط الفانتسي بتتعامل معاه عادي، لكن الـ BPS مش بيدي بونص الكلين شيت غير للاختصار القياسي
+NON_CANONICAL = 4
+
+EVENTS = (
+    "played", "goal", "penalty_scored", "assist", "clean_sheet", "save_per_3",
+    "penalty_saved", "defensive_error", "own_goal", "penalty_miss", "win_bonus", "nutmeg",
+)
+# مصفوفة الأوزان: صف لكل مركز وعمود لكل حدث
+WEIGHTS = np.array(
+    [[POINTS_CONFIG[pos].get(event, 2 if event == "win_bonus" else 0) for event in EVENTS] for pos in POSITIONS],
+    dtype=np.int64,
+)
+MVP_BONUS = np.array([0, 3, 2, 1], dtype=np.int64)
+POINTS_FLOOR = -10
+
+BPS_CLEAN_SHEET = np.array([12, 12, 8, 0, 0, 0, 0, 0], dtype=np.int64)
+
+BADGES = (
+    "sniper", "maestro", "wall", "octopus", "minister", "goat",
+    "ankle", "lucky", "agent", "freeze", "disaster",
+)
+BADGE_BITS = {name: 1 << i for i, name in enumerate(BADGES)}
+
+
+@dataclass
+class BatchScores:
+    points: np.ndarray
+    bps: np.ndarray
+    badge_mask: np.ndarray
+
+    def badges(self) -> list[str]:
+        return [badges_from_mask(mask) for mask in self.badge_mask.tolist()]
+
+
+def encode_positions(positions) -> np.ndarray:
+    codes = np.empty(len(positions), dtype=np.int64)
+    for i, position in enumerate(positions):
+        pos = normalize_position(position)
+        raw = position.upper() if position else "ATT"
+        codes[i] = POSITION_CODES[pos] | (0 if raw == pos else NON_CANONICAL)
+    return codes
+
+
+def columns_from_stats(stats, **overrides) -> dict:
+    """
+    بيحول لستة MatchStat (أو rows فيها نفس الأعمدة) لأعمدة numpy
+    """
+    columns = {}
+    for name in STAT_COLUMNS:
+        if name in overrides:
+            columns[name] = np.asarray(overrides[name], dtype=np.int64)
+        else:
+            columns[name] = np.fromiter(
+                ((getattr(stat, name, 0) or 0) for stat in stats), dtype=np.int64, count=len(stats)
+            )
+    return columns
+
+
+def score_columns(columns: dict, position_codes: np.ndarray) -> BatchScores:
+    """
+    Points, BPS and badge bitmasks for every row in one vectorized pass.
+    """
+    col = {name: np.asarray(columns[name], dtype=np.int64) for name in STAT_COLUMNS}
+    codes = np.asarray(position_codes, dtype=np.int64)
+    played = (col["minutes_played"] > 0).astype(np.int64)
+    clean_sheet = np.where(col["clean_sheet"] > 0, col["clean_sheet"], 0)
+    rank = col["mvp_rank"]
+
+    events = np.stack([
+        played,
+        col["goals"],
+        col["penalties_scored"],
+        col["assists"],
+        clean_sheet,
+        col["saves"] // 3,
+        col["penalties_saved"],
+        col["defensive_errors"],
+        col["own_goals"],
+        col["penalties_missed"],
+        col["matches_won"],
+        col["nutmegs"],
+    ], axis=1)
+    points = np.einsum("ij,ij->i", events, WEIGHTS[codes & 3])
+    points += np.where((rank >= 1) & (rank <= 3), MVP_BONUS[np.clip(rank, 0, 3)], 0)
+    points = np.maximum(points, POINTS_FLOOR)
+
+    bps = (
+        played * 5
+        + col["goals"] * 24
+        + col["assists"] * 15
+        + np.where(clean_sheet > 0, BPS_CLEAN_SHEET[codes], 0)
+        + col["saves"] * 4
+        + col["nutmegs"] * 10
+        + col["penalties_scored"] * 12
+        + col["penalties_saved"] * 18
+        - col["penalties_missed"] * 10
+        - col["defensive_errors"] * 10
+        - col["own_goals"] * 15
+    )
+
+    conditions = (
+        col["goals"] >= 5,
+        col["assists"] >= 4,
+        col["saves"] >= 10,
+        col["penalties_saved"] >= 1,
+        col["clean_sheet"] >= 2,
+        rank == 1,
+        col["nutmegs"] >= 2,
+        col["matches_won"] >= 4,
+        col["own_goals"] > 0,
+        col["penalties_missed"] > 0,
+        col["defensive_errors"] >= 2,
+    )
+    badge_mask = np.zeros(len(codes), dtype=np.int64)
+    for bit, condition in enumerate(conditions):
+        badge_mask |= condition.astype(np.int64) << bit
+
+    return BatchScores(points=points, bps=bps, badge_mask=badge_mask)
+
+
+def score_stats(stats, positions, **overrides) -> BatchScores:
+    return score_columns(columns_from_stats(stats, **overrides), encode_positions(positions))
+
+
+def badges_from_mask(mask: int) -> str:
+    return ",".join(name for name in BADGES if mask & BADGE_BITS[name])
@@ -0,0 +1,66 @@
+"""
+Squad Rollover
+Copies every team's latest lineup into a newly activated gameweek with a
+single INSERT ... SELECT.
+"""
+from sqlalchemy import and_, exists, func, insert, literal
+from sqlmodel import Session, select
+
+from app.models.models import FantasyTeam, FantasyTeamGameweek, Gameweek
+from app.services.ownership import SQUAD_COLUMNS, rebuild_ownership
+from app.services.squads import sync_gameweek_slots
+
+
+def rollover_squads(session: Session, gameweek_id: int) -> int:
+    """
+    Give every team without a FantasyTeamGameweek in `gameweek_id` a copy of
+    its latest one (squad and captain, no transfers, zero points).
+
+    Teams that already have a row for the gameweek are skipped, so running it
+    again inserts nothing. The gameweek's squad slots and ownership aggregate
+    are rebuilt afterwards. Runs in the caller's transaction and returns the number of
+    teams rolled over.
+    """
+    ftg = FantasyTeamGameweek.__table__
+    # نقفل الجولة عشان تفعيلين في نفس الوقت ما يكرروش الـ rows
+    session.exec(select(Gameweek.id).where(Gameweek.id == gameweek_id).with_for_update()).first()
+
+    latest = (
+        select(
+            ftg.c.fantasy_team_id,
+            ftg.c.captain_id,
+            *[ftg.c[col] for col in SQUAD_COLUMNS],
+            func.row_number().over(
+                partition_by=ftg.c.fantasy_team_id,
+                order_by=(ftg.c.gameweek_id.desc(), ftg.c.id.desc()),
+            ).label("recency"),
+        )
+        .join(FantasyTeam.__table__, FantasyTeam.__table__.c.id == ftg.c.fantasy_team_id)
+        .subquery()
+    )
+    already_rolled = exists().where(and_(
+        ftg.c.fantasy_team_id == latest.c.fantasy_team_id,
+        ftg.c.gameweek_id == gameweek_id,
+    ))
+    source = select(
+        latest.c.fantasy_team_id,
+        literal(gameweek_id),
+        *[latest.c[col] for col in SQUAD_COLUMNS],
+        latest.c.captain_id,
+        literal(0),
+        literal(0),
+        literal(0),
+    ).where(latest.c.recency == 1, ~already_rolled)
+
+    result = session.execute(
+        insert(ftg).from_select(
+            [
+                "fantasy_team_id", "gameweek_id", *SQUAD_COLUMNS, "captain_id",
+                "transfers_made", "transfer_penalty", "gameweek_points",
+            ],
+            source,
+        )
+    )
+    sync_gameweek_slots(session, gameweek_id)
+    rebuild_ownership(session, gameweek_id)
+    return result.rowcount
@@ -0,0 +1,434 @@
+"""
+Gameweek Scoring Pipeline
+Scores a whole gameweek with a constant number of queries and bulk writes.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from sqlalchemy import bindparam, case, delete, func, insert, update
+from sqlmodel import Session, select
+
+from app.models.models import (
+    FantasyTeam, FantasyTeamGameweek, Gameweek, GameweekRankSnapshot, MatchStat, MVPVote, Player
+)
+from app.services.ownership import SQUAD_COLUMNS, squad_ids
+from app.services.squads import ensure_gameweek_slots, owners_of_players
+
+
+@dataclass
+class ScoringReport:
+    gameweek_id: int
+    timings_ms: dict = field(default_factory=dict)
+    rows: dict = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "gameweek_id": self.gameweek_id,
+            "timings_ms": self.timings_ms,
+            "rows": self.rows,
+            "total_ms": round(sum(self.timings_ms.values()), 2),
+        }
+
+
+class _Stage:
+    def __init__(self, report: ScoringReport, name: str, progress: Optional[Callable[[str], None]] = None):
+        self.report = report
+        self.name = name
+        self.progress = progress
+
+    def __enter__(self):
+        if self.progress:
+            self.progress(self.name)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = (time.perf_counter() - self.started) * 1000
+        self.report.timings_ms[self.name] = round(elapsed, 2)
+        return False
+
+
+def tally_mvp_votes(votes) -> list[int]:
+    """
+    بيحسب أصوات الـ MVP (3 / 2 / 1) ويرجع أول 3 لاعبين بالترتيب
+    """
+    vote_tallies = {}
+    for vote in votes:
+        if vote.first_place_id:
+            vote_tallies[vote.first_place_id] = vote_tallies.get(vote.first_place_id, 0) + 3
+        if vote.second_place_id:
+            vote_tallies[vote.second_place_id] = vote_tallies.get(vote.second_place_id, 0) + 2
+        if vote.third_place_id:
+            vote_tallies[vote.third_place_id] = vote_tallies.get(vote.third_place_id, 0) + 1
+
+    sorted_mvps = sorted(vote_tallies.items(), key=lambda x: x[1], reverse=True)
+    return [pid for pid, score in sorted_mvps[:3]]
+
+
+def team_gameweek_points(squad_ids, captain_id, transfer_penalty, player_pts: dict) -> int:
+    pts = 0
+    for pid in squad_ids:
+        if pid:
+            pts += player_pts.get(pid, 0)
+            if pid == captain_id:
+                pts += player_pts.get(pid, 0)
+    return pts - (transfer_penalty or 0)
+
+
+def rank_snapshot_rows(gameweek_id: int, overall: dict, gw_points: dict) -> list[dict]:
+    """
+    One row per team with its gameweek rank and its overall rank as of this
+    gameweek. Ties are broken by team id, like the global leaderboard.
+    """
+    gw_order = sorted(overall, key=lambda tid: (-gw_points.get(tid, 0), tid))
+    overall_rank = {
+        tid: rank for rank, tid in enumerate(sorted(overall, key=lambda tid: (-overall[tid], tid)), start=1)
+    }
+    return [
+        {
+            "gameweek_id": gameweek_id,
+            "fantasy_team_id": tid,
+            "gw_points": gw_points.get(tid, 0),
+            "gw_rank": gw_rank,
+            "overall_points": overall[tid],
+            "overall_rank": overall_rank[tid],
+        }
+        for gw_rank, tid in enumerate(gw_order, start=1)
+    ]
+
+
+def rebuild_rank_snapshot(session: Session, gameweek_id: int) -> int:
+    """
+    Rewrite one gameweek's GameweekRankSnapshot from the stored team-gameweek
+    points. overall_points is each team's total up to and including this
+    gameweek (by number), not its current total, so rebuilding an old
+    gameweek doesn't pull in later points. Returns the number of rows.
+    """
+    ftg = FantasyTeamGameweek.__table__
+    number = select(Gameweek.number).where(Gameweek.id == gameweek_id).scalar_subquery()
+    played = (
+        select(ftg.c.fantasy_team_id, ftg.c.gameweek_id, ftg.c.gameweek_points)
+        .join(Gameweek.__table__, Gameweek.__table__.c.id == ftg.c.gameweek_id)
+        .where(Gameweek.__table__.c.number <= number)
+        .subquery()
+    )
+    totals = session.exec(
+        select(
+            FantasyTeam.id,
+            func.sum(case((played.c.gameweek_id == gameweek_id, played.c.gameweek_points), else_=0)),
+            func.sum(played.c.gameweek_points),
+        )
+        .select_from(FantasyTeam)
+        .outerjoin(played, played.c.fantasy_team_id == FantasyTeam.id)
+        .group_by(FantasyTeam.id)
+    ).all()
+    gw_points = {tid: gw or 0 for tid, gw, _ in totals}
+    overall = {tid: total or 0 for tid, _, total in totals}
+    rows = rank_snapshot_rows(gameweek_id, overall, gw_points)
+
+    snapshot_table = GameweekRankSnapshot.__table__
+    session.execute(delete(snapshot_table).where(snapshot_table.c.gameweek_id == gameweek_id))
+    if rows:
+        session.execute(insert(snapshot_table), rows)
+    return len(rows)
+
+
+def refresh_rank_snapshots(session: Session, gameweek_id: int) -> int:
+    """
+    Rebuild this gameweek's snapshot and every later snapshot, whose overall
+    points include this gameweek. Returns the row count for `gameweek_id`.
+    Only score_gameweek does this full pass; stat edits go through
+    shift_rank_snapshots, which touches the affected teams' rows only.
+    """
+    rows = rebuild_rank_snapshot(session, gameweek_id)
+    number = select(Gameweek.number).where(Gameweek.id == gameweek_id).scalar_subquery()
+    later = session.exec(
+        select(GameweekRankSnapshot.gameweek_id)
+        .join(Gameweek, Gameweek.id == GameweekRankSnapshot.gameweek_id)
+        .where(Gameweek.number > number)
+        .distinct()
+    ).all()
+    for later_id in later:
+        rebuild_rank_snapshot(session, later_id)
+    return rows
+
+
+def _rerank_snapshot(session: Session, gameweek_id: int, points_column: str, rank_column: str) -> None:
+    """Renumber one rank column of a gameweek's snapshot in the database, writing only rows that moved."""
+    table = GameweekRankSnapshot.__table__
+    ranked = (
+        select(
+            table.c.id,
+            func.row_number().over(
+                order_by=(table.c[points_column].desc(), table.c.fantasy_team_id)
+            ).label("rank"),
+        )
+        .where(table.c.gameweek_id == gameweek_id)
+        .subquery()
+    )
+    session.execute(
+        update(table)
+        .where(table.c.id == ranked.c.id, table.c[rank_column] != ranked.c.rank)
+        .values({rank_column: ranked.c.rank})
+    )
+
+
+def shift_rank_snapshots(session: Session, gameweek_id: int, team_deltas: dict) -> None:
+    """
+    Apply {team_id: points delta} for one gameweek to the stored snapshots
+    instead of rebuilding them: only the affected teams' rows move (gw and
+    overall points here, overall points in every later snapshot), then the
+    ranks are renumbered in SQL.
+    """
+    team_deltas = {tid: delta for tid, delta in team_deltas.items() if delta}
+    if not team_deltas:
+        return
+    table = GameweekRankSnapshot.__table__
+    number = select(Gameweek.number).where(Gameweek.id == gameweek_id).scalar_subquery()
+    later = session.exec(
+        select(GameweekRankSnapshot.gameweek_id)
+        .join(Gameweek, Gameweek.id == GameweekRankSnapshot.gameweek_id)
+        .where(Gameweek.number > number)
+        .distinct()
+    ).all()
+    params = [{"b_team_id": tid, "b_delta": delta} for tid, delta in team_deltas.items()]
+
+    session.execute(
+        update(table)
+        .where(table.c.gameweek_id == gameweek_id, table.c.fantasy_team_id == bindparam("b_team_id"))
+        .values(
+            gw_points=table.c.gw_points + bindparam("b_delta"),
+            overall_points=table.c.overall_points + bindparam("b_delta"),
+        ),
+        params,
+    )
+    _rerank_snapshot(session, gameweek_id, "gw_points", "gw_rank")
+    _rerank_snapshot(session, gameweek_id, "overall_points", "overall_rank")
+    if later:
+        session.execute(
+            update(table)
+            .where(
+                table.c.gameweek_id.in_(select(Gameweek.id).where(Gameweek.number > number)),
+                table.c.fantasy_team_id == bindparam("b_team_id"),
+            )
+            .values(overall_points=table.c.overall_points + bindparam("b_delta")),
+            params,
+        )
+        for later_id in later:
+            _rerank_snapshot(session, later_id, "overall_points", "overall_rank")
+
+
+def score_gameweek(
+    session: Session,
+    gameweek_id: int,
+    progress: Optional[Callable[[str], None]] = None,
+    commit: bool = True,
+) -> ScoringReport:
+    """
+    Score every MatchStat and FantasyTeamGameweek of a gameweek.
+
+    Loads with a fixed number of SELECTs, computes in memory and writes back
+    with one executemany UPDATE per table, all inside a single transaction.
+    Totals are adjusted by the difference from the previous run, so scoring the
+    same gameweek twice never double-counts. The gameweek row is locked first,
+    so two concurrent runs for the same gameweek serialize instead of both
+    applying the same delta.
+
+    `progress` is called with each stage name as it starts. With
+    `commit=False` the caller owns the transaction (the job runner uses this to
+    mark its job done atomically with the writes).
+    """
+    # numpy بيتحمل مع أول scoring مش مع الـ import (cold start)
+    from app.services.points_batch import STAT_COLUMNS, score_stats
+
+    report = ScoringReport(gameweek_id=gameweek_id)
+    stat_player_ids = select(MatchStat.player_id).where(MatchStat.gameweek_id == gameweek_id)
+
+    # 1. تحميل كل حاجة مرة واحدة
+    with _Stage(report, "load", progress):
+        session.exec(select(Gameweek.id).where(Gameweek.id == gameweek_id).with_for_update()).first()
+        votes = session.exec(select(MVPVote).where(MVPVote.gameweek_id == gameweek_id)).all()
+        stats = session.exec(
+            select(
+                MatchStat.id,
+                MatchStat.player_id,
+                MatchStat.points,
+                MatchStat.badges,
+                *[getattr(MatchStat, col) for col in STAT_COLUMNS],
+            ).where(MatchStat.gameweek_id == gameweek_id)
+        ).all()
+        positions = dict(session.exec(
+            select(Player.id, Player.position).where(Player.id.in_(stat_player_ids))
+        ).all())
+        ftgs = session.exec(
+            select(
+                FantasyTeamGameweek.id,
+                FantasyTeamGameweek.fantasy_team_id,
+                FantasyTeamGameweek.captain_id,
+                FantasyTeamGameweek.transfer_penalty,
+                FantasyTeamGameweek.gameweek_points,
+                *[getattr(FantasyTeamGameweek, col) for col in SQUAD_COLUMNS],
+            ).where(FantasyTeamGameweek.gameweek_id == gameweek_id)
+        ).all()
+        team_ids = set(session.exec(select(FantasyTeam.id)).all())
+
+    # 2. الحساب في الميموري
+    with _Stage(report, "compute", progress):
+        top_3_ids = tally_mvp_votes(votes)
+
+        stats = [stat for stat in stats if stat.player_id in positions]
+        mvp_ranks = [
+            top_3_ids.index(stat.player_id) + 1 if stat.player_id in top_3_ids else 0
+            for stat in stats
+        ]
+        scores = score_stats(stats, [positions[stat.player_id] for stat in stats], mvp_rank=mvp_ranks)
+
+        stat_rows, player_deltas, player_pts = [], {}, {}
+        for stat, new_pts, badges, mvp_rank in zip(stats, scores.points.tolist(), scores.badges(), mvp_ranks):
+            old_pts = stat.points or 0
+            player_pts[stat.player_id] = new_pts
+
+            if (new_pts, badges, mvp_rank) != (old_pts, stat.badges, stat.mvp_rank):
+                stat_rows.append({
+                    "b_id": stat.id, "b_points": new_pts,
+                    "b_badges": badges, "b_mvp_rank": mvp_rank,
+                })
+            if new_pts != old_pts:
+                player_deltas[stat.player_id] = player_deltas.get(stat.player_id, 0) + new_pts - old_pts
+
+        ftg_rows, team_deltas = [], {}
+        for ftg in ftgs:
+            final_gw_pts = team_gameweek_points(squad_ids(ftg), ftg.captain_id, ftg.transfer_penalty, player_pts)
+            old_gw_pts = ftg.gameweek_points or 0
+            if final_gw_pts == old_gw_pts:
+                continue
+            ftg_rows.append({"b_id": ftg.id, "b_points": final_gw_pts})
+            if ftg.fantasy_team_id in team_ids:
+                team_deltas[ftg.fantasy_team_id] = (
+                    team_deltas.get(ftg.fantasy_team_id, 0) + final_gw_pts - old_gw_pts
+                )
+
+    # 3. الكتابة بـ bulk UPDATE في ترانزاكشن واحدة
+    with _Stage(report, "write", progress):
+        stat_table = MatchStat.__table__
+        player_table = Player.__table__
+        ftg_table = FantasyTeamGameweek.__table__
+        team_table = FantasyTeam.__table__
+
+        if stat_rows:
+            session.execute(
+                update(stat_table)
+                .where(stat_table.c.id == bindparam("b_id"))
+                .values(
+                    points=bindparam("b_points"),
+                    badges=bindparam("b_badges"),
+                    mvp_rank=bindparam("b_mvp_rank"),
+                ),
+                stat_rows,
+            )
+        if player_deltas:
+            session.execute(
+                update(player_table)
+                .where(player_table.c.id == bindparam("b_id"))
+                .values(total_points=player_table.c.total_points + bindparam("b_delta")),
+                [{"b_id": pid, "b_delta": delta} for pid, delta in player_deltas.items()],
+            )
+        if ftg_rows:
+            session.execute(
+                update(ftg_table)
+                .where(ftg_table.c.id == bindparam("b_id"))
+                .values(gameweek_points=bindparam("b_points")),
+                ftg_rows,
+            )
+        if team_deltas:
+            session.execute(
+                update(team_table)
+                .where(team_table.c.id == bindparam("b_id"))
+                .values(total_points=team_table.c.total_points + bindparam("b_delta")),
+                [{"b_id": tid, "b_delta": delta} for tid, delta in team_deltas.items()],
+            )
+        session.execute(
+            update(Gameweek.__table__)
+            .where(Gameweek.__table__.c.id == gameweek_id)
+            .values(is_active=False, is_finished=True)
+        )
+
+        # 🌟 لقطة الترتيب بتاعة الجولة (بتتكتب من جديد كل مرة الجولة تتحسب)
+        # (والجولات اللي بعدها، لأن الـ overall بتاعها فيه نقط الجولة دي)
+        snapshot_rows = refresh_rank_snapshots(session, gameweek_id)
+
+    if commit:
+        with _Stage(report, "commit", progress):
+            session.commit()
+
+    report.rows = {
+        "match_stats": len(stat_rows),
+        "players": len(player_deltas),
+        "team_gameweeks": len(ftg_rows),
+        "teams": len(team_deltas),
+        "rank_snapshots": snapshot_rows,
+    }
+    return report
+
+
+def propagate_player_delta(session: Session, gameweek_id: int, player_id: int, delta: int) -> int:
+    """
+    Push a change in one player's gameweek points to the teams that own him.
+
+    Only the team-gameweeks found through the squad-slot index are touched;
+    each gets `delta` once per squad slot, doubled for the captain, and the
+    same amount is added to its FantasyTeam.total_points. Runs inside the
+    caller's transaction and returns the number of team-gameweeks updated.
+    """
+    return propagate_player_deltas(session, gameweek_id, {player_id: delta})
+
+
+def propagate_player_deltas(session: Session, gameweek_id: int, deltas: dict) -> int:
+    """propagate_player_delta for {player_id: delta}, with one query and one UPDATE per table."""
+    deltas = {player_id: delta for player_id, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+
+    # لو الداتابيز عمرها ما اتعملها backfill، الـ index فاضي والتعديل مش هيوصل لأي فريق
+    ensure_gameweek_slots(session, gameweek_id)
+    # (team_gameweek, player) -> [team, slots, captain]
+    owned = {}
+    for slot in owners_of_players(session, gameweek_id, deltas):
+        entry = owned.setdefault((slot.team_gameweek_id, slot.player_id), [slot.fantasy_team_id, 0, False])
+        entry[1] += 1
+        entry[2] = entry[2] or slot.is_captain
+
+    per_team_gameweek = {}
+    for (ftg_id, player_id), (team_id, slots, is_captain) in owned.items():
+        entry = per_team_gameweek.setdefault(ftg_id, [team_id, 0])
+        entry[1] += deltas[player_id] * slots * (2 if is_captain else 1)
+
+    team_deltas = [
+        {"b_id": ftg_id, "b_team_id": team_id, "b_delta": delta}
+        for ftg_id, (team_id, delta) in per_team_gameweek.items()
+        if delta
+    ]
+    if not team_deltas:
+        return 0
+
+    ftg_table = FantasyTeamGameweek.__table__
+    team_table = FantasyTeam.__table__
+    session.execute(
+        update(ftg_table)
+        .where(ftg_table.c.id == bindparam("b_id"))
+        .values(gameweek_points=ftg_table.c.gameweek_points + bindparam("b_delta")),
+        team_deltas,
+    )
+    session.execute(
+        update(team_table)
+        .where(team_table.c.id == bindparam("b_team_id"))
+        .values(total_points=team_table.c.total_points + bindparam("b_delta")),
+        team_deltas,
+    )
+    # بنزق نقط الفرق المتأثرة بس في اللقطات ونعيد الترقيم، من غير rebuild كامل مع كل تعديل
+    per_team = {}
+    for row in team_deltas:
+        per_team[row["b_team_id"]] = per_team.get(row["b_team_id"], 0) + row["b_delta"]
+    shift_rank_snapshots(session, gameweek_id, per_team)
+    return len(team_deltas)
@@ -0,0 +1,197 @@
+"""
+Squad Write Buffer
+For the deadline rush: with SQUAD_WRITE_BUFFER_ENABLED, select_squad
+validates a save, appends it to SquadSaveRequest and answers straight away.
+A flusher thread then applies only the latest request per manager and
+gameweek, one transaction per batch, every SQUAD_WRITE_BUFFER_FLUSH_MS.
+
+A request is stored before it is acknowledged, and the deadline is checked
+against the time it was acknowledged, so every save accepted before the
+deadline is written even if it is flushed after it or after a restart.
+Scoring and gameweek activation flush the buffer before they read squads.
+
+Each request is applied in its own savepoint. Only a save that fails
+validate_squad is rejected; any other error leaves it pending and it is
+retried with exponential backoff, up to SQUAD_WRITE_BUFFER_MAX_ATTEMPTS,
+so one bad request never holds up the rest of the queue. Older requests
+of the same manager and gameweek are superseded only once a newer one is
+saved; while the newer one waits for a retry they wait with it, and if it
+is rejected or fails for good the most recent older one is applied
+instead. Clients look up
+what happened to a request with GET /api/teams/my/select/{request_id}.
+"""
+import json
+import logging
+import threading
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlmodel import Session, select
+
+from app.core import database
+from app.core.config import settings
+from app.models.models import SquadSaveRequest
+from app.services.player_catalogue import player_catalogue
+from app.services.squad_validation import load_squad_context, squad_context_cache, validate_squad
+from app.services.squads import apply_selection
+
+logger = logging.getLogger(__name__)
+
+# طلب بالنتيجة دي بيلغي الطلبات الأقدم لنفس المدير والجولة
+SUPERSEDING = ("saved", "superseded")
+
+_wake = threading.Event()
+_flush_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+
+
+def enqueue_selection(
+    session: Session, manager_id: int, gameweek_id: int, player_ids: list, captain_id: int
+) -> SquadSaveRequest:
+    request = SquadSaveRequest(
+        manager_id=manager_id,
+        gameweek_id=gameweek_id,
+        player_ids=json.dumps(player_ids),
+        captain_id=captain_id,
+    )
+    session.add(request)
+    session.commit()
+    session.refresh(request)
+    _wake.set()
+    return request
+
+
+def _wait_for(request: SquadSaveRequest, pending: list, now: datetime) -> None:
+    """A newer request is still pending: retry this one when it is due, in case it fails."""
+    request.retry_at = max(other.retry_at or now + _retry_delay(1) for other in pending)
+
+
+def _apply_request(session: Session, request: SquadSaveRequest, players: dict, now: datetime) -> None:
+    player_ids = json.loads(request.player_ids)
+    with session.begin_nested():
+        context, team, existing = load_squad_context(
+            session, request.manager_id, request.gameweek_id, for_update=True
+        )
+        # طلب أحدث لنفس المدير (من الدفعة دي أو من worker تاني) بيلغي ده بس لو اتكتب فعلاً؛
+        # لو اترفض أو فشل، النسخة دي هي آخر تشكيلة اتقبلت
+        newer = session.exec(
+            select(SquadSaveRequest).where(
+                SquadSaveRequest.manager_id == request.manager_id,
+                SquadSaveRequest.gameweek_id == request.gameweek_id,
+                SquadSaveRequest.id > request.id,
+            )
+        ).all()
+        if any(other.applied_at and other.outcome in SUPERSEDING for other in newer):
+            request.outcome, request.error, request.applied_at = "superseded", None, now
+            return
+        pending = [other for other in newer if other.applied_at is None]
+        if pending:
+            _wait_for(request, pending, now)
+            return
+        # اتقبل وهو مفتوح؛ قفل الأدمن بعد القبول ما يلغيهوش
+        context = replace(context, allow_transfers=True)
+        check = validate_squad(player_ids, request.captain_id, players, context, request.acked_at)
+        if not check.valid:
+            request.outcome, request.error, request.applied_at = "rejected", check.errors[0][1], now
+            return
+        apply_selection(session, team, existing, request.gameweek_id, player_ids, request.captain_id, check)
+        request.outcome, request.error, request.applied_at = "saved", None, now
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    seconds = settings.SQUAD_WRITE_BUFFER_RETRY_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.SQUAD_WRITE_BUFFER_MAX_RETRY_SECONDS))
+
+
+def _defer(request: SquadSaveRequest, error: Exception, now: datetime) -> None:
+    """A save that failed for a reason other than validation: retry later, or give up."""
+    request.attempts += 1
+    request.error = str(error)
+    if request.attempts >= settings.SQUAD_WRITE_BUFFER_MAX_ATTEMPTS:
+        request.outcome, request.applied_at = "failed", now
+        logger.error("Squad save request %s failed after %s attempts: %s", request.id, request.attempts, error)
+    else:
+        request.retry_at = now + _retry_delay(request.attempts)
+        logger.warning("Squad save request %s will be retried (attempt %s): %s", request.id, request.attempts, error)
+
+
+def _flush_batch(gameweek_id: Optional[int]) -> int:
+    now = datetime.utcnow()
+    with Session(database.engine) as session:
+        query = (
+            select(SquadSaveRequest)
+            .where(
+                SquadSaveRequest.applied_at == None,
+                or_(SquadSaveRequest.retry_at == None, SquadSaveRequest.retry_at <= now),
+            )
+            .order_by(SquadSaveRequest.id)
+            .limit(settings.SQUAD_WRITE_BUFFER_BATCH)
+        )
+        if gameweek_id is not None:
+            query = query.where(SquadSaveRequest.gameweek_id == gameweek_id)
+        if session.get_bind().dialect.name == "postgresql":
+            # كذا worker بيفلش في نفس الوقت، كل واحد ياخد requests غير التانية
+            query = query.with_for_update(skip_locked=True)
+        requests = session.exec(query).all()
+        if not requests:
+            return 0
+
+        managers = {request.manager_id for request in requests}
+        players = player_catalogue.get(session).by_id
+        # الأحدث الأول: الأقدم منه بيتلغي بس لما الأحدث يتكتب فعلاً
+        last_outcome = {}
+        for request in reversed(requests):
+            key = (request.manager_id, request.gameweek_id)
+            if last_outcome.get(key) in SUPERSEDING:
+                request.outcome, request.error, request.applied_at = "superseded", None, now
+            else:
+                try:
+                    _apply_request(session, request, players, now)
+                except Exception as e:
+                    # الـ savepoint اترجع لوحده؛ الطلب يفضل pending ومايوقفش باقي الدفعة
+                    _defer(request, e, now)
+            if request.applied_at is not None:
+                last_outcome[key] = request.outcome
+            session.add(request)
+        session.commit()
+
+    for manager_id in managers:
+        squad_context_cache.invalidate(manager_id)
+    return len(requests)
+
+
+def flush_pending_saves(gameweek_id: Optional[int] = None) -> int:
+    """Apply every queued save (optionally for one gameweek). Returns requests processed."""
+    processed = 0
+    with _flush_lock:
+        while True:
+            count = _flush_batch(gameweek_id)
+            processed += count
+            if count < settings.SQUAD_WRITE_BUFFER_BATCH:
+                return processed
+
+
+def _run() -> None:
+    while True:
+        woken = _wake.wait(timeout=settings.SQUAD_WRITE_BUFFER_IDLE_POLL_SECONDS)
+        if woken:
+            # بنستنى شوية عشان الحفظات المتكررة لنفس المدير تتجمع في واحد
+            time.sleep(settings.SQUAD_WRITE_BUFFER_FLUSH_MS / 1000)
+            _wake.clear()
+        try:
+            flush_pending_saves()
+        except Exception:
+            logger.exception("Squad write buffer flush failed")
+
+
+def start_squad_buffer() -> None:
+    """Start the flusher thread; requests left over from a restart are applied first."""
+    global _thread
+    if _thread is not None:
+        return
+    _thread = threading.Thread(target=_run, name="squad-write-buffer", daemon=True)
+    _thread.start()
+    _wake.set()
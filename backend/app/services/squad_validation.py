@@ -0,0 +1,203 @@
+"""
+Squad Validation
+Everything select_squad needs is loaded up front (players from the catalogue
+cache, the transfer lock from the settings snapshot, team / gameweek / lineup
+in one query) and the rules are checked by validate_squad, a pure function that the save endpoint and the
+dry-run endpoint share.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, literal
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.prometheus import record_cache
+from app.models.models import FantasyTeam, FantasyTeamGameweek, Gameweek
+from app.services.ownership import squad_ids
+from app.services.system_settings import system_settings
+
+SQUAD_SIZE = 5
+TRANSFER_PENALTY = 4
+# (الحد الأدنى، الحد الأقصى) لكل مركز
+POSITION_LIMITS = {"GK": (1, 1), "DEF": (1, 3), "MID": (1, 3), "ATT": (1, 3)}
+POSITION_ERRORS = {
+    "GK": "Squad must have exactly 1 GK",
+    "DEF": "You need 1 to 3 Defenders (DEF)",
+    "MID": "You need 1 to 3 Midfielders (MID)",
+    "ATT": "You need 1 to 3 Attackers (ATT)",
+}
+
+
+@dataclass(frozen=True)
+class SquadContext:
+    """The team's state for one gameweek. None means the row doesn't exist."""
+    allow_transfers: bool
+    team_id: Optional[int]
+    free_transfers: int
+    deadline: Optional[datetime]
+    existing_id: Optional[int] = None
+    old_squad: tuple = ()
+    old_captain_id: Optional[int] = None
+
+
+@dataclass
+class SquadCheck:
+    errors: list = field(default_factory=list)  # [(status_code, detail)]
+    total_cost: float = 0.0
+    budget_remaining: float = 0.0
+    transfers_made: int = 0
+    transfer_penalty: int = 0
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+    def fail(self, status_code: int, detail: str) -> None:
+        self.errors.append((status_code, detail))
+
+
+def validate_squad(
+    player_ids: list,
+    captain_id: int,
+    players: dict,
+    context: SquadContext,
+    now: datetime,
+) -> SquadCheck:
+    """
+    Check a selection against the squad rules. `players` maps id -> player
+    (anything with position and price). Errors are collected in the order
+    select_squad has always reported them, so the first one is what a save
+    would fail with.
+    """
+    check = SquadCheck()
+    if not context.allow_transfers:
+        check.fail(403, "Transfers and team modifications are currently LOCKED by the admin.")
+    if len(player_ids) != SQUAD_SIZE:
+        check.fail(400, "Must select exactly 5 players")
+    if captain_id not in player_ids:
+        check.fail(400, "Captain must be in your squad")
+
+    squad = [players.get(pid) for pid in player_ids]
+    if any(p is None for p in squad):
+        check.fail(404, "One or more players not found")
+        squad = [p for p in squad if p is not None]
+
+    positions = [p.position for p in squad]
+    for position, (low, high) in POSITION_LIMITS.items():
+        if not (low <= positions.count(position) <= high):
+            check.fail(400, POSITION_ERRORS[position])
+
+    check.total_cost = sum(p.price for p in squad)
+    check.budget_remaining = settings.BUDGET_LIMIT - check.total_cost
+    if context.team_id is None:
+        check.fail(404, "Fantasy team not found")
+    if check.total_cost > settings.BUDGET_LIMIT:
+        check.fail(400, f"Total cost {check.total_cost:.1f}M exceeds budget of {settings.BUDGET_LIMIT:g}M")
+
+    if context.deadline is None:
+        check.fail(404, "Gameweek not found")
+    elif now > context.deadline:
+        check.fail(403, "The deadline has passed! You cannot make changes to your squad for this Gameweek.")
+
+    if context.existing_id is not None:
+        check.transfers_made = len(set(player_ids) - set(context.old_squad))
+        extra = max(0, check.transfers_made - min(check.transfers_made, context.free_transfers))
+        check.transfer_penalty = extra * TRANSFER_PENALTY
+    return check
+
+
+def load_squad_context(session: Session, manager_id: int, gameweek_id: int, for_update: bool = False):
+    """
+    Load the team, its lineup for the gameweek and the gameweek in one query;
+    the transfer lock comes from the settings snapshot. Returns (SquadContext,
+    team, existing lineup); the ORM objects are what select_squad writes to.
+    """
+    query = (
+        select(FantasyTeam, FantasyTeamGameweek, Gameweek)
+        .select_from(FantasyTeam)
+        .outerjoin(FantasyTeamGameweek, and_(
+            FantasyTeamGameweek.fantasy_team_id == FantasyTeam.id,
+            FantasyTeamGameweek.gameweek_id == gameweek_id,
+        ))
+        .outerjoin(Gameweek, Gameweek.id == literal(gameweek_id))
+        .where(FantasyTeam.manager_id == manager_id)
+    )
+    if for_update:
+        # بنقفل صف الفريق عشان حفظين في نفس الوقت ما يحسبوش التحويلات مرتين
+        query = query.with_for_update(of=FantasyTeam)
+    row = session.exec(query).first()
+    allow_transfers = system_settings.get(session).allow_transfers
+
+    if row is None:
+        # من غير فريق (نادر): نجيب الجولة لوحدها عشان رسايل الخطأ تفضل بنفس الترتيب
+        gw = session.get(Gameweek, gameweek_id)
+        context = SquadContext(
+            allow_transfers=allow_transfers,
+            team_id=None,
+            free_transfers=0,
+            deadline=gw.deadline if gw else None,
+        )
+        return context, None, None
+
+    team, existing, gw = row
+    context = SquadContext(
+        allow_transfers=allow_transfers,
+        team_id=team.id,
+        free_transfers=team.free_transfers,
+        deadline=gw.deadline if gw else None,
+        existing_id=existing.id if existing else None,
+        old_squad=tuple(squad_ids(existing)) if existing else (),
+        old_captain_id=existing.captain_id if existing else None,
+    )
+    return context, team, existing
+
+
+class SquadContextCache:
+    """
+    Short-lived SquadContext per (manager, gameweek) for the dry-run
+    endpoint, so validating while the user edits doesn't query the database.
+    Saves drop the manager's entry; the TTL covers admin changes.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple, tuple[float, SquadContext]] = OrderedDict()
+
+    def get(self, session: Session, manager_id: int, gameweek_id: int) -> SquadContext:
+        key = (manager_id, gameweek_id)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and time.monotonic() - cached[0] < self._ttl_seconds:
+                self._entries.move_to_end(key)
+                record_cache("squad_context", True)
+                return cached[1]
+
+        record_cache("squad_context", False)
+        context, _, _ = load_squad_context(session, manager_id, gameweek_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), context)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return context
+
+    def invalidate(self, manager_id: Optional[int] = None) -> None:
+        with self._lock:
+            if manager_id is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == manager_id]:
+                    del self._entries[key]
+
+
+squad_context_cache = SquadContextCache(
+    max_entries=settings.SQUAD_CONTEXT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SQUAD_CONTEXT_CACHE_TTL_SECONDS,
+)
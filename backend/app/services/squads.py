@@ -0,0 +1,168 @@
+"""
+Squad Slots Repository
+Keeps SquadSlot, a normalized and indexed copy of FantasyTeamGameweek's
+player1_id..player5_id columns, in sync and answers squad lookups from it.
+Validated selections are written through apply_selection.
+"""
+from typing import Optional
+
+from sqlalchemy import case, delete, insert, literal, union_all
+from sqlmodel import Session, select
+
+from app.models.models import FantasyTeam, FantasyTeamGameweek, SquadSlot
+from app.services.ownership import SQUAD_COLUMNS, ensure_ownership, record_squad_change
+
+
+def sync_squad_slots(session: Session, ftg: FantasyTeamGameweek) -> None:
+    """
+    Rewrite the slots of one team-gameweek. `ftg` must already have an id
+    (flush it first when it is new).
+    """
+    table = SquadSlot.__table__
+    session.execute(delete(table).where(table.c.team_gameweek_id == ftg.id))
+    rows = [
+        {
+            "team_gameweek_id": ftg.id,
+            "fantasy_team_id": ftg.fantasy_team_id,
+            "gameweek_id": ftg.gameweek_id,
+            "player_id": getattr(ftg, col),
+            "slot": slot,
+            "is_captain": getattr(ftg, col) == ftg.captain_id,
+        }
+        for slot, col in enumerate(SQUAD_COLUMNS, start=1)
+        if getattr(ftg, col)
+    ]
+    if rows:
+        session.execute(insert(table), rows)
+
+
+def sync_gameweek_slots(session: Session, gameweek_id: Optional[int] = None) -> int:
+    """
+    Rebuild the slots of a whole gameweek (or of every gameweek when
+    `gameweek_id` is None) from FantasyTeamGameweek with one INSERT ... SELECT.
+    """
+    table = SquadSlot.__table__
+    ftg = FantasyTeamGameweek.__table__
+
+    clear = delete(table)
+    if gameweek_id is not None:
+        clear = clear.where(table.c.gameweek_id == gameweek_id)
+    session.execute(clear)
+
+    selects = []
+    for slot, col in enumerate(SQUAD_COLUMNS, start=1):
+        query = select(
+            ftg.c.id,
+            ftg.c.fantasy_team_id,
+            ftg.c.gameweek_id,
+            ftg.c[col],
+            literal(slot),
+            case((ftg.c[col] == ftg.c.captain_id, True), else_=False),
+        ).where(ftg.c[col].is_not(None))
+        if gameweek_id is not None:
+            query = query.where(ftg.c.gameweek_id == gameweek_id)
+        selects.append(query)
+
+    result = session.execute(
+        insert(table).from_select(
+            ["team_gameweek_id", "fantasy_team_id", "gameweek_id", "player_id", "slot", "is_captain"],
+            union_all(*selects),
+        )
+    )
+    return result.rowcount
+
+
+def ensure_gameweek_slots(session: Session, gameweek_id: int) -> bool:
+    """
+    Fill the slots of a gameweek that has lineups but no slots yet (a
+    database that never ran backfill_squad_slots.py). True when it filled.
+    """
+    has_slots = session.exec(
+        select(SquadSlot.id).where(SquadSlot.gameweek_id == gameweek_id).limit(1)
+    ).first()
+    if has_slots:
+        return False
+    has_lineups = session.exec(
+        select(FantasyTeamGameweek.id).where(FantasyTeamGameweek.gameweek_id == gameweek_id).limit(1)
+    ).first()
+    if not has_lineups:
+        return False
+    sync_gameweek_slots(session, gameweek_id)
+    return True
+
+
+def owners_of_player(session: Session, gameweek_id: int, player_id: int) -> list[SquadSlot]:
+    """
+    Every slot holding `player_id` in `gameweek_id` (index lookup on
+    gameweek_id, player_id).
+    """
+    return session.exec(
+        select(SquadSlot).where(
+            SquadSlot.gameweek_id == gameweek_id,
+            SquadSlot.player_id == player_id,
+        )
+    ).all()
+
+
+def owners_of_players(session: Session, gameweek_id: int, player_ids) -> list[SquadSlot]:
+    """owners_of_player for several players in one query."""
+    return session.exec(
+        select(SquadSlot).where(
+            SquadSlot.gameweek_id == gameweek_id,
+            SquadSlot.player_id.in_(list(player_ids)),
+        )
+    ).all()
+
+
+def squad_of_team(session: Session, fantasy_team_id: int, gameweek_id: int) -> list[SquadSlot]:
+    return session.exec(
+        select(SquadSlot)
+        .where(
+            SquadSlot.fantasy_team_id == fantasy_team_id,
+            SquadSlot.gameweek_id == gameweek_id,
+        )
+        .order_by(SquadSlot.slot)
+    ).all()
+
+
+def apply_selection(
+    session: Session,
+    team: FantasyTeam,
+    existing: Optional[FantasyTeamGameweek],
+    gameweek_id: int,
+    player_ids: list,
+    captain_id: int,
+    check,
+) -> FantasyTeamGameweek:
+    """
+    Write a selection that passed validate_squad: the lineup, the team's
+    budget and free transfers, its squad slots and the ownership counters.
+    The caller commits.
+    """
+    # لازم قبل أي تعديل في التشكيلة، عشان الـ rebuild يعد التشكيلة القديمة مش الجديدة
+    ensure_ownership(session, gameweek_id)
+    old_squad = [getattr(existing, col) for col in SQUAD_COLUMNS] if existing else []
+    old_captain_id = existing.captain_id if existing else None
+    tgw = existing or FantasyTeamGameweek(fantasy_team_id=team.id, gameweek_id=gameweek_id)
+
+    for col, pid in zip(SQUAD_COLUMNS, player_ids):
+        setattr(tgw, col, pid)
+    tgw.captain_id = captain_id
+    tgw.transfers_made = check.transfers_made
+    tgw.transfer_penalty = check.transfer_penalty
+
+    team.budget_remaining = check.budget_remaining
+    if check.transfers_made > 0:
+        team.free_transfers = max(0, team.free_transfers - check.transfers_made)
+
+    session.add(tgw)
+    session.add(team)
+    session.flush()
+    sync_squad_slots(session, tgw)
+    # 🌟 تحديث جدول الامتلاك بالفرق بين التشكيلة القديمة والجديدة
+    record_squad_change(
+        session, gameweek_id,
+        old_squad, old_captain_id, player_ids, captain_id,
+        is_transfer=existing is not None,
+    )
+    return tgw
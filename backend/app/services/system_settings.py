@@ -0,0 +1,96 @@
+"""
+System Settings Snapshot
+Process-wide copy of SystemSettings row 1. It is loaded once and replaced
+when update_settings runs; other workers notice a change by re-reading the
+row at most every SYSTEM_SETTINGS_REFRESH_SECONDS. `version` goes up on every
+change this process sees, and `etag` identifies the values across workers.
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlmodel import Session
+
+from app.core import database
+from app.core.config import settings
+from app.core.prometheus import record_cache
+from app.models.models import SystemSettings
+
+SETTING_FIELDS = ("show_dashboard_stats", "allow_transfers", "maintenance_mode")
+# القيم لو الصف لسه متعملش
+DEFAULTS = {"show_dashboard_stats": False, "allow_transfers": True, "maintenance_mode": False}
+
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    show_dashboard_stats: bool
+    allow_transfers: bool
+    maintenance_mode: bool
+    version: int
+
+    @property
+    def values(self) -> dict:
+        return {field: getattr(self, field) for field in SETTING_FIELDS}
+
+    @property
+    def etag(self) -> str:
+        digest = hashlib.blake2b(repr(sorted(self.values.items())).encode(), digest_size=8).hexdigest()
+        return f'"ss-{digest}"'
+
+    def as_dict(self) -> dict:
+        return {"id": 1, **self.values, "version": self.version}
+
+
+class SystemSettingsCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[SettingsSnapshot] = None
+        self._checked_at = 0.0
+
+    def current(self) -> Optional[SettingsSnapshot]:
+        """The snapshot as it is, without touching the database (None before the first load)."""
+        return self._snapshot
+
+    def is_stale(self) -> bool:
+        return (
+            self._snapshot is None
+            or time.monotonic() - self._checked_at >= settings.SYSTEM_SETTINGS_REFRESH_SECONDS
+        )
+
+    def get(self, session: Optional[Session] = None) -> SettingsSnapshot:
+        if not self.is_stale():
+            record_cache("system_settings", True)
+            return self._snapshot
+        record_cache("system_settings", False)
+        if session is None:
+            with Session(database.engine) as own_session:
+                return self._reload(own_session)
+        return self._reload(session)
+
+    def update(self, session: Session, **changes) -> SettingsSnapshot:
+        """Write the given fields to row 1 (creating it if needed) and publish the new snapshot."""
+        row = session.get(SystemSettings, 1)
+        if not row:
+            row = SystemSettings(id=1)
+        for field, value in changes.items():
+            if value is not None:
+                setattr(row, field, value)
+        session.add(row)
+        session.commit()
+        return self._reload(session)
+
+    def _reload(self, session: Session) -> SettingsSnapshot:
+        row = session.get(SystemSettings, 1)
+        values = {field: getattr(row, field) for field in SETTING_FIELDS} if row else dict(DEFAULTS)
+        with self._lock:
+            previous = self._snapshot
+            if previous is None or previous.values != values:
+                version = previous.version + 1 if previous else 1
+                self._snapshot = SettingsSnapshot(**values, version=version)
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+
+system_settings = SystemSettingsCache()
@@ -0,0 +1,28 @@
+"""
+Run this script once to fill the SquadSlot table from existing squads, and
+the PlayerOwnership aggregate of every gameweek that doesn't have one yet.
+Usage: cd backend && python backfill_squad_slots.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlmodel import Session
+from app.core.database import create_db_and_tables, engine
+from app.services.ownership import backfill_ownership
+from app.services.squads import sync_gameweek_slots
+
+
+def backfill_squad_slots():
+    create_db_and_tables()
+    with Session(engine) as session:
+        slots = sync_gameweek_slots(session)
+        gameweeks = backfill_ownership(session)
+        session.commit()
+        print(f"Backfilled {slots} squad slots.")
+        print(f"Built ownership for {len(gameweeks)} gameweek(s).")
+
+
+if __name__ == "__main__":
+    print("=== Fantasy 5-a-side Squad Slots Backfill ===")
+    backfill_squad_slots()
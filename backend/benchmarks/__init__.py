@@ -0,0 +1,9 @@
+"""
+Backend Benchmarks
+Seeds a synthetic league into SQLite or Postgres and drives the real FastAPI
+app in-process through httpx's ASGI transport.
+
+Usage (from backend/):
+    python -m benchmarks.run --users 2000 --output baseline.json
+    python -m benchmarks.compare baseline.json new.json
+"""
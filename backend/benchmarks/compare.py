@@ -0,0 +1,79 @@
+"""
+Baseline Comparison
+Diffs two baselines written by benchmarks.run, endpoint by endpoint.
+
+    python -m benchmarks.compare baseline.json new.json --threshold 10
+"""
+import argparse
+import json
+from typing import Optional
+
+# (المقياس، هل الأقل أحسن)
+METRICS = (
+    ("throughput_rps", False),
+    ("p50_ms", True),
+    ("p95_ms", True),
+    ("p99_ms", True),
+    ("mean_queries", True),
+)
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def change(old, new) -> Optional[float]:
+    if old is None or new is None:
+        return None
+    if old == 0:
+        return 0.0 if new == 0 else None
+    return (new - old) / old * 100
+
+
+def compare(old: dict, new: dict, threshold: float) -> tuple[list, list]:
+    """Return (table rows, regressions). A regression is a change worse than `threshold` percent."""
+    rows, regressions = [], []
+    for scenario, new_result in new["scenarios"].items():
+        old_endpoints = old["scenarios"].get(scenario, {}).get("endpoints", {})
+        for endpoint, new_stats in new_result["endpoints"].items():
+            old_stats = old_endpoints.get(endpoint)
+            if old_stats is None:
+                rows.append((scenario, endpoint, "(new)", "", "", ""))
+                continue
+            for metric, lower_is_better in METRICS:
+                before, after = old_stats.get(metric), new_stats.get(metric)
+                delta = change(before, after)
+                marker = ""
+                if delta is not None and (delta > threshold if lower_is_better else delta < -threshold):
+                    marker = "⚠️"
+                    regressions.append((scenario, endpoint, metric, before, after, delta))
+                shown = "" if delta is None else f"{delta:+.1f}%"
+                rows.append((scenario, endpoint, metric, before, after, f"{shown} {marker}".strip()))
+    return rows, regressions
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Diff two benchmark baselines.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if anything regressed")
+    args = parser.parse_args(argv)
+
+    old, new = load(args.old), load(args.new)
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    if old["meta"].get("seed") != new["meta"].get("seed"):
+        print("note: the two runs used different seed sizes")
+
+    rows, regressions = compare(old, new, args.threshold)
+    for scenario, endpoint, metric, before, after, delta in rows:
+        print(f"{scenario:<20} {endpoint:<45} {metric:<15} {before!s:>10} {after!s:>10} {delta}")
+
+    print(f"\n{len(regressions)} regression(s) over {args.threshold:g}%")
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Import-Time Budget
+Cold start on serverless is mostly `import main`. This imports it in a fresh
+interpreter under `python -X importtime`, reports the slowest modules, and
+exits 1 when the import takes longer than the budget or pulls in a module
+that is meant to load on first use.
+
+    python -m benchmarks.importtime            # the committed budget
+    python -m benchmarks.importtime --budget-ms 0 --runs 5   # report only
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# الـ budget المتفق عليه لـ `import main` (median)؛ لو زاد يبقى حاجة تقيلة رجعت تتحمل مع الـ startup
+DEFAULT_BUDGET_MS = 1500
+
+# بتتحمل مع أول request محتاجها، مش مع الـ import (الاسم بيشمل الـ submodules بتاعته)
+LAZY_MODULES = ("numpy", "jose", "passlib", "firebase_admin", "pyarrow", "app.api", "app.core.profiling")
+
+
+def measure(module: str) -> list[tuple[str, int, int, int]]:
+    """(name, depth, self µs, cumulative µs) for every module imported by a fresh `import <module>`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def by_package(rows: list) -> dict[str, int]:
+    """Self time summed per top-level package (app.* stays split per module)."""
+    totals: dict[str, int] = defaultdict(int)
+    for name, _, self_us, _ in rows:
+        key = name if name.startswith("app.") else name.split(".")[0]
+        totals[key] += self_us
+    return totals
+
+
+def eagerly_imported(rows: list) -> list[str]:
+    """The LAZY_MODULES entries that the measured import pulled in (directly or through a submodule)."""
+    loaded = {name for name, _, _, _ in rows}
+    return [m for m in LAZY_MODULES if any(name == m or name.startswith(m + ".") for name in loaded)]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Check the import time of the backend against a budget.")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="exit 1 when the median import is slower (0 turns the check off)")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to measure (the median counts)")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    totals = [next(cum for name, depth, _, cum in rows if depth == 0 and name == args.module) for rows in runs]
+    median_ms = statistics.median(totals) / 1000
+    rows = runs[totals.index(sorted(totals)[len(totals) // 2])]
+
+    print(f"import {args.module}: median {median_ms:.0f} ms over {args.runs} run(s) "
+          f"(min {min(totals) / 1000:.0f}, max {max(totals) / 1000:.0f})\n")
+    print("slowest packages (self time):")
+    for name, self_us in sorted(by_package(rows).items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    eager = eagerly_imported(rows)
+    if eager:
+        failures.append(f"imported at startup but meant to be lazy: {', '.join(eager)}")
+    if args.budget_ms and median_ms > args.budget_ms:
+        failures.append(f"{median_ms:.0f} ms is over the {args.budget_ms:g} ms budget")
+
+    for failure in failures:
+        print(f"\n⚠️ {failure}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Latency Recorder
+Collects per-endpoint timings, status codes and the X-DB-Query-Count header
+for one scenario and reduces them to throughput and percentiles.
+"""
+import statistics
+import time
+from collections import defaultdict
+from typing import Optional
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self._latencies = defaultdict(list)
+        self._queries = defaultdict(list)
+        self._statuses = defaultdict(lambda: defaultdict(int))
+        self._started = time.perf_counter()
+        self._finished: Optional[float] = None
+        self.extra: dict = {}
+
+    async def call(self, label: str, request, expected=(200, 201, 202, 304)):
+        """Await an httpx request coroutine and record it under `label`."""
+        started = time.perf_counter()
+        response = await request
+        self.record(label, time.perf_counter() - started, response)
+        if response.status_code not in expected:
+            self._statuses[label]["unexpected"] += 1
+        return response
+
+    def record(self, label: str, seconds: float, response) -> None:
+        self._latencies[label].append(seconds * 1000)
+        self._statuses[label][str(response.status_code)] += 1
+        queries = response.headers.get("x-db-query-count")
+        if queries is not None:
+            self._queries[label].append(int(queries))
+
+    def finish(self) -> None:
+        self._finished = time.perf_counter()
+
+    def summary(self) -> dict:
+        wall = (self._finished or time.perf_counter()) - self._started
+        endpoints = {}
+        for label, latencies in sorted(self._latencies.items()):
+            values = sorted(latencies)
+            queries = self._queries.get(label, [])
+            endpoints[label] = {
+                "requests": len(values),
+                "throughput_rps": round(len(values) / wall, 2) if wall else 0.0,
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "max_ms": round(values[-1], 2),
+                "mean_queries": round(statistics.fmean(queries), 2) if queries else None,
+                "max_queries": max(queries) if queries else None,
+                "statuses": dict(self._statuses[label]),
+            }
+        return {"wall_seconds": round(wall, 3), "endpoints": endpoints, **self.extra}
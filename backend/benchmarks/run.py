@@ -0,0 +1,176 @@
+"""
+Benchmark Runner
+Seeds the database, starts the app in-process and runs the scenarios,
+writing a JSON baseline that benchmarks.compare can diff between commits.
+
+    python -m benchmarks.run --users 2000 --concurrency 200 --output baseline.json
+    python -m benchmarks.run --database-url postgresql://... --scenarios leaderboard_polling
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import secrets
+import subprocess
+import sys
+from datetime import datetime
+from typing import Optional
+
+DEFAULT_DATABASE_URL = "sqlite:///./benchmark.db"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Seed a synthetic league and benchmark the API in-process.")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL,
+                        help="SQLite or Postgres URL; the database is dropped and reseeded")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--players", type=int, default=120)
+    parser.add_argument("--gameweeks", type=int, default=3)
+    parser.add_argument("--stats-ratio", type=float, default=0.8)
+    parser.add_argument("--leagues", type=int, default=50)
+    parser.add_argument("--league-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight at once")
+    parser.add_argument("--requests", type=int, default=500, help="requests (or managers) per scenario")
+    parser.add_argument("--saves-per-user", type=int, default=3, help="saves per manager in deadline_rush")
+    parser.add_argument("--scenarios", default="all",
+                        help="comma separated subset of: login_storm, leaderboard_polling, login_with_polling, "
+                             "firebase_login, deadline_rush, calculate_points, activate_gameweek")
+    parser.add_argument("--async-routes", action="store_true", help="set ASYNC_ROUTES_ENABLED")
+    parser.add_argument("--write-buffer", action="store_true", help="set SQUAD_WRITE_BUFFER_ENABLED")
+    parser.add_argument("--trust-claims", action="store_true", help="set AUTH_TRUST_TOKEN_CLAIMS")
+    parser.add_argument("--bcrypt-rounds", type=int, help="set BCRYPT_ROUNDS")
+    parser.add_argument("--hash-workers", type=int, help="set PASSWORD_HASH_WORKERS (0 hashes in the request thread)")
+    parser.add_argument("--login-cache-ttl", type=int, help="set LOGIN_CACHE_TTL_SECONDS (0 verifies every login)")
+    parser.add_argument("--output", help="write the JSON baseline here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args: argparse.Namespace) -> dict:
+    """
+    The app reads its settings and builds its engine at import time, so the
+    environment has to be set before anything under app/ is imported.
+    """
+    flags = {
+        "ASYNC_ROUTES_ENABLED": args.async_routes,
+        "SQUAD_WRITE_BUFFER_ENABLED": args.write_buffer,
+        "AUTH_TRUST_TOKEN_CLAIMS": args.trust_claims,
+        "DB_METRICS_HEADERS": True,
+    }
+    os.environ["DATABASE_URL"] = args.database_url
+    # توكنات Firebase بتتمضي محلياً، من غير شبكة
+    os.environ["FIREBASE_VERIFIER"] = "local"
+    os.environ.setdefault("FIREBASE_LOCAL_SECRET", secrets.token_hex(32))
+    for name, value in flags.items():
+        os.environ[name] = "true" if value else "false"
+    for name, value in (("BCRYPT_ROUNDS", args.bcrypt_rounds), ("PASSWORD_HASH_WORKERS", args.hash_workers),
+                        ("LOGIN_CACHE_TTL_SECONDS", args.login_cache_ttl)):
+        if value is not None:
+            os.environ[name] = str(value)
+            flags[name] = value
+    return flags
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_scenarios(args: argparse.Namespace, league, names: list) -> dict:
+    import httpx
+    from sqlmodel import Session, select
+
+    import main
+    from app.core import database
+    from app.core.security import create_access_token, token_claims
+    from app.models.models import User
+    from benchmarks.scenarios import SCENARIOS, BenchContext
+
+    with Session(database.engine) as session:
+        tokens = {user.id: create_access_token(token_claims(user)) for user in session.exec(select(User)).all()}
+
+    # الـ ASGI transport مش بيشغل الـ lifespan، فبنشغل الـ startup بإيدينا
+    main.startup()
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            context = BenchContext(
+                client=client,
+                league=league,
+                tokens=tokens,
+                concurrency=args.concurrency,
+                requests=args.requests,
+                saves_per_user=args.saves_per_user,
+                rng=random.Random(args.seed),
+            )
+            for name in names:
+                print(f"running {name} ...", file=sys.stderr)
+                recorder = await SCENARIOS[name](context)
+                results[name] = recorder.summary()
+    finally:
+        await main.shutdown()
+    return results
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    flags = configure_environment(args)
+
+    from app.core import database
+    from benchmarks.scenarios import SCENARIOS
+    from benchmarks.seed import SeedConfig, seed_database
+
+    names = list(SCENARIOS) if args.scenarios == "all" else [n.strip() for n in args.scenarios.split(",")]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)}")
+
+    config = SeedConfig(
+        users=args.users,
+        players=args.players,
+        gameweeks=args.gameweeks,
+        stats_ratio=args.stats_ratio,
+        leagues=args.leagues,
+        league_size=args.league_size,
+        seed=args.seed,
+    )
+    print(f"seeding {config.users} users ...", file=sys.stderr)
+    started = datetime.utcnow()
+    league = seed_database(database.engine, config)
+    seed_seconds = (datetime.utcnow() - started).total_seconds()
+
+    results = asyncio.run(run_scenarios(args, league, names))
+    baseline = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "database": database.engine.dialect.name,
+            "seed": config.as_dict(),
+            "seed_seconds": round(seed_seconds, 3),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "saves_per_user": args.saves_per_user,
+            "flags": flags,
+        },
+        "scenarios": results,
+    }
+
+    output = json.dumps(baseline, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"✅ baseline written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Benchmark Scenarios
+Each scenario drives the app through an httpx AsyncClient and returns a
+Recorder. They run in SCENARIOS order: the read-only ones first, then the
+ones that change the league (saves, scoring, activation).
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+
+import httpx
+from sqlmodel import Session, select
+
+from app.core import database
+from app.core.config import settings
+from app.core.firebase import issue_local_token
+from app.models.models import FantasyTeam, FantasyTeamGameweek
+from app.services.ownership import squad_ids
+from app.services.squad_buffer import flush_pending_saves
+from benchmarks.recorder import Recorder
+from benchmarks.seed import PASSWORD, SeededLeague, random_lineup
+
+JOB_POLL_SECONDS = 0.05
+JOB_TIMEOUT_SECONDS = 600
+
+
+@dataclass
+class BenchContext:
+    client: httpx.AsyncClient
+    league: SeededLeague
+    tokens: dict  # user_id -> access token
+    concurrency: int
+    requests: int
+    saves_per_user: int
+    rng: random.Random
+
+    def auth(self, user_id: int) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+
+async def _fan_out(concurrency: int, jobs: list) -> None:
+    """Run coroutine factories with at most `concurrency` in flight."""
+    gate = asyncio.Semaphore(concurrency)
+
+    async def guarded(job):
+        async with gate:
+            await job()
+
+    await asyncio.gather(*(guarded(job) for job in jobs))
+
+
+def _login_jobs(ctx: BenchContext, recorder: Recorder, count: int) -> list:
+    usernames = [ctx.rng.choice(ctx.league.usernames) for _ in range(count)]
+
+    def login(username):
+        return lambda: recorder.call("POST /api/auth/token", ctx.client.post(
+            "/api/auth/token", data={"username": username, "password": PASSWORD},
+        ), expected=(200, 503))
+
+    return [login(u) for u in usernames]
+
+
+def _polling_jobs(ctx: BenchContext, recorder: Recorder, count: int) -> list:
+    """What the dashboard polls: leaderboards, standings, the catalogue and my team."""
+    gw_id = ctx.league.active_gameweek_id
+    endpoints = [
+        ("GET /api/leaderboard/global", lambda uid: "/api/leaderboard/global"),
+        ("GET /api/leaderboard/me", lambda uid: "/api/leaderboard/me"),
+        ("GET /api/leaderboard/gameweek/{gw_id}", lambda uid: f"/api/leaderboard/gameweek/{gw_id - 1}"),
+        ("GET /api/players/", lambda uid: "/api/players/"),
+        ("GET /api/gameweeks/active", lambda uid: "/api/gameweeks/active"),
+        ("GET /api/teams/my", lambda uid: "/api/teams/my"),
+        ("GET /api/stats/dashboard-highlights", lambda uid: "/api/stats/dashboard-highlights"),
+    ]
+    if ctx.league.league_ids:
+        endpoints.append((
+            "GET /api/minileagues/{league_id}/standings",
+            lambda uid: f"/api/minileagues/{ctx.rng.choice(ctx.league.league_ids)}/standings",
+        ))
+
+    def poll(label, url, user_id):
+        return lambda: recorder.call(label, ctx.client.get(url, headers=ctx.auth(user_id)))
+
+    jobs = []
+    for _ in range(count):
+        user_id = ctx.rng.choice(ctx.league.user_ids)
+        label, path = ctx.rng.choice(endpoints)
+        jobs.append(poll(label, path(user_id), user_id))
+    return jobs
+
+
+async def login_storm(ctx: BenchContext) -> Recorder:
+    recorder = Recorder()
+    await _fan_out(ctx.concurrency, _login_jobs(ctx, recorder, ctx.requests))
+    recorder.finish()
+    return recorder
+
+
+async def leaderboard_polling(ctx: BenchContext) -> Recorder:
+    recorder = Recorder()
+    await _fan_out(ctx.concurrency, _polling_jobs(ctx, recorder, ctx.requests))
+    recorder.finish()
+    return recorder
+
+
+async def league_standings(ctx: BenchContext) -> Recorder:
+    """Only mini-league standings, to see how they scale with --league-size."""
+    recorder = Recorder()
+
+    def poll(league_id, user_id):
+        return lambda: recorder.call("GET /api/minileagues/{league_id}/standings", ctx.client.get(
+            f"/api/minileagues/{league_id}/standings", headers=ctx.auth(user_id),
+        ))
+
+    jobs = [
+        poll(ctx.rng.choice(ctx.league.league_ids), ctx.rng.choice(ctx.league.user_ids))
+        for _ in range(ctx.requests)
+    ] if ctx.league.league_ids else []
+    await _fan_out(ctx.concurrency, jobs)
+    recorder.finish()
+    return recorder
+
+
+async def login_with_polling(ctx: BenchContext) -> Recorder:
+    """
+    A login storm and dashboard polling at the same time, each with its own
+    concurrency. Compare the polling rows with leaderboard_polling: hashing
+    runs in its own process pool, so they should barely move.
+    """
+    recorder = Recorder()
+    await asyncio.gather(
+        _fan_out(ctx.concurrency, _login_jobs(ctx, recorder, ctx.requests)),
+        _fan_out(ctx.concurrency, _polling_jobs(ctx, recorder, ctx.requests)),
+    )
+    recorder.finish()
+    return recorder
+
+
+async def firebase_login(ctx: BenchContext) -> Recorder:
+    """
+    Google sign-ins for existing managers with locally signed tokens (the
+    runner sets FIREBASE_VERIFIER=local). Tokens repeat, so most
+    verifications come from the claims cache.
+    """
+    recorder = Recorder()
+    tokens = {uid: issue_local_token(f"bench{i}@example.com") for i, uid in enumerate(ctx.league.user_ids)}
+    user_ids = [ctx.rng.choice(ctx.league.user_ids) for _ in range(ctx.requests)]
+
+    def sign_in(user_id):
+        return lambda: recorder.call("POST /api/auth/firebase", ctx.client.post(
+            "/api/auth/firebase", json={"token": tokens[user_id]},
+        ))
+
+    await _fan_out(ctx.concurrency, [sign_in(uid) for uid in user_ids])
+    recorder.finish()
+    return recorder
+
+
+async def deadline_rush(ctx: BenchContext) -> Recorder:
+    """
+    Managers re-save their squad several times right before the deadline.
+    Afterwards every manager's stored lineup is compared with the last save
+    the API acknowledged; mismatches are reported as lost_saves.
+    """
+    recorder = Recorder()
+    gw_id = ctx.league.active_gameweek_id
+    managers = ctx.rng.sample(ctx.league.user_ids, min(ctx.requests, len(ctx.league.user_ids)))
+    acknowledged: dict = {}
+
+    def manager(user_id):
+        async def run():
+            for _ in range(ctx.saves_per_user):
+                ids, captain = random_lineup(ctx.rng, ctx.league.players_by_position, settings.BUDGET_LIMIT)
+                response = await recorder.call("POST /api/teams/my/select", ctx.client.post(
+                    "/api/teams/my/select", headers=ctx.auth(user_id),
+                    json={"gameweek_id": gw_id, "player_ids": ids, "captain_id": captain},
+                ))
+                if response.status_code in (200, 202):
+                    acknowledged[user_id] = (set(ids), captain)
+        return run
+
+    await _fan_out(ctx.concurrency, [manager(uid) for uid in managers])
+    if settings.SQUAD_WRITE_BUFFER_ENABLED:
+        started = time.perf_counter()
+        await asyncio.to_thread(flush_pending_saves, gw_id)
+        recorder.extra["buffer_flush_seconds"] = round(time.perf_counter() - started, 3)
+    recorder.finish()
+
+    with Session(database.engine) as session:
+        stored = {
+            manager_id: (set(squad_ids(tgw)), tgw.captain_id)
+            for manager_id, tgw in session.exec(
+                select(FantasyTeam.manager_id, FantasyTeamGameweek)
+                .join(FantasyTeamGameweek, FantasyTeamGameweek.fantasy_team_id == FantasyTeam.id)
+                .where(FantasyTeamGameweek.gameweek_id == gw_id)
+                .where(FantasyTeam.manager_id.in_(list(acknowledged)))
+            ).all()
+        }
+    recorder.extra["managers"] = len(managers)
+    recorder.extra["acknowledged_managers"] = len(acknowledged)
+    recorder.extra["lost_saves"] = sum(1 for uid, saved in acknowledged.items() if stored.get(uid) != saved)
+    return recorder
+
+
+async def _wait_for_job(ctx: BenchContext, recorder: Recorder, job_id: int) -> dict:
+    deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        response = await recorder.call("GET /api/gameweeks/jobs/{job_id}", ctx.client.get(
+            f"/api/gameweeks/jobs/{job_id}", headers=ctx.auth(ctx.league.admin_id),
+        ))
+        job = response.json()
+        if job.get("status") in ("done", "failed"):
+            return job
+        await asyncio.sleep(JOB_POLL_SECONDS)
+    raise TimeoutError(f"Scoring job {job_id} did not finish in {JOB_TIMEOUT_SECONDS}s")
+
+
+async def calculate_points(ctx: BenchContext) -> Recorder:
+    """Score the active gameweek for the whole league and wait for the job."""
+    recorder = Recorder()
+    gw_id = ctx.league.active_gameweek_id
+    started = time.perf_counter()
+    response = await recorder.call("POST /api/gameweeks/{gw_id}/calculate-points", ctx.client.post(
+        f"/api/gameweeks/{gw_id}/calculate-points", headers=ctx.auth(ctx.league.admin_id),
+    ))
+    job = await _wait_for_job(ctx, recorder, response.json()["job_id"])
+    recorder.finish()
+    recorder.extra["job_seconds"] = round(time.perf_counter() - started, 3)
+    recorder.extra["job_status"] = job.get("status")
+    recorder.extra["job_report"] = job.get("report")
+    return recorder
+
+
+async def activate_gameweek(ctx: BenchContext) -> Recorder:
+    """Activate the next gameweek, rolling every squad over."""
+    recorder = Recorder()
+    response = await recorder.call("PUT /api/gameweeks/{gw_id}/activate", ctx.client.put(
+        f"/api/gameweeks/{ctx.league.next_gameweek_id}/activate", headers=ctx.auth(ctx.league.admin_id),
+    ))
+    recorder.finish()
+    recorder.extra["rolled_over"] = response.json().get("rolled_over")
+    return recorder
+
+
+SCENARIOS = {
+    "login_storm": login_storm,
+    "leaderboard_polling": leaderboard_polling,
+    "league_standings": league_standings,
+    "login_with_polling": login_with_polling,
+    "firebase_login": firebase_login,
+    "deadline_rush": deadline_rush,
+    "calculate_points": calculate_points,
+    "activate_gameweek": activate_gameweek,
+}
@@ -0,0 +1,184 @@
+"""
+Synthetic League Seeder
+Fills an empty database through the app's models: users with teams, a player
+catalogue, gameweeks with lineups and match stats, MVP votes and
+mini-leagues. Rows are bulk inserted so large leagues seed in seconds.
+"""
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, select
+
+from app.core.security import get_password_hash
+from app.models.models import (
+    FantasyTeam, FantasyTeamGameweek, Gameweek, MatchStat, MiniLeague, MiniLeagueMember,
+    MVPVote, Player, User,
+)
+from app.services.ownership import SQUAD_COLUMNS, rebuild_ownership
+from app.services.scoring import score_gameweek
+from app.services.squads import sync_gameweek_slots
+
+PASSWORD = "bench-password"
+POSITIONS = ("GK", "DEF", "MID", "ATT")
+# التشكيلة: حارس + 2 دفاع + وسط + هجوم
+LINEUP_SHAPE = ("GK", "DEF", "DEF", "MID", "ATT")
+
+
+@dataclass
+class SeedConfig:
+    users: int = 500
+    players: int = 120
+    gameweeks: int = 3
+    stats_ratio: float = 0.8  # نسبة اللعيبة اللي ليهم إحصائيات في كل جولة
+    leagues: int = 50
+    league_size: int = 20
+    seed: int = 42
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class SeededLeague:
+    admin_id: int
+    user_ids: list
+    usernames: list
+    league_ids: list
+    players_by_position: dict  # position -> [(id, price)]
+    active_gameweek_id: int
+    next_gameweek_id: int
+
+
+def random_lineup(rng: random.Random, players_by_position: dict, budget: float = 50.0) -> tuple[list, int]:
+    """A valid squad under budget and its captain."""
+    while True:
+        picked = {}
+        for position in LINEUP_SHAPE:
+            choices = [p for p in players_by_position[position] if p[0] not in picked]
+            pid, price = rng.choice(choices)
+            picked[pid] = price
+        if sum(picked.values()) <= budget:
+            ids = list(picked)
+            return ids, rng.choice(ids)
+
+
+def _stat_row(rng: random.Random, gameweek_id: int, player_id: int) -> dict:
+    return {
+        "gameweek_id": gameweek_id,
+        "player_id": player_id,
+        "goals": rng.choice((0, 0, 0, 1, 1, 2)),
+        "assists": rng.choice((0, 0, 1)),
+        "clean_sheet": rng.choice((0, 1)),
+        "saves": rng.randint(0, 6),
+        "defensive_errors": rng.choice((0, 0, 0, 1)),
+        "mvp": False,
+        "mvp_rank": 0,
+        "nutmegs": rng.choice((0, 0, 1)),
+        "own_goals": 0,
+        "minutes_played": 40,
+        "points": 0,
+        "penalties_scored": 0,
+        "penalties_saved": 0,
+        "penalties_missed": 0,
+        "matches_won": rng.randint(0, 3),
+        "badges": "",
+    }
+
+
+def seed_database(engine, config: SeedConfig) -> SeededLeague:
+    """
+    Drop and recreate every table, then seed. Gameweek 1..N-2 are finished,
+    N-1 is active with its deadline an hour away and N is the next one.
+    """
+    rng = random.Random(config.seed)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    # باسورد واحد متشفر مرة واحدة؛ bcrypt لكل يوزر هياخد دقايق
+    hashed = get_password_hash(PASSWORD)
+    now = datetime.utcnow()
+    gameweeks = max(config.gameweeks, 2)
+
+    with Session(engine) as session:
+        session.execute(insert(User.__table__), [
+            {"username": f"bench{i}", "email": f"bench{i}@example.com", "hashed_password": hashed,
+             "is_admin": i == 0, "created_at": now}
+            for i in range(config.users)
+        ])
+        users = session.exec(select(User.id, User.username).order_by(User.id)).all()
+        user_ids = [u for u, _ in users]
+        session.execute(insert(FantasyTeam.__table__), [
+            {"manager_id": uid, "name": f"Team {uid}", "budget_remaining": 50.0, "total_points": 0,
+             "free_transfers": 1}
+            for uid in user_ids
+        ])
+        team_ids = session.exec(select(FantasyTeam.id).order_by(FantasyTeam.id)).all()
+
+        session.execute(insert(Player.__table__), [
+            {"name": f"Player {i}", "position": POSITIONS[i % len(POSITIONS)], "team_name": f"Club {i % 8}",
+             "price": rng.choice((4.0, 4.5, 5.0, 5.5, 6.0, 7.0, 8.0, 9.5)), "total_points": 0,
+             "is_active": True, "image_url": "/players/default.png"}
+            for i in range(config.players)
+        ])
+        players_by_position: dict = {position: [] for position in POSITIONS}
+        for pid, position, price in session.exec(select(Player.id, Player.position, Player.price)).all():
+            players_by_position[position].append((pid, price))
+
+        session.execute(insert(Gameweek.__table__), [
+            {"number": n, "name": f"Gameweek {n}",
+             "deadline": now + timedelta(hours=1) if n == gameweeks - 1 else now + timedelta(days=7 * (n - gameweeks + 1)),
+             "is_active": n == gameweeks - 1, "is_finished": n < gameweeks - 1, "is_voting_open": False}
+            for n in range(1, gameweeks + 1)
+        ])
+        gw_ids = session.exec(select(Gameweek.id).order_by(Gameweek.number)).all()
+        player_ids = [pid for group in players_by_position.values() for pid, _ in group]
+
+        for gw_id in gw_ids[:-1]:
+            lineups = []
+            for team_id in team_ids:
+                ids, captain = random_lineup(rng, players_by_position)
+                lineups.append({
+                    "fantasy_team_id": team_id, "gameweek_id": gw_id, "captain_id": captain,
+                    "transfers_made": 0, "transfer_penalty": 0, "gameweek_points": 0,
+                    **dict(zip(SQUAD_COLUMNS, ids)),
+                })
+            session.execute(insert(FantasyTeamGameweek.__table__), lineups)
+            playing = rng.sample(player_ids, int(len(player_ids) * config.stats_ratio))
+            session.execute(insert(MatchStat.__table__), [_stat_row(rng, gw_id, pid) for pid in playing])
+            session.execute(insert(MVPVote.__table__), [
+                dict(zip(("first_place_id", "second_place_id", "third_place_id"), rng.sample(playing, 3)),
+                     gameweek_id=gw_id, user_id=uid)
+                for uid in rng.sample(user_ids, min(len(user_ids), 200))
+            ])
+            sync_gameweek_slots(session, gw_id)
+            rebuild_ownership(session, gw_id)
+
+        if config.leagues:
+            session.execute(insert(MiniLeague.__table__), [
+                {"name": f"League {i}", "join_code": f"BENCH{i:04d}", "created_by": rng.choice(user_ids),
+                 "created_at": now}
+                for i in range(config.leagues)
+            ])
+        league_ids = session.exec(select(MiniLeague.id).order_by(MiniLeague.id)).all()
+        members = []
+        for league_id in league_ids:
+            for uid in rng.sample(user_ids, min(config.league_size, len(user_ids))):
+                members.append({"league_id": league_id, "user_id": uid, "joined_at": now})
+        if members:
+            session.execute(insert(MiniLeagueMember.__table__), members)
+        session.commit()
+
+        # الجولات المنتهية بتتحسب عشان الترتيب والنقط يبقوا واقعيين
+        for gw_id in gw_ids[:-2]:
+            score_gameweek(session, gw_id)
+
+    return SeededLeague(
+        admin_id=user_ids[0],
+        user_ids=user_ids,
+        usernames=[name for _, name in users],
+        league_ids=list(league_ids),
+        players_by_position=players_by_position,
+        active_gameweek_id=gw_ids[-2],
+        next_gameweek_id=gw_ids[-1],
+    )
@@ -21,6 +21,7 @@ def create_admin(username: str, email: str, password: str):
             existing.is_admin = True
             session.add(existing)
             session.commit()
+            # التوكنات القديمة بتتلغي لوحدها لأن الـ token version اتغير مع is_admin
             print(f"User '{username}' is now an admin.")
             return
 
@@ -2,8 +2,16 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
-from app.core.database import create_db_and_tables
-from app.api import auth, players, gameweeks, teams, leaderboard, minileagues ,stats
+from app.core.config import settings
+from app.core.database import create_db_and_tables, dispose_async_engine
+from app.core.passwords import hashing_pool
+from app.core.db_metrics import QueryMetricsMiddleware
+from app.core.lazy_routers import LazyRouterMiddleware, LazyRouters
+from app.core.maintenance import MaintenanceMiddleware
+from app.core.prometheus import PrometheusMiddleware, start_multiprocess_flush
+from app.services.jobs import resume_scoring_jobs
+from app.services.ownership import backfill_ownership_if_empty
+from app.services.squad_buffer import start_squad_buffer
 
 app = FastAPI(
     title="Fantasy 5-a-side API",
@@ -11,25 +19,62 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# الصيانة جوه الـ CORS عشان رد الـ 503 يوصل للفرونت
+app.add_middleware(MaintenanceMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Query-Count", "X-DB-Time-Ms", "X-DB-Slow-Queries"],
 )
+# البروفايلر جوه الـ QueryMetrics عشان يقرا عدد الـ queries ووقتها
+# الموديولات اللي بتتفتح بـ setting بتتحمل بس لو اتفتحت (cold start)
+if settings.PROFILING_ENABLED:
+    from app.core.profiling import ProfilingMiddleware
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(QueryMetricsMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(PrometheusMiddleware)
 
-app.include_router(auth.router)
-app.include_router(players.router)
-app.include_router(gameweeks.router)
-app.include_router(teams.router)
-app.include_router(leaderboard.router)
-app.include_router(minileagues.router)
-app.include_router(stats.router)
+# النسخ الـ async لازم تتسجل الأول عشان تاخد نفس الـ paths
+if settings.ASYNC_ROUTES_ENABLED:
+    from app.api import async_reads
+    app.include_router(async_reads.router)
+
+# كل router بيتحمل مع أول request على الـ prefix بتاعه، مش مع الـ import (cold start)
+routers = {
+    "/api/auth": ("app.api.auth", "router"),
+    "/api/players": ("app.api.players", "router"),
+    "/api/gameweeks": ("app.api.gameweeks", "router"),
+    "/api/teams": ("app.api.teams", "router"),
+    "/api/leaderboard": ("app.api.leaderboard", "router"),
+    "/api/minileagues": ("app.api.minileagues", "router"),
+    "/api/stats": ("app.api.stats", "router"),
+    "/api/metrics": ("app.api.metrics", "router"),
+    "/api/exports": ("app.api.exports", "router"),
+}
+if settings.METRICS_ENABLED:
+    routers["/metrics"] = ("app.api.metrics", "prometheus_router")
+app.add_middleware(LazyRouterMiddleware, routers=LazyRouters(app, routers))
 
 @app.on_event("startup")
 def startup():
     create_db_and_tables()
+    # داتابيز قديمة من قبل جدول الامتلاك: الداش بورد بيقرا منه بس، فنبنيه مرة
+    backfill_ownership_if_empty()
+    resume_scoring_jobs()
+    if settings.METRICS_ENABLED:
+        start_multiprocess_flush()
+    if settings.SQUAD_WRITE_BUFFER_ENABLED:
+        start_squad_buffer()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await dispose_async_engine()
+    hashing_pool.shutdown()
 
 
 @app.get("/api/health")
@@ -0,0 +1,88 @@
+"""
+A fresh SQLite database per test, swapped in for app.core.database.engine
+so the services that open their own sessions (job claims, the write buffer)
+use it too, and a small league to score: 12 players, 4 teams and two
+gameweeks with lineups and match stats.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+POSITIONS = ("GK", "DEF", "MID", "ATT")
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    from app.core import database
+    from app.models import models  # noqa: F401 (الجداول لازم تتسجل قبل create_all)
+    from app.services.player_catalogue import player_catalogue
+    from app.services.squad_validation import squad_context_cache
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    player_catalogue.invalidate()
+    squad_context_cache.invalidate()
+    yield engine
+    engine.dispose()
+
+
+def lineup(team_index: int, gameweek: int) -> tuple[list, int]:
+    """(player ids, captain) of a valid squad: GK, 2 DEF, MID, ATT, different per team and gameweek."""
+    shift = team_index + gameweek
+    by_position = {pos: [i * 4 + POSITIONS.index(pos) + 1 for i in range(3)] for pos in POSITIONS}
+    gk = by_position["GK"][shift % 3]
+    defenders = [by_position["DEF"][shift % 3], by_position["DEF"][(shift + 1) % 3]]
+    mid = by_position["MID"][(shift + 2) % 3]
+    att = by_position["ATT"][shift % 3]
+    squad = [gk, *defenders, mid, att]
+    return squad, squad[team_index % 5]
+
+
+@pytest.fixture
+def league(engine):
+    from app.models.models import FantasyTeam, FantasyTeamGameweek, Gameweek, MatchStat, Player, User
+    from app.services.squads import sync_gameweek_slots
+
+    with Session(engine) as session:
+        players = [
+            Player(name=f"Player {i + 1}", position=POSITIONS[i % 4], team_name="FC", price=5.0)
+            for i in range(12)
+        ]
+        users = [User(username=f"manager{i}", email=f"manager{i}@example.com", hashed_password="x") for i in range(4)]
+        now = datetime.utcnow()
+        gameweeks = [
+            Gameweek(number=n, name=f"Gameweek {n}", deadline=now + timedelta(days=n), is_active=n == 1)
+            for n in (1, 2)
+        ]
+        session.add_all([*players, *users, *gameweeks])
+        session.commit()
+
+        teams = [FantasyTeam(manager_id=user.id, name=f"Team {user.id}") for user in users]
+        session.add_all(teams)
+        session.commit()
+
+        for gameweek in gameweeks:
+            for index, team in enumerate(teams):
+                squad, captain = lineup(index, gameweek.number)
+                session.add(FantasyTeamGameweek(
+                    fantasy_team_id=team.id, gameweek_id=gameweek.id, captain_id=captain,
+                    **{f"player{slot}_id": pid for slot, pid in enumerate(squad, start=1)},
+                ))
+            for player in players:
+                session.add(MatchStat(
+                    gameweek_id=gameweek.id, player_id=player.id, minutes_played=60,
+                    goals=(player.id + gameweek.number) % 3, assists=player.id % 2,
+                    saves=player.id % 4 if player.position == "GK" else 0,
+                ))
+            session.flush()
+            sync_gameweek_slots(session, gameweek.id)
+        session.commit()
+
+        return {
+            "gameweeks": [gw.id for gw in gameweeks],
+            "teams": [team.id for team in teams],
+            "managers": [user.id for user in users],
+            "players": [player.id for player in players],
+        }
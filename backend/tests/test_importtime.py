@@ -0,0 +1,21 @@
+"""
+`import main` in a fresh interpreter must not pull in the modules that are
+meant to load on first use (routers, numpy, jose, passlib, pyarrow, the
+profiler...). The time budget stays in benchmarks.importtime, since it
+depends on the machine.
+"""
+from benchmarks.importtime import LAZY_MODULES, eagerly_imported, measure
+
+
+def test_main_imports_no_lazy_module():
+    rows = measure("main")
+
+    assert any(name == "main" for name, depth, _, _ in rows if depth == 0)
+    assert eagerly_imported(rows) == []
+
+
+def test_eager_import_is_detected():
+    rows = measure("app.api.metrics")
+
+    assert set(eagerly_imported(rows)) >= {"app.api"}
+    assert "app.api" in LAZY_MODULES
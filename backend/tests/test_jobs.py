@@ -0,0 +1,61 @@
+"""
+Every uvicorn worker resumes scoring jobs at startup, so a job must be
+claimed by exactly one of them, and a running job only becomes claimable
+again once it is stale.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.models.models import ScoringJob
+from app.services import jobs
+
+
+def _queued_job(engine, gameweek_id: int) -> int:
+    with Session(engine) as session:
+        job = ScoringJob(gameweek_id=gameweek_id)
+        session.add(job)
+        session.commit()
+        return job.id
+
+
+def test_job_is_claimed_once(engine, league):
+    job_id = _queued_job(engine, league["gameweeks"][0])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        claims = list(pool.map(jobs._claim, [job_id] * 8))
+
+    assert claims.count(True) == 1
+    with Session(engine) as session:
+        job = session.get(ScoringJob, job_id)
+        assert (job.status, job.attempts) == ("running", 1)
+
+
+def test_stale_running_job_is_reclaimed(engine, league):
+    job_id = _queued_job(engine, league["gameweeks"][0])
+    assert jobs._claim(job_id)
+
+    with Session(engine) as session:
+        job = session.get(ScoringJob, job_id)
+        job.started_at = datetime.utcnow() - timedelta(seconds=settings.SCORING_JOB_STALE_SECONDS + 1)
+        session.add(job)
+        session.commit()
+
+    assert jobs._claim(job_id)
+    assert not jobs._claim(job_id)
+    with Session(engine) as session:
+        assert session.get(ScoringJob, job_id).attempts == 2
+
+
+def test_run_scoring_job_scores_once(engine, league):
+    job_id = _queued_job(engine, league["gameweeks"][0])
+
+    jobs.run_scoring_job(job_id)
+    # worker تاني بيلاقي الـ job خلصان وما يحسبش تاني
+    jobs.run_scoring_job(job_id)
+
+    with Session(engine) as session:
+        job = session.get(ScoringJob, job_id)
+        assert (job.status, job.stage, job.progress, job.attempts) == ("done", "done", 1.0, 1)
@@ -0,0 +1,44 @@
+"""
+points_batch.score_stats must agree with the scalar points engine
+(calculate_player_points / calculate_bps / calculate_earned_badges) on any
+stat row, since scoring uses one and the breakdown endpoint the other.
+"""
+from hypothesis import given, settings, strategies as st
+
+from app.models.models import MatchStat
+from app.services.points_batch import STAT_COLUMNS, score_stats
+from app.services.points_engine import calculate_bps, calculate_earned_badges, calculate_player_points
+
+# الأسماء القياسية والأشكال التانية اللي بتيجي من الأدمن
+POSITIONS = ["GK", "DEF", "MID", "ATT", "Goalkeeper", "defender", "Midfielder", "Forward", "gk", "F", ""]
+
+stat_rows = st.fixed_dictionaries({
+    **{name: st.integers(min_value=0, max_value=12) for name in STAT_COLUMNS},
+    "minutes_played": st.sampled_from([0, 1, 60, 120]),
+    "mvp_rank": st.integers(min_value=0, max_value=5),
+})
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(st.tuples(stat_rows, st.sampled_from(POSITIONS)), min_size=1, max_size=40))
+def test_batch_matches_scalar_engine(rows):
+    stats = [MatchStat(gameweek_id=1, player_id=i + 1, **values) for i, (values, _) in enumerate(rows)]
+    positions = [position for _, position in rows]
+
+    scores = score_stats(stats, positions)
+
+    assert scores.points.tolist() == [calculate_player_points(s, p) for s, p in zip(stats, positions)]
+    assert scores.bps.tolist() == [calculate_bps(s, p) for s, p in zip(stats, positions)]
+    assert scores.badges() == [calculate_earned_badges(s) for s in stats]
+
+
+@given(stat_rows, st.sampled_from(POSITIONS), st.integers(min_value=0, max_value=3))
+def test_mvp_rank_override_matches_stored_rank(values, position, rank):
+    # score_gameweek بيمرر ترتيب الـ MVP من الأصوات بدل العمود المتخزن
+    stat = MatchStat(gameweek_id=1, player_id=1, **{**values, "mvp_rank": 0})
+    expected = MatchStat(gameweek_id=1, player_id=1, **{**values, "mvp_rank": rank})
+
+    scores = score_stats([stat], [position], mvp_rank=[rank])
+
+    assert scores.points.tolist() == [calculate_player_points(expected, position)]
+    assert scores.badges() == [calculate_earned_badges(expected)]
@@ -0,0 +1,69 @@
+"""
+rollover_squads copies each team's latest lineup into a new gameweek with
+one INSERT ... SELECT: teams that already have a lineup there are skipped,
+a second run inserts nothing, and squad slots and ownership follow the
+copied lineups.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.models.models import FantasyTeamGameweek, Gameweek, PlayerOwnership, SquadSlot
+from app.services.ownership import squad_ids
+from app.services.rollover import rollover_squads
+
+
+def _lineups(session: Session, gameweek_id: int) -> dict:
+    return {
+        ftg.fantasy_team_id: ftg
+        for ftg in session.exec(select(FantasyTeamGameweek).where(FantasyTeamGameweek.gameweek_id == gameweek_id))
+    }
+
+
+def test_rollover_copies_latest_lineup(engine, league):
+    first, second = league["gameweeks"]
+    behind, picked, *_ = league["teams"]
+    with Session(engine) as session:
+        # فريق ملوش تشكيلة في الجولة 2: بياخد بتاعة الجولة 1
+        session.execute(delete(SquadSlot).where(SquadSlot.fantasy_team_id == behind, SquadSlot.gameweek_id == second))
+        session.execute(delete(FantasyTeamGameweek).where(
+            FantasyTeamGameweek.fantasy_team_id == behind, FantasyTeamGameweek.gameweek_id == second,
+        ))
+        third = Gameweek(number=3, name="Gameweek 3", deadline=datetime.utcnow() + timedelta(days=3))
+        session.add(third)
+        session.commit()
+        # فريق اختار تشكيلته للجولة 3 قبل التفعيل: ما تتلمسش
+        own = _lineups(session, first)[picked]
+        session.add(FantasyTeamGameweek(
+            fantasy_team_id=picked, gameweek_id=third.id, captain_id=own.captain_id,
+            transfers_made=1, transfer_penalty=4,
+            **{f"player{slot}_id": pid for slot, pid in enumerate(squad_ids(own), start=1)},
+        ))
+        session.commit()
+
+        inserted = rollover_squads(session, third.id)
+        session.commit()
+
+        assert inserted == len(league["teams"]) - 1
+        rolled, sources = _lineups(session, third.id), _lineups(session, second)
+        sources[behind] = _lineups(session, first)[behind]
+        for team_id, ftg in rolled.items():
+            source = own if team_id == picked else sources[team_id]
+            assert (squad_ids(ftg), ftg.captain_id) == (squad_ids(source), source.captain_id)
+            if team_id != picked:
+                assert (ftg.transfers_made, ftg.transfer_penalty, ftg.gameweek_points) == (0, 0, 0)
+        assert rolled[picked].transfer_penalty == 4
+
+        slots = session.exec(select(SquadSlot).where(SquadSlot.gameweek_id == third.id)).all()
+        assert sorted((s.fantasy_team_id, s.player_id) for s in slots) == sorted(
+            (team_id, pid) for team_id, ftg in rolled.items() for pid in squad_ids(ftg)
+        )
+        owners = Counter(pid for ftg in rolled.values() for pid in squad_ids(ftg))
+        ownership = session.exec(select(PlayerOwnership).where(PlayerOwnership.gameweek_id == third.id)).all()
+        assert {row.player_id: row.owners for row in ownership if row.owners} == dict(owners)
+
+        assert rollover_squads(session, third.id) == 0
+        session.commit()
+        assert len(_lineups(session, third.id)) == len(league["teams"])
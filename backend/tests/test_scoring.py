@@ -0,0 +1,98 @@
+"""
+score_gameweek applies the difference from the previous run, so scoring the
+same gameweek again must leave every total where it was. Editing a stat of a
+finished gameweek pushes only the difference to the owning teams, and must
+end up where a full re-score and snapshot rebuild would.
+"""
+from sqlmodel import Session, select
+
+from app.models.models import FantasyTeam, FantasyTeamGameweek, Gameweek, GameweekRankSnapshot, MatchStat, Player
+from app.services.ownership import squad_ids
+from app.services.match_stats import upsert_match_stats
+from app.services.scoring import refresh_rank_snapshots, score_gameweek, team_gameweek_points
+
+EDITED_FIELDS = ("goals", "assists", "saves", "minutes_played")
+
+
+def _state(session: Session) -> dict:
+    return {
+        "players": dict(session.exec(select(Player.id, Player.total_points)).all()),
+        "teams": dict(session.exec(select(FantasyTeam.id, FantasyTeam.total_points)).all()),
+        "team_gameweeks": dict(session.exec(select(FantasyTeamGameweek.id, FantasyTeamGameweek.gameweek_points)).all()),
+        "snapshots": sorted(
+            (s.gameweek_id, s.fantasy_team_id, s.gw_points, s.gw_rank, s.overall_points, s.overall_rank)
+            for s in session.exec(select(GameweekRankSnapshot)).all()
+        ),
+    }
+
+
+def test_scoring_matches_the_lineups(engine, league):
+    gameweek_id = league["gameweeks"][0]
+    with Session(engine) as session:
+        score_gameweek(session, gameweek_id)
+
+        player_pts = dict(session.exec(
+            select(MatchStat.player_id, MatchStat.points).where(MatchStat.gameweek_id == gameweek_id)
+        ).all())
+        for ftg in session.exec(select(FantasyTeamGameweek).where(FantasyTeamGameweek.gameweek_id == gameweek_id)):
+            expected = team_gameweek_points(squad_ids(ftg), ftg.captain_id, ftg.transfer_penalty, player_pts)
+            assert ftg.gameweek_points == expected
+            assert session.get(FantasyTeam, ftg.fantasy_team_id).total_points == expected
+        assert any(player_pts.values())
+
+
+def test_rescoring_is_idempotent(engine, league):
+    first, second = league["gameweeks"]
+    with Session(engine) as session:
+        score_gameweek(session, first)
+        score_gameweek(session, second)
+        scored = _state(session)
+
+        report = score_gameweek(session, first)
+        session.expire_all()
+
+        assert _state(session) == scored
+        assert report.rows["match_stats"] == report.rows["players"] == report.rows["teams"] == 0
+
+
+def test_stat_edit_on_finished_gameweek_propagates(engine, league):
+    first, second = league["gameweeks"]
+    with Session(engine) as session:
+        score_gameweek(session, first)
+        score_gameweek(session, second)
+
+        captain = session.exec(
+            select(FantasyTeamGameweek.captain_id).where(FantasyTeamGameweek.gameweek_id == first)
+        ).first()
+        edited = [
+            session.exec(select(MatchStat).where(MatchStat.gameweek_id == first, MatchStat.player_id == pid)).one()
+            for pid in (captain, league["players"][-1])
+        ]
+        rows = [
+            (row, {"player_id": stat.player_id, **{name: getattr(stat, name) for name in EDITED_FIELDS}, "goals": stat.goals + 3})
+            for row, stat in enumerate(edited, start=1)
+        ]
+        report = upsert_match_stats(session, session.get(Gameweek, first), rows)
+        session.commit()
+        session.expire_all()
+
+        assert report.updated == 2 and report.teams_updated > 0
+        for gameweek_id in (first, second):
+            player_pts = dict(session.exec(
+                select(MatchStat.player_id, MatchStat.points).where(MatchStat.gameweek_id == gameweek_id)
+            ).all())
+            for ftg in session.exec(
+                select(FantasyTeamGameweek).where(FantasyTeamGameweek.gameweek_id == gameweek_id)
+            ):
+                assert ftg.gameweek_points == team_gameweek_points(
+                    squad_ids(ftg), ftg.captain_id, ftg.transfer_penalty, player_pts
+                )
+        for team in session.exec(select(FantasyTeam)):
+            assert team.total_points == sum(ftg.gameweek_points for ftg in team.gameweeks)
+        for player in session.exec(select(Player)):
+            assert player.total_points == sum(stat.points for stat in player.match_stats)
+
+        # اللقطات اللي اتزحزحت لازم تطابق rebuild كامل، للجولة دي واللي بعدها
+        shifted = _state(session)["snapshots"]
+        refresh_rank_snapshots(session, first)
+        assert _state(session)["snapshots"] == shifted
@@ -0,0 +1,107 @@
+"""
+The write buffer applies only the latest queued save per manager and
+gameweek, but an older save is superseded only once a newer one is saved:
+while the newer one waits for a retry the older one waits with it, and if
+the newer one is rejected or fails for good the older one is applied.
+"""
+import pytest
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.models import FantasyTeamGameweek, SquadSaveRequest
+from app.services import squad_buffer
+from app.services.ownership import squad_ids
+
+from conftest import lineup
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    # الـ retry يبقى مستحق في الـ flush اللي بعده على طول
+    monkeypatch.setattr(settings, "SQUAD_WRITE_BUFFER_RETRY_SECONDS", 0.0)
+
+
+def _enqueue(engine, league, squads) -> list[int]:
+    manager, gameweek_id = league["managers"][0], league["gameweeks"][0]
+    with Session(engine) as session:
+        return [
+            squad_buffer.enqueue_selection(session, manager, gameweek_id, player_ids, captain).id
+            for player_ids, captain in squads
+        ]
+
+
+def _outcomes(engine, request_ids) -> list[str]:
+    with Session(engine) as session:
+        return [session.get(SquadSaveRequest, request_id).outcome for request_id in request_ids]
+
+
+def _saved_lineup(engine, league) -> tuple:
+    with Session(engine) as session:
+        ftg = session.exec(select(FantasyTeamGameweek).where(
+            FantasyTeamGameweek.fantasy_team_id == league["teams"][0],
+            FantasyTeamGameweek.gameweek_id == league["gameweeks"][0],
+        )).one()
+        return squad_ids(ftg), ftg.captain_id
+
+
+def _failing_once(monkeypatch):
+    apply_selection, calls = squad_buffer.apply_selection, []
+
+    def flaky(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("connection reset")
+        return apply_selection(*args, **kwargs)
+
+    monkeypatch.setattr(squad_buffer, "apply_selection", flaky)
+
+
+def test_latest_save_supersedes_older_ones(engine, league):
+    squads = [lineup(0, 1), lineup(1, 1), lineup(2, 1)]
+    request_ids = _enqueue(engine, league, squads)
+
+    assert squad_buffer.flush_pending_saves() == 3
+
+    assert _outcomes(engine, request_ids) == ["superseded", "superseded", "saved"]
+    assert _saved_lineup(engine, league) == squads[-1]
+
+
+def test_older_save_waits_for_newer_retry(engine, league, monkeypatch):
+    _failing_once(monkeypatch)
+    squads = [lineup(1, 1), lineup(2, 1)]
+    request_ids = _enqueue(engine, league, squads)
+
+    squad_buffer.flush_pending_saves()
+
+    assert _outcomes(engine, request_ids) == ["", ""]
+    with Session(engine) as session:
+        older, newer = (session.get(SquadSaveRequest, request_id) for request_id in request_ids)
+        assert newer.attempts == 1 and newer.retry_at is not None
+        assert older.attempts == 0 and older.retry_at == newer.retry_at
+
+    squad_buffer.flush_pending_saves()
+
+    assert _outcomes(engine, request_ids) == ["superseded", "saved"]
+    assert _saved_lineup(engine, league) == squads[-1]
+
+
+def test_older_save_applies_when_newer_fails(engine, league, monkeypatch):
+    monkeypatch.setattr(settings, "SQUAD_WRITE_BUFFER_MAX_ATTEMPTS", 1)
+    _failing_once(monkeypatch)
+    squads = [lineup(1, 1), lineup(2, 1)]
+    request_ids = _enqueue(engine, league, squads)
+
+    squad_buffer.flush_pending_saves()
+
+    assert _outcomes(engine, request_ids) == ["saved", "failed"]
+    assert _saved_lineup(engine, league) == squads[0]
+
+
+def test_older_save_applies_when_newer_is_rejected(engine, league):
+    valid = lineup(1, 1)
+    request_ids = _enqueue(engine, league, [valid, (valid[0][:4], valid[1])])
+
+    squad_buffer.flush_pending_saves()
+
+    assert _outcomes(engine, request_ids) == ["saved", "rejected"]
+    assert _saved_lineup(engine, league) == valid
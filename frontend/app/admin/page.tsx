@@ -239,7 +239,16 @@ export default function AdminPage() {
   async function calculatePoints(id: number) {
     if (!confirm("Are you sure? This will calculate points for all users and close the Gameweek.")) return;
     try {
-      await api.post(`/gameweeks/${id}/calculate-points`);
+      const res = await api.post(`/gameweeks/${id}/calculate-points`);
+      let job = res.data;
+      // الحسبة بتشتغل في الخلفية، فبنعمل polling لحد ما تخلص
+      while (job.status === "queued" || job.status === "running") {
+        const eta = job.eta_seconds != null ? ` (~${Math.ceil(job.eta_seconds)}s left)` : "";
+        setMessage(`⏳ Calculating points... ${Math.round((job.progress || 0) * 100)}%${eta}`);
+        await new Promise((resolve) => setTimeout(resolve, 1500));
+        job = (await api.get(`/gameweeks/jobs/${job.job_id}`)).data;
+      }
+      if (job.status === "failed") { flash(job.error || "Failed to calculate points", true); return; }
       flash("Points calculated and added to users successfully!");
       loadData();
     } catch (err: any) { flash(err.response?.data?.detail || "Failed to calculate points", true); }